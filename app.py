@@ -1,27 +1,18 @@
 import streamlit as st
-import plotly.graph_objects as go
-import pandas as pd
-import json
-import re
-from openai import OpenAI
-from datetime import datetime
-import os
 import time
-import tempfile
-from pyvis.network import Network
-from collections import Counter
-
+from datetime import datetime
 
+# Heavy dependencies (plotly, pandas, pyvis, openai, camel, numpy, httpx) are imported on first use
+# by the page that needs them, so opening one module doesn't pay for all of them.
+# Modules built on numpy are imported inside their page below.
 from src.utils import get_color, create_gauge
-from src.api import fetch_analysis, fetch_global_rankings, fetch_market_risk, generate_dynamic_graph_data, expand_dynamic_graph_data, run_oasis_panic_simulation, CAMEL_AVAILABLE
-from src.graph import generate_impact_network
-try:
-    from camel.societies import RolePlaying
-    from camel.models import ModelFactory
-    from camel.types import ModelPlatformType, ModelType
-    CAMEL_AVAILABLE = True
-except ImportError:
-    CAMEL_AVAILABLE = False
+from src.api import fetch_global_rankings, fetch_pair_reasons, stream_analysis, fetch_market_risk, stream_dynamic_graph_data, expand_dynamic_graph_data, expand_graph_branches, EXPAND_BRANCHES, flight_stats, analysis_cache
+from src.impact_graph import MAX_GRAPH_NODES, ImpactGraph
+from src.scenarios import BUILTIN_SCENARIOS, library_info, load_scenario
+from src.commodities import get_commodity_index
+from src.countries import get_index, resolve_entity
+from src.resilience import resilience_stats
+from src.simulation import PANIC_PERSONAS, SIM_DEADLINE, SIM_MAX_TOKENS, SIM_MIN_NOVELTY, SIM_PAIRS, SIM_TURN_LIMIT, SimulationConfig, stream_panic_simulation
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -65,6 +56,64 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # --- HELPER FUNCTIONS ---
+def render_scan_header(ph, data, country_a, country_b):
+    # 1. Header
+    ph.markdown(f"""
+    <div style="text-align: center; margin-bottom: 25px;">
+        <h1 style="margin:0; font-size: 2.5rem;">{data.get('c1_flag', '')} {country_a.upper()} <span style="color:#bdc3c7;">&</span> {country_b.upper()} {data.get('c2_flag', '')}</h1>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_change_card(ph, data):
+    # Calculate Change
+    diff = data.get('score_current', 0) - data.get('score_past', 0)
+    if diff > 0:
+        trend_str = f"⬆ +{diff} (Worsening)"
+        trend_cls = "trend-bad"
+    elif diff < 0:
+        trend_str = f"⬇ {diff} (Improving)"
+        trend_cls = "trend-good"
+    else:
+        trend_str = "No Change"
+        trend_cls = "trend-neutral"
+    ph.markdown(f"""
+    <div class="metric-card">
+        <div class="stat-label">YoY Change (1 Year)</div>
+        <div class="sub-stat {trend_cls}">{trend_str}</div>
+        <div style="font-size: 13px; color: #555; margin-top: 5px;">
+            <i>"{data.get('change_reason', 'N/A')}"</i>
+        </div>
+        <hr style="margin: 10px 0; opacity: 0.3;">
+        <div class="stat-label">Primary Driver</div>
+        <div style="font-weight: 600; color: #2c3e50;">{data.get('main_driver', 'N/A')}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_trade_card(ph, data):
+    # Trade
+    def_raw = data.get('trade_deficit', 'N/A')
+    if isinstance(def_raw, (int, float)): val = f"${def_raw} B"
+    else: val = str(def_raw).replace(" billion", "B")
+    ph.markdown(f"""
+    <div class="metric-card">
+        <div class="stat-label">Est. Trade Deficit</div>
+        <div class="big-stat">{val}</div>
+        <div class="stat-label" style="margin-top:0;">{data.get('trade_context', '')}</div>
+        <div style="font-size: 10px; color: #95a5a6; margin-top: 8px;">⚠️ Estimated by AI - Verify with World Bank</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_news(ph, data):
+    items = "".join(f"""
+    <div class="news-item">
+        <div class="news-title">🔹 {item.get('title')}</div>
+        <div class="news-date">{item.get('source')} • {item.get('date')}</div>
+    </div>
+    """ for item in data.get('news', []) if isinstance(item, dict))
+    ph.markdown(items, unsafe_allow_html=True)
+
+# Build the country alias index once per process so the first scan doesn't pay for it
+get_index()
 
 # --- SIDEBAR ---
 with st.sidebar:
@@ -100,6 +149,14 @@ with st.sidebar:
     st.divider()
     page = st.radio("Module", ["📡 Regional Monitor", "📊 Global Heatmap", "📈 Market Watchdog", "🦢 Black Swan Events"])
 
+    with st.expander("⚡ Engine Stats"):
+        flight = flight_stats()
+        cache_stats = analysis_cache.stats()
+        st.caption(f"Provider calls: {flight['executed']} • Duplicates coalesced: {flight['coalesced']}")
+        st.caption(f"Scan cache: {cache_stats['entries']} pairs • {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        retries = resilience_stats()
+        st.caption(f"Retries: {retries['retries']} • Hedges: {retries['hedges']} ({retries['hedge_wins']} won) • Failovers: {retries['failovers']}")
+
     st.divider()
     st.markdown("""
         <div style="padding: 10px; border-radius: 10px; background-color: #f0f2f6; border: 1px solid #e0e0e0;">
@@ -115,6 +172,7 @@ with st.sidebar:
 
 # --- PAGE 1: REGIONAL MONITOR ---
 if page == "📡 Regional Monitor":
+    from src.matrix import TensionMatrix
     st.title("📡 Regional Analysis")
     st.markdown("Real-time diplomatic assessment with historical comparison.")
     
@@ -127,94 +185,123 @@ if page == "📡 Regional Monitor":
             btn = st.button("Initialize Scan", type="primary", width="stretch")
 
     if btn and api_key:
-        with st.spinner("Retrieving historical cables & current intel..."):
-            data = fetch_analysis(country_a, country_b, api_key, base_url, selected_model)
-        
-        if "error" in data:
-            st.error(f"Error: {data['error']}")
-        else:
-            # Extract Data
-            flag1 = data.get('c1_flag', '')
-            flag2 = data.get('c2_flag', '')
-            curr = data.get('score_current', 0)
-            past = data.get('score_past', 0)
-            
-            # Calculate Change
-            diff = curr - past
-            if diff > 0:
-                trend_str = f"⬆ +{diff} (Worsening)"
-                trend_cls = "trend-bad"
-            elif diff < 0:
-                trend_str = f"⬇ {diff} (Improving)"
-                trend_cls = "trend-good"
-            else:
-                trend_str = "No Change"
-                trend_cls = "trend-neutral"
+        # Resolve spelling variants ("U.S.", "america") to one canonical entity
+        entity_a, entity_b = resolve_entity(country_a), resolve_entity(country_b)
+        country_a, country_b = entity_a.name, entity_b.name
 
-            # 1. Header
-            st.markdown(f"""
-            <div style="text-align: center; margin-bottom: 25px;">
-                <h1 style="margin:0; font-size: 2.5rem;">{flag1} {country_a.upper()} <span style="color:#bdc3c7;">&</span> {country_b.upper()} {flag2}</h1>
-            </div>
-            """, unsafe_allow_html=True)
+        # Lay out the dashboard up front; each card fills in as soon as its fields stream in
+        dashboard = st.empty()
+        with dashboard.container():
+            header_ph = st.empty()
+            render_scan_header(header_ph, {}, country_a, country_b)
             
             # 2. Main Dashboard
             col_left, col_mid, col_right = st.columns([1.5, 1, 1])
-            
-            with col_left:
-                # Gauge now shows Delta automatically via Plotly
-                st.plotly_chart(create_gauge(curr, past), width="stretch")
-            
-            with col_mid:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div class="stat-label">YoY Change (1 Year)</div>
-                    <div class="sub-stat {trend_cls}">{trend_str}</div>
-                    <div style="font-size: 13px; color: #555; margin-top: 5px;">
-                        <i>"{data.get('change_reason', 'N/A')}"</i>
-                    </div>
-                    <hr style="margin: 10px 0; opacity: 0.3;">
-                    <div class="stat-label">Primary Driver</div>
-                    <div style="font-weight: 600; color: #2c3e50;">{data.get('main_driver', 'N/A')}</div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-            with col_right:
-                # Trade
-                def_raw = data.get('trade_deficit', 'N/A')
-                if isinstance(def_raw, (int, float)): val = f"${def_raw} B"
-                else: val = str(def_raw).replace(" billion", "B")
-                
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div class="stat-label">Est. Trade Deficit</div>
-                    <div class="big-stat">{val}</div>
-                    <div class="stat-label" style="margin-top:0;">{data.get('trade_context', '')}</div>
-                    <div style="font-size: 10px; color: #95a5a6; margin-top: 8px;">⚠️ Estimated by AI - Verify with World Bank</div>
-                </div>
-                """, unsafe_allow_html=True)
+            with col_left: gauge_ph = st.empty()
+            with col_mid: change_ph = st.empty()
+            with col_right: trade_ph = st.empty()
 
             # 3. Summary & News
             st.divider()
             col_sum, col_news = st.columns([1.2, 1])
-            
             with col_sum:
                 st.subheader("📝 Strategic Assessment")
-                st.info(data.get('summary', ''))
+                summary_ph = st.empty()
                 st.caption(f"Historical comparison baseline: {datetime.now().year - 1}")
-
             with col_news:
                 st.subheader("📰 Intelligence Feed")
-                for item in data.get('news', []):
-                    st.markdown(f"""
-                    <div class="news-item">
-                        <div class="news-title">🔹 {item.get('title')}</div>
-                        <div class="news-date">{item.get('source')} • {item.get('date')}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                news_ph = st.empty()
+
+        data = {}
+        gauge_drawn = False
+        with st.spinner("Retrieving historical cables & current intel..."):
+            for event, payload in stream_analysis(country_a, country_b, api_key, base_url, selected_model):
+                field = None
+                if event == "error":
+                    dashboard.empty()
+                    st.error(f"Error: {payload}")
+                    break
+                if event == "done":
+                    data = payload
+                else:
+                    field, value = payload
+                    data[field] = value
+                if field in ("c1_flag", "c2_flag") or event == "done":
+                    render_scan_header(header_ph, data, country_a, country_b)
+                # Gauge is drawn once, as soon as both scores are known
+                if not gauge_drawn and ("score_past" in data or event == "done"):
+                    # Gauge now shows Delta automatically via Plotly
+                    gauge_ph.plotly_chart(create_gauge(data.get('score_current', 0), data.get('score_past', 0)), width="stretch")
+                    gauge_drawn = True
+                if field in ("score_past", "change_reason", "main_driver") or event == "done":
+                    render_change_card(change_ph, data)
+                if field in ("trade_deficit", "trade_context") or event == "done":
+                    render_trade_card(trade_ph, data)
+                if field == "summary" or event == "done":
+                    summary_ph.info(data.get('summary', ''))
+                if field == "news" or event == "done":
+                    render_news(news_ph, data)
+
+    # 4. Watchlist Tension Matrix
+    st.divider()
+    st.subheader("🧮 Watchlist Tension Matrix")
+    st.markdown("Score every pair in a watchlist concurrently. Previously scanned pairs are reused and failed pairs can be resumed.")
+    watchlist_text = st.text_area(
+        "Watchlist (comma-separated)",
+        "USA, China, Russia, India, Japan, Germany, United Kingdom, France, Iran, Israel, Saudi Arabia, Brazil",
+    )
+    watchlist = [c.strip() for c in watchlist_text.split(",") if c.strip()]
+
+    # Keep the matrix across reruns so a partial run can be resumed
+    matrix_key = (tuple(resolve_entity(c).id for c in watchlist), provider, selected_model)
+    if st.session_state.get('tension_matrix_key') != matrix_key:
+        st.session_state['tension_matrix'] = TensionMatrix(watchlist)
+        st.session_state['tension_matrix_key'] = matrix_key
+    matrix = st.session_state['tension_matrix']
+
+    col_m1, col_m2 = st.columns([3, 1])
+    with col_m1:
+        st.caption(f"{len(matrix.entities)} entities • {matrix.total} pairs • {matrix.done} scored")
+    with col_m2:
+        label = "Resume Matrix" if 0 < matrix.done < matrix.total else "Compute Matrix"
+        run_matrix = st.button(label, width="stretch", disabled=matrix.total == 0)
+
+    if run_matrix and not api_key:
+        st.warning("API Key required.")
+    elif run_matrix:
+        progress = st.progress(matrix.done / matrix.total if matrix.total else 0.0)
+        status = st.empty()
+        for done, total, (i, j), ok in matrix.run(api_key, base_url, selected_model):
+            progress.progress(done / total)
+            mark = "✅" if ok else "⚠️"
+            status.caption(f"{mark} {matrix.names[i]} vs {matrix.names[j]} — {done}/{total} pairs scored")
+        if matrix.errors:
+            st.warning(f"{len(matrix.errors)} pair(s) failed. Click **Resume Matrix** to retry only those pairs.")
+
+    if matrix.done:
+        import pandas as pd
+        import plotly.graph_objects as go
+        view = st.radio("Matrix View", ["Current", "1 Year Ago", "YoY Change"], horizontal=True)
+        if view == "Current":
+            z, scale, zmin, zmax = matrix.current, "RdYlGn_r", 0, 100
+        elif view == "1 Year Ago":
+            z, scale, zmin, zmax = matrix.past, "RdYlGn_r", 0, 100
+        else:
+            z, scale, zmin, zmax = matrix.current - matrix.past, "RdBu_r", -50, 50
+        heatmap = go.Figure(go.Heatmap(
+            z=z, x=matrix.names, y=matrix.names, colorscale=scale, zmin=zmin, zmax=zmax,
+            hoverongaps=False, hovertemplate="%{y} ↔ %{x}: %{z:.0f}<extra></extra>",
+        ))
+        heatmap.update_layout(height=560, margin=dict(l=20, r=20, t=20, b=20), paper_bgcolor='rgba(0,0,0,0)')
+        st.plotly_chart(heatmap, width="stretch")
+        with st.expander("Pair Details"):
+            st.dataframe(pd.DataFrame(matrix.pair_rows()).sort_values("score", ascending=False),
+                         column_config={"score": st.column_config.ProgressColumn("Tension", min_value=0, max_value=100, format="%d")},
+                         hide_index=True, width="stretch")
 
 # --- PAGE 2: GLOBAL HEATMAP ---
 elif page == "📊 Global Heatmap":
+    from src.matrix import TensionMatrix
     st.title("📊 Global Heatmap")
     
     if not api_key:
@@ -222,17 +309,46 @@ elif page == "📊 Global Heatmap":
     else:
         # Refresh logic
         col_r1, col_r2 = st.columns([4, 1])
+        with col_r1:
+            rank_source = st.radio("Ranking Source", ["AI Rankings", "Derived from Pair Matrix"], horizontal=True,
+                                   help="'Derived' ranks the pair scores already computed in the Regional Monitor; the AI only adds context.")
         with col_r2:
             if st.button("🔄 Refresh Data"):
                 st.session_state.pop('rankings', None)
+                st.session_state.pop('derived_reasons', None)
                 st.rerun()
         
-        if "rankings" not in st.session_state:
-            with st.spinner("Scanning global datasets..."):
-                st.session_state.rankings = fetch_global_rankings(api_key, base_url, selected_model)
-        
-        ranks = st.session_state.rankings
+        if rank_source == "AI Rankings":
+            if "rankings" not in st.session_state:
+                with st.spinner("Scanning global datasets..."):
+                    st.session_state.rankings = fetch_global_rankings(api_key, base_url, selected_model)
+            ranks = st.session_state.rankings
+        else:
+            # Prefer this session's watchlist matrix; otherwise use every pair in the shared cache
+            pair_matrix = st.session_state.get('tension_matrix')
+            if pair_matrix is None or not pair_matrix.done or st.session_state.get('tension_matrix_key', ())[1:] != (provider, selected_model):
+                pair_matrix = TensionMatrix.from_cache(base_url, selected_model)
+            ranks = pair_matrix.rankings()
+            if not ranks['highest_pressure']:
+                st.info("No pair scores yet. Run a scan or a Watchlist Tension Matrix in the Regional Monitor first.")
+                ranks = None
+            else:
+                # Reasons for the selected pairs come from one batched call, reused until the selection changes
+                selected = ranks['highest_pressure'] + ranks['lowest_pressure']
+                selection_key = tuple(sorted({r['pair'] for r in selected}))
+                cached_reasons = st.session_state.get('derived_reasons')
+                if not cached_reasons or cached_reasons[0] != selection_key:
+                    with st.spinner("Adding context to ranked pairs..."):
+                        unique = list({r['pair']: r for r in selected}.values())
+                        reasons = fetch_pair_reasons(unique, api_key, base_url, selected_model)
+                    if "error" in reasons:
+                        st.caption(f"⚠️ Context unavailable ({reasons['error']}); showing stored primary drivers.")
+                        reasons = {}
+                    st.session_state['derived_reasons'] = (selection_key, reasons)
+                ranks = pair_matrix.rankings(reasons=st.session_state['derived_reasons'][1])
+                st.caption(f"Ranked locally from {pair_matrix.done} scored pairs.")
         if ranks:
+            import pandas as pd
             tab1, tab2 = st.tabs(["🔥 Flashpoints (High Tension)", "🕊️ Stable Zones"])
             
             with tab1:
@@ -246,6 +362,8 @@ elif page == "📊 Global Heatmap":
 
 # --- PAGE 3: MARKET WATCHDOG (NEW) ---
 elif page == "📈 Market Watchdog":
+    from src.portfolio import scan_portfolio
+    from src.risk import market_inputs, risk_model
     st.title("📈 Commodity Risk Watchdog")
     st.markdown("Analyze how geopolitical tension in top producing nations impacts commodity prices.")
     
@@ -257,24 +375,80 @@ elif page == "📈 Market Watchdog":
         with col_input:
             commodity_choice = st.selectbox(
                 "Select Commodity to Track:", 
-                ["Crude Oil", "Natural Gas", "Gold", "Silver", "Semiconductors (Chips)", "Lithium"]
+                get_commodity_index().names() or ["Crude Oil", "Natural Gas", "Gold", "Silver", "Semiconductors (Chips)", "Lithium"]
             )
         with col_btn:
             st.markdown("---")
             scan_market = st.button("Analyze Risk", type="primary", width="stretch")
+            scan_all = st.button("Scan Portfolio", width="stretch",
+                                 help="Score every supplier country once and rank all commodities by share-weighted tension.")
+
+        if scan_all:
+            with st.spinner("Scoring supplier countries for the whole portfolio..."):
+                portfolio = scan_portfolio(api_key, base_url, selected_model)
+            if "error" in portfolio:
+                st.error(portfolio['error'])
+            else:
+                import pandas as pd
+                st.subheader("🗂️ Portfolio Risk Scan")
+                st.caption(f"{len(portfolio['countries'])} supplier countries scored once and shared across "
+                           f"{len(portfolio['commodities'])} commodities; each risk score is share-weighted producer/refiner tension scaled by concentration (HHI).")
+                st.dataframe(pd.DataFrame(portfolio['commodities']),
+                             column_config={
+                                 "commodity": "Commodity",
+                                 "global_risk_score": st.column_config.ProgressColumn("Supply Chain Risk", min_value=0, max_value=100, format="%d"),
+                                 "producer_hhi": st.column_config.NumberColumn("Producer HHI", format="%d"),
+                                 "refiner_hhi": st.column_config.NumberColumn("Refiner HHI", format="%d"),
+                                 "producer_tension": st.column_config.NumberColumn("Producer Tension", format="%.0f"),
+                                 "refiner_tension": st.column_config.NumberColumn("Refiner Tension", format="%.0f"),
+                                 "production_at_risk": st.column_config.NumberColumn("Production at Risk", format="%.0f%%"),
+                                 "refining_at_risk": st.column_config.NumberColumn("Refining at Risk", format="%.0f%%"),
+                                 "top_exposure": "Biggest Exposure",
+                             },
+                             hide_index=True, width="stretch")
+                with st.expander("Country Tension Inputs"):
+                    st.dataframe(pd.DataFrame(portfolio['countries']),
+                                 column_config={"tension_index": st.column_config.ProgressColumn("Tension", min_value=0, max_value=100, format="%d")},
+                                 hide_index=True, width="stretch")
+                if portfolio['unscored']:
+                    st.warning(f"No tension returned for: {', '.join(portfolio['unscored'])}. They are left out of the weighting.")
             
         if scan_market:
             with st.spinner(f"Analyzing supply chains for {commodity_choice}..."):
-                market_data = fetch_market_risk(commodity_choice, api_key, base_url, selected_model)
-                
+                st.session_state['market_data'] = (commodity_choice, fetch_market_risk(commodity_choice, api_key, base_url, selected_model))
+        # Kept across reruns so the what-if sliders can rescore it without another AI call
+        stored = st.session_state.get('market_data')
+        market_data = stored[1] if stored and stored[0] == commodity_choice else None
+
+        if market_data is not None:
             if "error" in market_data:
                 st.error(market_data['error'])
             else:
+                record = get_commodity_index().get(commodity_choice)
+                engine = risk_model(record) if record is not None and 'risk_components' in market_data else None
+                risk_score = market_data.get('global_risk_score', 0)
+                risk_delta = None
+                if engine is not None:
+                    with st.expander("🎛️ What-if Scenarios"):
+                        st.caption("Shift the AI's tension and threat inputs; the risk score is recomputed locally from the verified shares.")
+                        shocks = {}
+                        col_c, col_t = st.columns(2)
+                        with col_c:
+                            for name in engine.choke_names:
+                                shocks[name] = st.slider(f"{name} threat", -50, 50, 0, key=f"whatif:{commodity_choice}:{name}")
+                        with col_t:
+                            for eid, name in engine.countries.items():
+                                shocks[eid] = st.slider(f"{name} tension", -50, 50, 0, key=f"whatif:{commodity_choice}:{eid}")
+                    if any(shocks.values()):
+                        tension, threat = market_inputs(market_data)
+                        what_if = engine.score(tension, threat, shocks)
+                        risk_delta = what_if['global_risk_score'] - risk_score
+                        risk_score = what_if['global_risk_score']
+
                 # 2. Key Metrics Row
                 m1, m2, m3 = st.columns(3)
                 
                 # Risk Score Coloring
-                risk_score = market_data.get('global_risk_score', 0)
                 risk_color = "green" if risk_score < 40 else "orange" if risk_score < 70 else "red"
                 
                 # Outlook Coloring
@@ -282,8 +456,11 @@ elif page == "📈 Market Watchdog":
                 outlook_color = "red" if "Bullish" in outlook else "green" # Bullish usually means prices up (bad for buyers)
                 
                 with m1:
-                    st.metric(label="Global Supply Chain Risk", value=f"{risk_score}/100")
+                    st.metric(label="Global Supply Chain Risk", value=f"{risk_score}/100", delta=risk_delta, delta_color="inverse")
                     st.progress(risk_score)
+                    if engine is not None:
+                        st.caption(f"Producer HHI {market_data['producer_hhi']:,} · Refiner HHI {market_data['refiner_hhi']:,} · "
+                                   f"AI estimate {market_data.get('model_risk_score', 'n/a')}/100")
                 with m2:
                     st.metric(label="Price Outlook (Geopolitical)", value=outlook)
                 with m3:
@@ -388,6 +565,10 @@ elif page == "📈 Market Watchdog":
 
 # --- PAGE 4: BLACK SWAN EVENTS (NEW) ---
 elif page == "🦢 Black Swan Events":
+    from src.analytics import group_hops, top_nodes
+    from src.graph import generate_impact_network, get_layout
+    from src.lod import LOD_HOPS, LOD_MIN_NODES, build_view
+    from src.network_component import impact_network
     st.title("🦢 Black Swan Simulator")
     st.markdown("Visualize the impact of catastrophic geopolitical shocks on global trade routes and logistical flows.")
 
@@ -405,14 +586,7 @@ elif page == "🦢 Black Swan Events":
         
         scenario = st.selectbox(
             "Select Global Shock:",
-            [
-                "Baseline (Clear Skies)",
-                "Suez Canal Total Blockage",
-                "Strait of Hormuz Closure",
-                "Malacca Strait Conflict",
-                "Panama Canal Drought/Shutdown",
-                "Custom Event"
-            ],
+            ["Baseline (Clear Skies)"] + BUILTIN_SCENARIOS + ["Custom Event"],
             label_visibility="collapsed"
         )
         
@@ -422,15 +596,27 @@ elif page == "🦢 Black Swan Events":
         
         # We define a variable to hold the effective scenario name
         effective_scenario = custom_scenario_text if scenario == "Custom Event" and custom_scenario_text else scenario
+
+        # Built-in shocks may have a pre-generated graph in the scenario library
+        library = library_info(effective_scenario) if effective_scenario in BUILTIN_SCENARIOS else None
+        library_depth = None
+        if library:
+            library_depth = st.select_slider("Preloaded expansion depth", options=list(range(library['max_depth'] + 1)),
+                                             value=library['max_depth'],
+                                             help="Pre-generated rounds to load from the scenario library.")
         
         st.markdown("---")
         run_sim = st.button("🚀 Execute Scenario", type="primary", width='stretch')
         
         # Initialize graph session state
-        if 'bs_graph_data' not in st.session_state:
-            st.session_state['bs_graph_data'] = None
+        if 'bs_graph' not in st.session_state:
+            st.session_state['bs_graph'] = None
+        if 'bs_graph_error' not in st.session_state:
+            st.session_state['bs_graph_error'] = None
         if 'bs_graph_iterations' not in st.session_state:
             st.session_state['bs_graph_iterations'] = 0
+        if 'bs_layout' not in st.session_state:
+            st.session_state['bs_layout'] = None
         if 'bs_scenario' not in st.session_state:
             st.session_state['bs_scenario'] = None
         if 'bs_model_key' not in st.session_state:
@@ -441,8 +627,12 @@ elif page == "🦢 Black Swan Events":
         if (run_sim
                 or st.session_state['bs_scenario'] != effective_scenario
                 or st.session_state['bs_model_key'] != current_model_key):
-            st.session_state['bs_graph_data'] = None
+            st.session_state['bs_graph'] = None
+            st.session_state['bs_graph_error'] = None
+            st.session_state['bs_graph_source'] = None
             st.session_state['bs_graph_iterations'] = 0
+            st.session_state['bs_layout'] = None
+            st.session_state['bs_expanded_clusters'] = []
             st.session_state['bs_scenario'] = effective_scenario
             st.session_state['bs_model_key'] = current_model_key
         
@@ -464,61 +654,99 @@ elif page == "🦢 Black Swan Events":
     st.markdown("---")
     st.markdown("#### 🔗 Interactive Relationship Graph")
     if effective_scenario and effective_scenario != "Baseline (Clear Skies)":
-        # Guard: require API key before attempting any graph generation
-        if not api_key:
+        # 1. Ensure Initial Data Exists
+        preset = load_scenario(effective_scenario, library_depth) if run_sim and library else None
+        if preset and not st.session_state.get('bs_graph'):
+            # Scenario library hit: pre-generated and pre-laid-out, no provider call (and no API key) needed
+            graph, positions, info = preset
+            st.session_state['bs_graph'] = graph
+            st.session_state['bs_layout'] = positions
+            st.session_state['bs_graph_iterations'] = info['depth']
+            st.session_state['bs_graph_source'] = info
+
+        # Guard: live generation and expansion require an API key
+        if not api_key and not st.session_state.get('bs_graph'):
             st.warning("⚠️ **API Key Required** — Please configure your API key in the sidebar (⚙️ Model Configuration) to generate the interactive supply chain graph.")
         else:
-            # 1. Ensure Initial Data Exists
-            if run_sim and not st.session_state.get('bs_graph_data'):
+            source = st.session_state.get('bs_graph_source')
+            regenerate = False
+            if source:
+                col_src, col_regen = st.columns([3, 1])
+                with col_src:
+                    st.caption(f"📚 Loaded from the scenario library: depth {source['depth']}, generated {source['generated_at'] or 'n/a'} with {source['model'] or 'unknown model'}.")
+                with col_regen:
+                    regenerate = st.button("♻️ Regenerate live", width='stretch', disabled=not api_key)
+                if regenerate:
+                    st.session_state['bs_graph'] = None
+                    st.session_state['bs_graph_source'] = None
+                    st.session_state['bs_graph_iterations'] = 0
+                    st.session_state['bs_layout'] = None
+
+            if (run_sim or regenerate) and not st.session_state.get('bs_graph'):
+                # Nodes and edges stream in one per line and are merged as they arrive,
+                # so the first cascade is drawn long before the model has finished
+                streamed = ImpactGraph()
+                preview = st.empty()
+                drawn_at = 0.0
                 with st.spinner(f"AI is modeling initial supply chain reactions..."):
-                    st.session_state['bs_graph_data'] = generate_dynamic_graph_data(effective_scenario, api_key, base_url, selected_model)
+                    for event, payload in stream_dynamic_graph_data(effective_scenario, api_key, base_url, selected_model):
+                        if event == "error":
+                            st.session_state['bs_graph_error'] = payload
+                            break
+                        if event == "done":
+                            st.session_state['bs_graph'] = streamed
+                            break
+                        streamed.merge({f"{event}s": [payload]})
+                        # Redraw at most twice a second; each redraw only places the new nodes
+                        if streamed.edges and time.monotonic() - drawn_at > 0.5:
+                            positions = get_layout(streamed, previous=st.session_state.get('bs_layout'))
+                            st.session_state['bs_layout'] = positions
+                            with preview:
+                                st.components.v1.html(generate_impact_network(effective_scenario, streamed, positions),
+                                                      height=850, scrolling=True)
+                            drawn_at = time.monotonic()
+                preview.empty()
 
             # 2. Render UI Controls
             col_title, col_btn = st.columns([3, 1])
             expand_clicked = False
+            graph = st.session_state.get('bs_graph')
+            with col_title:
+                branch_mode = st.toggle("Parallel branch expansion", value=True,
+                                        help="Split the graph's frontier into branches and expand them concurrently.")
+                branches = st.slider("Branches", 2, 8, EXPAND_BRANCHES, disabled=not branch_mode)
             with col_btn:
                 iters = st.session_state.get('bs_graph_iterations', 0)
-                if iters < 3 and st.session_state.get('bs_graph_data') and "error" not in st.session_state.get('bs_graph_data'):
-                    expand_clicked = st.button(f"🕸️ Expand Reactions ({iters}/3)", width='stretch')
-                elif iters >= 3:
-                    st.button("Max Expansions Reached", disabled=True, width='stretch')
+                if graph and len(graph) < MAX_GRAPH_NODES:
+                    expand_clicked = st.button(f"🕸️ Expand Reactions (round {iters + 1})", width='stretch', disabled=not api_key,
+                                               help=None if api_key else "Configure an API key to expand the graph.")
+                elif graph:
+                    st.button("Graph Size Limit Reached", disabled=True, width='stretch')
             
             # 3. Handle Expansion Logic
             if expand_clicked:
                 with st.spinner("AI is calculating deeper consequences..."):
-                    new_data = expand_dynamic_graph_data(st.session_state['bs_graph_data'], api_key, base_url, selected_model)
-                    if "error" not in new_data:
-                        # Deduplicate nodes by id before merging (LLM may repeat existing nodes)
-                        existing_ids = {n["id"] for n in st.session_state['bs_graph_data']['nodes']}
-                        unique_new_nodes = [n for n in new_data.get('nodes', []) if n.get("id") not in existing_ids]
-                        
-                        # Deduplicate edges by (source, target) pair
-                        existing_edges = {
-                            (e["source"], e["target"])
-                            for e in st.session_state['bs_graph_data']['edges']
-                        }
-                        unique_new_edges = [
-                            e for e in new_data.get('edges', [])
-                            if (e.get("source"), e.get("target")) not in existing_edges
-                        ]
-                        
-                        st.session_state['bs_graph_data']['nodes'].extend(unique_new_nodes)
-                        st.session_state['bs_graph_data']['edges'].extend(unique_new_edges)
-                        st.session_state['bs_graph_iterations'] += 1
+                    if branch_mode:
+                        results = expand_graph_branches(graph, api_key, base_url, selected_model, branches)
                     else:
-                        st.error(f"Expansion Error: {new_data['error']}")
+                        results = [expand_dynamic_graph_data(graph, api_key, base_url, selected_model)]
+                    errors = [r['error'] for r in results if "error" in r]
+                    # The store drops repeated nodes/edges and renames IDs that two branches both invented
+                    graph.merge_round([r for r in results if "error" not in r])
+                    if len(errors) < len(results):
+                        st.session_state['bs_graph_iterations'] += 1
+                    for error in dict.fromkeys(errors):
+                        st.error(f"Expansion Error: {error}")
             
             # 4. Render Graph Stats & Pyvis Graph
-            graph_data = st.session_state.get('bs_graph_data')
-            if graph_data and "error" in graph_data:
-                st.error(f"AI Generation Error: {graph_data['error']}")
-            elif graph_data:
+            graph = st.session_state.get('bs_graph')
+            if st.session_state.get('bs_graph_error'):
+                st.error(f"AI Generation Error: {st.session_state['bs_graph_error']}")
+            elif graph is not None:
                 # Render Stats
-                nodes_count = len(graph_data.get('nodes', []))
-                edges_count = len(graph_data.get('edges', []))
-                
-                groups = [n.get('group', 'Unknown') for n in graph_data.get('nodes', []) if n.get('group') != 'Event']
-                most_impacted = Counter(groups).most_common(1)[0][0] if groups else "N/A"
+                nodes_count = len(graph.nodes)
+                edges_count = len(graph.edges)
+                most_impacted = graph.most_impacted()
                 
                 st.markdown(f"""
                 <div style="display: flex; gap: 20px; margin-bottom: 20px;">
@@ -536,11 +764,53 @@ elif page == "🦢 Black Swan Events":
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
+
+                with st.expander("📐 Cascade Analytics"):
+                    st.caption("Impact decays with each hop from the event; bottlenecks relay the most chains from the event to end consequences. Node size in the graph follows both.")
+                    col_imp, col_bot = st.columns(2)
+                    with col_imp:
+                        st.markdown("**Most Impacted Entities**")
+                        st.dataframe([{"Entity": node.get("label", node["id"]), "Sector": node.get("group", "Unknown"), "Impact": f"{score:.0%}"}
+                                      for node, score in top_nodes(graph, "impact")], hide_index=True, width="stretch")
+                    with col_bot:
+                        st.markdown("**Critical Bottlenecks**")
+                        st.dataframe([{"Entity": node.get("label", node["id"]), "Sector": node.get("group", "Unknown"), "Bottleneck": f"{score:.0%}"}
+                                      for node, score in top_nodes(graph, "bottleneck")], hide_index=True, width="stretch")
+                    st.markdown("**Reach by Sector**")
+                    st.dataframe([{"Sector": group, "Entities": row["nodes"], "Reached": row["reached"],
+                                   "Closest (hops)": row["min_hops"], "Average (hops)": row["mean_hops"]}
+                                  for group, row in sorted(group_hops(graph).items())], hide_index=True, width="stretch")
                 
-                # Render Graph via st.components.v1.html (st.html cannot render full HTML documents with physics scripts)
+                # Render Graph via the live network component, or st.components.v1.html for a static snapshot
+                # (st.html cannot render full HTML documents with scripts)
                 try:
-                    html_data = generate_impact_network(effective_scenario, graph_data)
-                    st.components.v1.html(html_data, height=850, scrolling=True)
+                    # Large graphs render at a level of detail: distant nodes fold into sector clusters
+                    max_hops, expanded = LOD_HOPS, ()
+                    if len(graph) > LOD_MIN_NODES:
+                        col_hops, col_expand = st.columns([1, 2])
+                        with col_hops:
+                            max_hops = st.slider("Detail radius (hops from event)", 1, 8, LOD_HOPS)
+                        clusters = build_view(graph, st.session_state.get('bs_expanded_clusters', []), max_hops)["clusters"]
+                        with col_expand:
+                            options = sorted(set(clusters) | set(st.session_state.get('bs_expanded_clusters', [])))
+                            expanded = st.multiselect("Expand clusters", options, key='bs_expanded_clusters',
+                                                      format_func=lambda g: f"{g} ({clusters[g]} hidden)" if g in clusters else g)
+                    view = build_view(graph, expanded, max_hops)
+                    if view["clusters"]:
+                        st.caption(f"Showing {len(view['nodes']) - len(view['clusters'])} of {view['total_nodes']} entities; "
+                                   f"{sum(view['clusters'].values())} folded into {len(view['clusters'])} sector clusters.")
+
+                    # Existing nodes keep their coordinates after an expansion; only new ones are placed
+                    positions = get_layout(graph, previous=st.session_state.get('bs_layout'))
+                    st.session_state['bs_layout'] = positions
+                    if st.session_state.get('bs_live_graph', True):
+                        # Persistent browser network: expansions arrive as diffs, zoom and pan survive
+                        impact_network(graph, view, positions, key='bs_network')
+                    else:
+                        html_data = generate_impact_network(effective_scenario, graph, positions, expanded, max_hops)
+                        st.components.v1.html(html_data, height=850, scrolling=True)
+                    st.toggle("Live graph updates", value=True, key='bs_live_graph',
+                              help="Keep one interactive network in the browser and send it only the changes. Turn off to embed a standalone HTML snapshot instead.")
                 except Exception as e:
                     st.error(f"Failed to generate network graph: {e}")
 
@@ -571,28 +841,47 @@ elif page == "🦢 Black Swan Events":
     st.subheader("👥 Social Dynamics Simulation (Oasis/CAMEL-AI)")
     st.markdown("Run a small-scale multi-agent simulation to observe emergent human behavior, such as localized panic buying.")
     
+    pairs = st.slider("Persona pairs", 1, len(PANIC_PERSONAS), min(SIM_PAIRS, len(PANIC_PERSONAS)),
+                      help="Conversations run concurrently, each between a different pair of local roles.")
+    with st.expander("⏱️ Simulation Limits"):
+        col_turns, col_tokens, col_deadline = st.columns(3)
+        with col_turns:
+            turn_limit = st.slider("Max turns per pair", 1, 10, SIM_TURN_LIMIT)
+        with col_tokens:
+            max_tokens = st.slider("Max tokens per message", 100, 1500, SIM_MAX_TOKENS, step=50)
+        with col_deadline:
+            deadline = st.slider("Deadline (seconds)", 15, 300, int(SIM_DEADLINE), step=15)
+        converge = st.toggle("Stop a pair early once it stops adding new items or sentiment", value=True)
     if st.button("Run Panic Buying Simulation", type="secondary", width='stretch'):
         if not api_key:
             st.warning("Please enter your API Key in the sidebar to run the simulation.")
         elif scenario == "Baseline (Clear Skies)":
             st.info("Select a disruptive scenario to trigger panic.")
         else:
+            STOP_LABELS = {"turn_limit": "⏹️ Turn limit reached", "converged": "🔁 Converged", "terminated": "✅ Wrapped up",
+                           "deadline": "⏱️ Cut off at the deadline", "error": "⚠️ Stopped on an error"}
+            # One panel per persona pair; each message is written as soon as its turn completes
+            panels = []
+            for assistant_role, user_role in PANIC_PERSONAS[:pairs]:
+                panel = st.container(border=True)
+                panel.markdown(f"**🏪 {assistant_role} × 🛒 {user_role}**")
+                panels.append(panel)
             with st.spinner("Simulating localized retail panic using CAMEL-AI..."):
-                chat_log = run_oasis_panic_simulation(scenario, api_key, selected_model, base_url)
-                
-            if chat_log and isinstance(chat_log, list):
-                if "error" in str(chat_log[0]).lower() or "not installed" in str(chat_log[0]).lower():
-                    st.error(chat_log[0].get('content', 'Error'))
-                else:
-                    st.success("Simulation Complete. Showing emergent dialogue:")
-                    for msg in chat_log:
-                        role = msg.get("role", "")
-                        content = msg.get("content", "")
-                        if role == "Consumer":
-                            st.chat_message("user", avatar="🛒").write(f"**Anxious Consumer:** {content}")
-                        elif role == "Manager":
-                            st.chat_message("assistant", avatar="🏪").write(f"**Store Manager:** {content}")
+                config = SimulationConfig(pairs=pairs, turn_limit=turn_limit, max_tokens=max_tokens, deadline=deadline,
+                                          min_novelty=SIM_MIN_NOVELTY if converge else 0.0)
+                for event, payload in stream_panic_simulation(scenario, api_key, selected_model, base_url, config):
+                    if event == "error":
+                        st.error(payload)
+                    elif event == "done":
+                        if payload["partial"]:
+                            st.warning(f"Deadline of {deadline}s reached. Showing the dialogue gathered so far.")
                         else:
-                            st.write(content)
-            else:
-                st.error("Failed to generate simulation.")
+                            st.success("Simulation Complete. Showing emergent dialogue above.")
+                    elif event == "pair_done":
+                        panels[payload["pair"]].caption(f"{STOP_LABELS.get(payload['reason'], payload['reason'])} after {payload['turns']} turn(s).")
+                    elif payload["side"] == "user":
+                        panels[payload["pair"]].chat_message("user", avatar="🛒").write(f"**{payload['speaker']}:** {payload['content']}")
+                    elif payload["side"] == "assistant":
+                        panels[payload["pair"]].chat_message("assistant", avatar="🏪").write(f"**{payload['speaker']}:** {payload['content']}")
+                    else:
+                        panels[payload["pair"]].error(payload["content"])
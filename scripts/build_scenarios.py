@@ -0,0 +1,76 @@
+"""Pre-generate the Black Swan scenario library (data/scenarios/*.json).
+
+Runs each built-in scenario through the same generate/expand calls the app makes,
+lays the graph out round by round, and stores every round so the app can load any
+depth instantly. Meant for a scheduled offline job.
+
+    GEOPULSE_API_KEY=... python scripts/build_scenarios.py --model gpt-4o --depth 3
+    python scripts/build_scenarios.py --scenario "Strait of Hormuz Closure" --branches 6
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.api import EXPAND_BRANCHES, expand_graph_branches, generate_dynamic_graph_data  # noqa: E402
+from src.impact_graph import ImpactGraph  # noqa: E402
+from src.layout import compute_layout  # noqa: E402
+from src.scenarios import BUILTIN_SCENARIOS, SCENARIO_DIR, save_scenario  # noqa: E402
+
+
+def build(scenario, key, base_url, model, depth, branches):
+    """Generate one scenario; returns ``(rounds, positions)`` or raises RuntimeError."""
+    initial = generate_dynamic_graph_data(scenario, key, base_url, model)
+    if "error" in initial:
+        raise RuntimeError(initial["error"])
+    rounds = [[initial]]
+    graph = ImpactGraph.from_data(initial)
+    positions = compute_layout(graph)
+    for _ in range(depth):
+        batches = []
+        for result in expand_graph_branches(graph, key, base_url, model, branches):
+            if "error" in result:
+                print(f"  branch failed: {result['error']}", file=sys.stderr)
+                continue
+            batches.append(result)
+        # Kept per branch so loading replays the same merges (and ID renames)
+        graph.merge_round(batches)
+        rounds.append(batches)
+        # Same incremental layout as the live page: earlier nodes stay where they were
+        positions = compute_layout(graph, positions)
+        print(f"  round {len(rounds) - 1}: {len(graph.nodes)} nodes, {len(graph.edges)} edges")
+    return rounds, positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", help="Scenario to build (repeatable; default: all built-ins)")
+    parser.add_argument("--model", required=True, help="Model name, as selected in the app")
+    parser.add_argument("--base-url", default=os.environ.get("GEOPULSE_BASE_URL"), help="OpenAI-compatible base URL")
+    parser.add_argument("--depth", type=int, default=3, help="Expansion rounds to store after the initial graph")
+    parser.add_argument("--branches", type=int, default=EXPAND_BRANCHES, help="Parallel branches per expansion round")
+    parser.add_argument("--out", default=SCENARIO_DIR, help="Library directory")
+    args = parser.parse_args()
+
+    key = os.environ.get("GEOPULSE_API_KEY")
+    if not key:
+        print("Set GEOPULSE_API_KEY to the provider API key.", file=sys.stderr)
+        return 1
+
+    failed = 0
+    for scenario in args.scenario or BUILTIN_SCENARIOS:
+        print(f"{scenario}:")
+        try:
+            rounds, positions = build(scenario, key, args.base_url, args.model, args.depth, args.branches)
+        except RuntimeError as e:
+            print(f"  failed: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        print(f"  wrote {save_scenario(scenario, rounds, positions, args.model, args.out)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
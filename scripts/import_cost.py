@@ -0,0 +1,96 @@
+"""Report cold import cost per module, to catch startup-time regressions.
+
+Each module is imported in a fresh interpreter with ``-X importtime`` so results
+are not skewed by whatever an earlier import already pulled in.
+
+    python scripts/import_cost.py                  # default module set
+    python scripts/import_cost.py pandas src.api   # specific modules
+    python scripts/import_cost.py --budget 1500    # exit 1 if app startup exceeds 1500 ms
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# Heavy dependencies pulled in by the src modules rather than by app.py itself
+DEPENDENCY_MODULES = ["numpy", "openai", "httpx", "pyvis.network", "scipy.sparse", "camel.societies"]
+
+
+def app_imports(path=APP_PATH):
+    """``(startup, page)``: modules app.py imports at module level, and those it imports inside a page."""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    top_level = {id(node) for node in tree.body}
+    startup, page = [], []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        target = startup if id(node) in top_level else page
+        target.extend(name for name in names if name not in target)
+    return startup, [name for name in page if name not in startup]
+
+
+# Derived from app.py so the report can't drift from what the app really imports
+STARTUP_MODULES, APP_PAGE_MODULES = app_imports()
+PAGE_MODULES = APP_PAGE_MODULES + [m for m in DEPENDENCY_MODULES if m not in APP_PAGE_MODULES]
+
+
+def import_cost_ms(module):
+    """Cumulative cold import time of ``module`` in milliseconds, or None if it fails to import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None
+    # Lines look like "import time:   self |  cumulative | name"; the last one for the
+    # requested module is its top-level entry
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    return None
+
+
+def startup_cost_ms():
+    """Cold import cost of everything app.py imports at module level, as one process."""
+    code = "import time; t = time.perf_counter(); " + "; ".join(f"import {m}" for m in STARTUP_MODULES) + \
+           "; print((time.perf_counter() - t) * 1000)"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return float(proc.stdout.strip()) if proc.returncode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", help="Modules to measure (default: startup + page modules)")
+    parser.add_argument("--budget", type=float, help="Fail if total app startup import time exceeds this many ms")
+    args = parser.parse_args()
+
+    modules = args.modules or STARTUP_MODULES + PAGE_MODULES
+    rows = [(m, import_cost_ms(m)) for m in modules]
+    width = max(len(m) for m in modules)
+    print(f"{'module'.ljust(width)}  cold import (ms)")
+    for module, ms in sorted(rows, key=lambda r: -(r[1] or 0)):
+        print(f"{module.ljust(width)}  {'not installed' if ms is None else f'{ms:10.1f}'}")
+
+    total = startup_cost_ms()
+    if total is None:
+        print("\napp startup imports: failed (see `python -c 'import src.api'`)")
+        return 1
+    print(f"\napp startup imports: {total:.1f} ms")
+    if args.budget is not None and total > args.budget:
+        print(f"Startup import budget exceeded: {total:.1f} ms > {args.budget:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+# Max in-flight requests per provider (base_url), shared by every session
+PROVIDER_CONCURRENCY = int(os.environ.get("GEOPULSE_PROVIDER_CONCURRENCY", "8"))
+
+_loop = None
+_loop_lock = threading.Lock()
+_semaphores = {}
+
+
+def get_loop():
+    """The single background event loop that every async provider call runs on.
+
+    Streamlit reruns scripts on arbitrary threads, so async clients and semaphores
+    are bound to this one long-lived loop instead of a fresh ``asyncio.run`` per call.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="geopulse-aio", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro):
+    """Schedule ``coro`` on the bridge loop and return a ``concurrent.futures.Future``."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=None):
+    """Run ``coro`` on the bridge loop and block the calling thread for its result."""
+    return submit(coro).result(timeout)
+
+
+def provider_semaphore(base_url):
+    # Only touched from the loop thread, so no lock is needed
+    key = base_url or ""
+    if key not in _semaphores:
+        _semaphores[key] = asyncio.Semaphore(PROVIDER_CONCURRENCY)
+    return _semaphores[key]
+
+
+async def fan_out(coros, return_exceptions=True):
+    """Await many provider calls concurrently; per-provider limits are applied at the call site."""
+    return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+
+
+def run_all(coros, timeout=None):
+    """Blocking bridge for ``fan_out``: results come back in input order."""
+    return run(fan_out(list(coros)), timeout)
+
+
+def iter_completed(coros, timeout=None):
+    """Yield ``(index, result)`` pairs in completion order from the calling thread.
+
+    Lets a Streamlit page update progress as each call lands without touching
+    Streamlit from the loop thread. Exceptions are yielded as results.
+    """
+    futures = {submit(c): i for i, c in enumerate(coros)}
+    for fut in concurrent.futures.as_completed(futures, timeout=timeout):
+        try:
+            yield futures[fut], fut.result()
+        except Exception as e:
+            yield futures[fut], e
@@ -0,0 +1,123 @@
+import os
+import threading
+import weakref
+
+import numpy as np
+
+from src.impact_graph import ImpactGraph
+
+# Share of impact kept per hop away from the root event
+IMPACT_DECAY = float(os.environ.get("GEOPULSE_IMPACT_DECAY", "0.85"))
+# Walk-propagation cut-off; cascades deeper than this contribute nothing further
+MAX_HOPS = 50
+
+_cache = weakref.WeakKeyDictionary()  # ImpactGraph -> (version, metrics)
+_cache_lock = threading.Lock()
+
+
+def _adjacency(graph):
+    from scipy import sparse  # Deferred: only the Black Swan page needs scipy
+    n = len(graph.nodes)
+    return sparse.csr_matrix((np.ones(len(graph.src)), (graph.src, graph.dst)), shape=(n, n))
+
+
+def _normalize(values):
+    peak = values.max() if values.size else 0.0
+    return values / peak if peak > 0 else np.zeros_like(values)
+
+
+def _propagate(step, start, decay):
+    """Sum of ``decay**k * step^k(start)`` for k >= 1, stopping once the wave dies out."""
+    total = np.zeros_like(start)
+    wave = start
+    for _ in range(MAX_HOPS):
+        wave = decay * step(wave)
+        if not wave.any() or wave.max() < 1e-9:
+            break
+        total += wave
+    return total
+
+
+def compute_metrics(graph, decay=IMPACT_DECAY):
+    """Cascade analytics for an ``ImpactGraph`` from a sparse adjacency matrix.
+
+    - ``impact``: decayed reachability from the root event. Each node passes its
+      impact on split evenly across its consequences, losing ``1 - decay`` per hop,
+      so nodes fed by several chains accumulate more.
+    - ``bottleneck``: betweenness-style score, decayed walks from the root through a
+      node times decayed walks from it to the graph's end points.
+    - ``hops``: shortest hop distance from the root (``inf`` when unreachable).
+
+    Scores are normalised to [0, 1] and aligned with ``graph.nodes``.
+    """
+    from scipy.sparse.csgraph import shortest_path
+    n = len(graph.nodes)
+    root = graph.root
+    if n == 0 or root is None:
+        return {"impact": np.zeros(n), "bottleneck": np.zeros(n), "hops": np.full(n, np.inf)}
+    adj = _adjacency(graph)
+    out_degree = np.asarray(adj.sum(axis=1)).ravel()
+    share = np.divide(1.0, out_degree, out=np.zeros(n), where=out_degree > 0)
+    adj_t = adj.T.tocsr()
+
+    seed = np.zeros(n)
+    seed[root] = 1.0
+    impact = _propagate(lambda v: adj_t @ (v * share), seed, decay)
+
+    from_root = _propagate(lambda v: adj_t @ v, seed, decay) + seed
+    sinks = (out_degree == 0).astype(float)
+    to_end = _propagate(lambda v: adj @ v, sinks, decay) + sinks
+    bottleneck = from_root * to_end
+    bottleneck[root] = 0.0
+    bottleneck[out_degree == 0] = 0.0  # End points terminate chains rather than relaying them
+
+    hops = shortest_path(adj, directed=True, unweighted=True, indices=root)
+    impact[root] = 0.0
+    return {"impact": _normalize(impact), "bottleneck": _normalize(bottleneck), "hops": hops}
+
+
+def graph_metrics(graph):
+    """``compute_metrics`` cached per graph version (raw graph dicts are computed fresh)."""
+    if not isinstance(graph, ImpactGraph):
+        return compute_metrics(ImpactGraph.from_data(graph))
+    with _cache_lock:
+        cached = _cache.get(graph)
+    if cached is not None and cached[0] == graph.version:
+        return cached[1]
+    metrics = compute_metrics(graph)
+    with _cache_lock:
+        _cache[graph] = (graph.version, metrics)
+    return metrics
+
+
+def top_nodes(graph, metric, k=10):
+    """The ``k`` highest-scoring nodes for ``metric`` as ``(node, score)`` pairs."""
+    scores = graph_metrics(graph)[metric]
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [(graph.nodes[i], float(scores[i])) for i in order if scores[i] > 0]
+
+
+def group_hops(graph):
+    """Per-group reach summary: ``{group: {"nodes", "reached", "min_hops", "mean_hops"}}``."""
+    hops = graph_metrics(graph)["hops"]
+    groups = np.array([node.get("group", "Unknown") for node in graph.nodes], dtype=object)
+    mask = groups != "Event"
+    if not mask.any():
+        return {}
+    names, inverse = np.unique(groups[mask].astype(str), return_inverse=True)
+    dists = hops[mask]
+    finite = np.isfinite(dists)
+    counts = np.bincount(inverse, minlength=names.size)
+    reached = np.bincount(inverse, weights=finite, minlength=names.size).astype(int)
+    totals = np.bincount(inverse, weights=np.where(finite, dists, 0.0), minlength=names.size)
+    mins = np.full(names.size, np.inf)
+    np.minimum.at(mins, inverse[finite], dists[finite])
+    return {
+        str(name): {
+            "nodes": int(counts[g]),
+            "reached": int(reached[g]),
+            "min_hops": int(mins[g]) if reached[g] else None,
+            "mean_hops": round(float(totals[g] / reached[g]), 2) if reached[g] else None,
+        }
+        for g, name in enumerate(names)
+    }
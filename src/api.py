@@ -1,20 +1,54 @@
+import functools
+import hashlib
+import importlib.util
 import json
 import os
-from src.utils import _make_client, clean_json, sanitize_input
+from src.aio import provider_semaphore, run_all
+from src.cache import TTLCache
+from src.clients import get_async_client, get_client, key_fingerprint
+from src.commodities import NO_DATA, UNKNOWN_SOURCE, get_commodity_index
+from src.countries import resolve_entity
+from src.impact_graph import ImpactGraph
+from src.jsonstream import IncrementalJSONParser, JSONLinesParser
+from src.resilience import acall, call, describe_error
+from src.singleflight import SingleFlight
+from src.utils import REFUSAL_ERROR, clean_json, sanitize_input
 
-try:
-    from camel.societies import RolePlaying
-    from camel.models import ModelFactory
-    from camel.types import ModelPlatformType, ModelType
-    CAMEL_AVAILABLE = True
-except ImportError:
-    CAMEL_AVAILABLE = False
+# camel-ai[all] takes seconds to import, so only check that it is installed here;
+# src.simulation imports it on first use.
+CAMEL_AVAILABLE = importlib.util.find_spec("camel") is not None
 
-def fetch_analysis(c1, c2, key, base_url, model):
-    if not key: return {"error": "API Key is missing."}
-    client = _make_client(key, base_url)
-    
-    system_prompt = """
+# Shared across sessions: (USA, India) and (India, USA) fold into one entry.
+ANALYSIS_CACHE_TTL = float(os.environ.get("GEOPULSE_ANALYSIS_CACHE_TTL", "900"))
+analysis_cache = TTLCache(
+    ttl=ANALYSIS_CACHE_TTL,
+    max_entries=int(os.environ.get("GEOPULSE_ANALYSIS_CACHE_SIZE", "512")),
+    max_bytes=int(os.environ.get("GEOPULSE_ANALYSIS_CACHE_BYTES", str(8 * 1024 * 1024))),
+)
+
+# Per-country tension for the Market Watchdog portfolio scan, shared by every commodity that country supplies
+TENSION_CACHE_TTL = float(os.environ.get("GEOPULSE_TENSION_CACHE_TTL", "1800"))
+tension_cache = TTLCache(ttl=TENSION_CACHE_TTL, max_entries=int(os.environ.get("GEOPULSE_TENSION_CACHE_SIZE", "1024")))
+
+def _pair_cache_key(e1, e2, base_url, model):
+    """Order-independent cache key; ``swapped`` is True when (e1, e2) is the reverse of the stored order."""
+    a, b = e1.id, e2.id
+    swapped = a > b
+    first, second = (b, a) if swapped else (a, b)
+    return (base_url or "", model, first, second), swapped
+
+# Concurrent identical requests share one provider call (see flight_stats)
+flights = SingleFlight()
+
+def flight_stats():
+    """How many provider calls ran vs. how many duplicates were coalesced into them."""
+    return flights.stats()
+
+def _swap_flags(data):
+    data["c1_flag"], data["c2_flag"] = data.get("c2_flag", ""), data.get("c1_flag", "")
+    return data
+
+ANALYSIS_SYSTEM_PROMPT = """
     You are a Strategic Intelligence Algorithm. Return STRICT JSON.
     
     TASK:
@@ -39,87 +73,26 @@ def fetch_analysis(c1, c2, key, base_url, model):
         "news": [{"date": "YYYY-MM-DD", "title": "Headline", "source": "Source"}]
     }
     """
-    
-    clean_c1 = sanitize_input(c1)
-    clean_c2 = sanitize_input(c2)
-    user_prompt = (
-        f"Analyze {clean_c1} vs {clean_c2}. compare TODAY vs 1 YEAR AGO. "
-        "Provide specific tension scores for both timeframes. "
-        "For trade_deficit, provide a single number in Billions (USD)."
-    )
-    
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-        )
-        data = clean_json(response.choices[0].message.content)
-        if not data: return {"error": "Failed to parse AI response."}
-        return data
-    except Exception as e:
-        return {"error": str(e)}
 
-def fetch_global_rankings(key, base_url, model):
-    if not key: return None
-    client = _make_client(key, base_url)
-    
-    system_prompt = """
+RANKINGS_SYSTEM_PROMPT = """
     Return STRICT JSON with 'highest_pressure' and 'lowest_pressure' (10 items each).
     Item: {"pair": "Name vs Name", "score": Int (0-100), "reason": "Context"}
     """
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": "Global Geopolitical Rankings 2025"}]
-        )
-        return clean_json(response.choices[0].message.content)
-    except Exception as e: return {"error": str(e)}
 
-def fetch_market_risk(commodity, key, base_url, model):
-    if not key: return {"error": "API Key Missing"}
-    client = _make_client(key, base_url)
+PAIR_REASONS_SYSTEM_PROMPT = """
+    You are a Strategic Intelligence Algorithm. Return STRICT JSON.
     
-    # Load verified data
-    verified_data = {}
-    producer_source = "Unknown Source"
-    refiner_source = "Unknown Source"
-    choke_point_source = "Unknown Source"
-    verified_producers_str = "No verified data found. Use your own knowledge."
-    verified_refiners_str = "No verified data found. Use your own knowledge."
-    verified_choke_points_str = "No verified data found. Use your own knowledge."
-    try:
-        file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'verified_production.json')
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                verified_data = json.load(f)
-            
-            if commodity in verified_data:
-                item = verified_data[commodity]
-                producer_source = item.get("producer_source", item.get("source", "Unknown Source"))
-                refiner_source = item.get("refiner_source", "Unknown Source")
-                choke_point_source = item.get("choke_point_source", "Unknown Source")
-                
-                producers = item.get("producers", [])
-                verified_producers_str = f"VERIFIED PRODUCERS FOR {commodity} (Source: {producer_source}):\n"
-                for p in producers:
-                    verified_producers_str += f"- {p['country']} (Share: {p['share']})\n"
-                    
-                refiners = item.get("refiners", [])
-                verified_refiners_str = f"VERIFIED REFINERS/PROCESSORS FOR {commodity} (Source: {refiner_source}):\n"
-                for r in refiners:
-                    verified_refiners_str += f"- {r['country']} (Share: {r['share']})\n"
-                    
-                choke_points = item.get("choke_points", [])
-                verified_choke_points_str = f"VERIFIED CHOKE POINTS FOR {commodity} (Source: {choke_point_source}):\n"
-                for c in choke_points:
-                    verified_choke_points_str += f"- {c['name']} (Volume: {c['volume_flow']}, Reliance: {c['reliance_level']})\n"
-    except Exception as e:
-        pass
-        
-    system_prompt = f"""
+    TASK:
+    For each country pair provided, write one sentence of context explaining its tension score (0-100).
+    Do NOT change the pairs or the scores.
+    
+    REQUIRED JSON STRUCTURE:
+    {
+        "reasons": [{"pair": "String (Must match provided pair exactly)", "reason": "String (Max 1 sentence)"}]
+    }
+    """
+
+MARKET_RISK_SYSTEM_PROMPT = """
     You are a Global Commodity Risk Analyst. Return STRICT JSON.
     
     TASK:
@@ -130,11 +103,11 @@ def fetch_market_risk(commodity, key, base_url, model):
     5. Predict price impact purely based on geopolitical risk (Bullish=Prices Up/Risk High, Bearish=Prices Down/Oversupply).
     6. A list of VERIFIED critical logistical shipping routes or "Choke Points" is provided below. You MUST use EXACTLY these choke points. Evaluate the current threat to each.
     
-    {verified_producers_str}
+    {producers}
     
-    {verified_refiners_str}
+    {refiners}
     
-    {verified_choke_points_str}
+    {choke_points}
     
     REQUIRED JSON STRUCTURE:
     {{
@@ -169,29 +142,27 @@ def fetch_market_risk(commodity, key, base_url, model):
         ]
     }}
     """
-    
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze Supply Chain Risk for: {sanitize_input(commodity, 100)}"}
-            ]
-        )
-        result = clean_json(response.choices[0].message.content)
-        if isinstance(result, dict):
-            result["producer_source"] = producer_source
-            result["refiner_source"] = refiner_source
-            result["choke_point_source"] = choke_point_source
-        return result
-    except Exception as e:
-        return {"error": str(e)}
 
-def generate_dynamic_graph_data(event_description, key, base_url, model):
-    if not key: return {"error": "API Key is missing."}
-    client = _make_client(key, base_url)
+COUNTRY_TENSION_SYSTEM_PROMPT = """
+    You are a Global Commodity Risk Analyst. Return STRICT JSON.
     
-    system_prompt = """
+    TASK:
+    For each country listed, rate its CURRENT geopolitical tension/conflict level (0-100) as it affects that country's ability to produce, refine and export commodities.
+    Return every listed country exactly once, spelled exactly as provided.
+    
+    REQUIRED JSON STRUCTURE:
+    {
+        "countries": [
+            {
+                "country": "String (Must match provided list exactly)",
+                "tension_index": Integer (0-100),
+                "risk_note": "String (Specific conflict affecting supply, max 1 sentence)"
+            }
+        ]
+    }
+    """
+
+GRAPH_SYSTEM_PROMPT = """
     You are an expert supply chain analyst and systems dynamics modeler. Return STRICT JSON.
     
     TASK:
@@ -218,32 +189,38 @@ def generate_dynamic_graph_data(event_description, key, base_url, model):
         ]
     }
     """
-    
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Map the cascading supply chain reactions for this event: {sanitize_input(event_description, 200)}"}
-            ]
-        )
-        return clean_json(response.choices[0].message.content)
-    except Exception as e:
-        return {"error": str(e)}
 
-def expand_dynamic_graph_data(existing_graph_json, key, base_url, model):
-    if not key: return {"error": "API Key is missing."}
-    client = _make_client(key, base_url)
+GRAPH_STREAM_SYSTEM_PROMPT = """
+    You are an expert supply chain analyst and systems dynamics modeler. Return JSON LINES.
     
-    system_prompt = """
+    TASK:
+    Given a Black Swan event description, map out a complex, multi-tiered supply chain reaction network.
+    Show how the event cascades through different entities (Logistics, Industry, Sellers, Consumers, Governments, Commodities).
+    
+    Generate at least 12-15 interconnected nodes and edges.
+    
+    OUTPUT FORMAT:
+    Write exactly one JSON object per line: no surrounding array, no Markdown, no commentary.
+    Start with the event node, then grow the cascade outward: write each new node, immediately followed by the edges linking it to nodes already written.
+    
+    Node line:
+    {"type": "node", "id": "String (Unique identifier, e.g. 'Event', 'Maersk')", "label": "String (Display name)", "group": "String (Must be one of: 'Event', 'Logistics', 'Industry', 'Retail', 'Consumer', 'Commodity', 'Government')"}
+    Edge line:
+    {"type": "edge", "source": "String (Must match a node id)", "target": "String (Must match a node id)", "label": "String (Action/Reaction, e.g. 'HALTS', 'PANIC_BUYS')"}
+    """
+
+# Concurrent expansion calls per round in branch mode (the provider semaphore still applies)
+EXPAND_BRANCHES = int(os.environ.get("GEOPULSE_EXPAND_BRANCHES", "4"))
+
+EXPAND_SYSTEM_PROMPT = """
     You are an expert supply chain analyst and systems dynamics modeler. Return STRICT JSON.
     
     TASK:
-    You will be provided with an existing JSON graph of a supply chain reaction network.
-    Your job is to ITERATE and EXPAND the graph by identifying the "leaf nodes" (nodes that don't have many outgoing edges) and generating 5-10 NEW cascading consequences that stem from them.
+    You will be provided with a compact summary of an existing supply chain reaction network: the root event, its size and sector mix, and its "frontier" (leaf nodes that don't have many outgoing edges yet, each with the causes that led to it).
+    Your job is to ITERATE and EXPAND the graph by generating 5-10 NEW cascading consequences that stem from the frontier nodes.
     
-    Do NOT return the old nodes and edges. Return ONLY the NEW nodes and NEW edges.
-    Make sure the 'source' of your new edges exactly matches the 'id' of existing nodes in the provided graph, or the 'id' of new nodes you create.
+    Do NOT return the frontier nodes. Return ONLY the NEW nodes and NEW edges.
+    Make sure the 'source' of your new edges exactly matches the 'id' of a frontier node, or the 'id' of new nodes you create.
     
     REQUIRED JSON STRUCTURE:
     {
@@ -263,90 +240,548 @@ def expand_dynamic_graph_data(existing_graph_json, key, base_url, model):
         ]
     }
     """
-    
+
+def _flight_key(key, base_url, model, messages):
+    # Prompts are built from resolved/sanitized inputs, so identical questions hash identically.
+    # The key is part of it: callers only share a provider call made with their own credentials
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+    return (base_url or "", model, key_fingerprint(key or ""), digest)
+
+def _chat(key, base_url, model, messages):
+    """Completion text for ``messages``; identical concurrent requests share one provider call.
+
+    The call runs under the ``src.resilience`` policy: per-attempt timeout, backoff
+    retries, optional hedging and failover to the fallback provider/model.
+    """
+    def attempt(target, timeout):
+        target_key, target_url, target_model = target
+        response = get_client(target_key, target_url).chat.completions.create(model=target_model, messages=messages, timeout=timeout)
+        return response.choices[0].message.content
+    return flights.do(_flight_key(key, base_url, model, messages), lambda: call(attempt, key, base_url, model))
+
+async def _achat(key, base_url, model, messages):
+    async def attempt(target, timeout):
+        target_key, target_url, target_model = target
+        # The per-provider semaphore bounds every async call, whoever fans it out
+        async with provider_semaphore(target_url):
+            response = await get_async_client(target_key, target_url).chat.completions.create(
+                model=target_model, messages=messages, timeout=timeout)
+        return response.choices[0].message.content
+    return await flights.ado(_flight_key(key, base_url, model, messages), lambda: acall(attempt, key, base_url, model))
+
+def _open_stream(key, base_url, model, messages):
+    """Start a streamed completion; opening it is retried like any call, but never hedged."""
+    def attempt(target, timeout):
+        target_key, target_url, target_model = target
+        return get_client(target_key, target_url).chat.completions.create(
+            model=target_model, messages=messages, stream=True, timeout=timeout)
+    return call(attempt, key, base_url, model, hedge=False)
+
+def _stream_json(key, base_url, model, messages):
+    """Stream a completion, yielding ``("field", (key, value))`` as top-level members complete.
+
+    Ends with ``("done", full_text)``, or ``("error", message)`` if a refusal is detected,
+    in which case the stream is closed without waiting for the rest of the tokens.
+    """
+    parser = IncrementalJSONParser()
+    parts = []
+    stream = _open_stream(key, base_url, model, messages)
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            parts.append(delta)
+            for member in parser.feed(delta):
+                yield "field", member
+            if parser.refused:
+                yield "error", REFUSAL_ERROR
+                return
+            if parser.complete:
+                break
+    finally:
+        stream.close()
+    yield "done", "".join(parts)
+
+def _stream_lines(key, base_url, model, messages):
+    """Stream a line-delimited JSON completion, yielding ``("record", dict)`` as each line completes.
+
+    Ends with ``("done", full_text)``, or ``("error", message)`` if a refusal is detected,
+    in which case the stream is closed without waiting for the rest of the tokens.
+    """
+    parser = JSONLinesParser()
+    parts = []
+    stream = _open_stream(key, base_url, model, messages)
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            parts.append(delta)
+            for record in parser.feed(delta):
+                yield "record", record
+            if parser.refused:
+                yield "error", REFUSAL_ERROR
+                return
+    finally:
+        stream.close()
+    for record in parser.close():
+        yield "record", record
+    if parser.refused:
+        yield "error", REFUSAL_ERROR
+        return
+    yield "done", "".join(parts)
+
+# --- Regional analysis ---
+
+def _analysis_messages(e1, e2):
+    user_prompt = (
+        f"Analyze {e1.name} vs {e2.name}. compare TODAY vs 1 YEAR AGO. "
+        "Provide specific tension scores for both timeframes. "
+        "For trade_deficit, provide a single number in Billions (USD)."
+    )
+    return [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _analysis_pair(c1, c2, base_url, model):
+    """Resolve both inputs; returns ``(first, second, swapped, cache_key)`` in canonical pair order."""
+    # "USA", "U.S." and "america" all resolve to the same entity, prompt and cache entry
+    e1, e2 = resolve_entity(c1), resolve_entity(c2)
+    cache_key, swapped = _pair_cache_key(e1, e2, base_url, model)
+    first, second = (e2, e1) if swapped else (e1, e2)
+    return first, second, swapped, cache_key
+
+def _for_caller(data, swapped):
+    return _swap_flags(dict(data)) if swapped and "error" not in data else data
+
+def cached_analysis(c1, c2, base_url, model):
+    """Cached ``fetch_analysis`` result for this pair, or None. Never calls the provider."""
+    _, _, swapped, cache_key = _analysis_pair(c1, c2, base_url, model)
+    cached = analysis_cache.get(cache_key)
+    return _for_caller(cached, swapped) if cached is not None else None
+
+def _finish_analysis(content, first, second, cache_key):
+    data = clean_json(content)
+    if not data: return {"error": "Failed to parse AI response."}
+    if isinstance(data, dict) and "error" not in data:
+        # Known entities carry their ISO flag; keep the model's emoji otherwise
+        if first.flag: data["c1_flag"] = first.flag
+        if second.flag: data["c2_flag"] = second.flag
+        analysis_cache.set(cache_key, data)
+    return data
+
+def fetch_analysis(c1, c2, key, base_url, model, use_cache=True):
+    if not key: return {"error": "API Key is missing."}
+    # The provider is always asked in canonical pair order, so reversed pairs share
+    # one cache entry and one in-flight request; flags are swapped per caller
+    first, second, swapped, cache_key = _analysis_pair(c1, c2, base_url, model)
+    data = analysis_cache.get(cache_key) if use_cache else None
+    if data is None:
+        try:
+            content = _chat(key, base_url, model, _analysis_messages(first, second))
+            data = _finish_analysis(content, first, second, cache_key)
+        except Exception as e:
+            data = {"error": describe_error(e)}
+    return _for_caller(data, swapped)
+
+async def afetch_analysis(c1, c2, key, base_url, model, use_cache=True):
+    if not key: return {"error": "API Key is missing."}
+    first, second, swapped, cache_key = _analysis_pair(c1, c2, base_url, model)
+    data = analysis_cache.get(cache_key) if use_cache else None
+    if data is None:
+        try:
+            content = await _achat(key, base_url, model, _analysis_messages(first, second))
+            data = _finish_analysis(content, first, second, cache_key)
+        except Exception as e:
+            data = {"error": describe_error(e)}
+    return _for_caller(data, swapped)
+
+def stream_analysis(c1, c2, key, base_url, model, use_cache=True):
+    """Streaming ``fetch_analysis``: yields ``("field", (key, value))`` as each field completes,
+    then ``("done", data)`` or ``("error", message)``.
+
+    Cache hits, and callers that join an identical in-flight request, replay the finished result.
+    """
+    if not key:
+        yield "error", "API Key is missing."
+        return
+    first, second, swapped, cache_key = _analysis_pair(c1, c2, base_url, model)
+    data = analysis_cache.get(cache_key) if use_cache else None
+    if data is None:
+        messages = _analysis_messages(first, second)
+        flight_key = _flight_key(key, base_url, model, messages)
+        leader, call = flights.begin(flight_key)
+        if leader:
+            yield from _stream_analysis_leader(flight_key, call, messages, first, second, swapped, cache_key, key, model)
+            return
+        try:
+            data = _finish_analysis(flights.wait(call), first, second, cache_key)
+        except Exception as e:
+            data = {"error": describe_error(e)}
+    if "error" in data:
+        yield "error", data["error"]
+        return
+    data = _for_caller(data, swapped)
+    for member in data.items():
+        yield "field", member
+    yield "done", data
+
+def _stream_analysis_leader(flight_key, call, messages, first, second, swapped, cache_key, key, model):
+    flags = {"c1_flag": first.flag, "c2_flag": second.flag}
+    # Fields stream in canonical order; rename the flag fields for a reversed caller
+    rename = {"c1_flag": "c2_flag", "c2_flag": "c1_flag"} if swapped else {}
+    base_url = flight_key[0] or None
+    content, error = None, RuntimeError("Stream interrupted.")
+    try:
+        for event, payload in _stream_json(key, base_url, model, messages):
+            if event == "field":
+                field, value = payload
+                yield "field", (rename.get(field, field), flags.get(field) or value)
+            elif event == "error":
+                error = RuntimeError(payload)
+                yield "error", payload
+                return
+            else:
+                content, error = payload, None
+        data = _finish_analysis(content, first, second, cache_key)
+        if "error" in data:
+            yield "error", data["error"]
+        else:
+            yield "done", _for_caller(data, swapped)
+    except Exception as e:
+        error = e
+        yield "error", describe_error(e)
+    finally:
+        # Followers waiting on the same request get the raw completion text
+        flights.finish(flight_key, call, result=content, error=error)
+
+# --- Global rankings ---
+
+def _rankings_messages():
+    return [{"role": "system", "content": RANKINGS_SYSTEM_PROMPT}, {"role": "user", "content": "Global Geopolitical Rankings 2025"}]
+
+def fetch_global_rankings(key, base_url, model):
+    if not key: return None
+    try:
+        return clean_json(_chat(key, base_url, model, _rankings_messages()))
+    except Exception as e: return {"error": describe_error(e)}
+
+async def afetch_global_rankings(key, base_url, model):
+    if not key: return None
+    try:
+        return clean_json(await _achat(key, base_url, model, _rankings_messages()))
+    except Exception as e: return {"error": describe_error(e)}
+
+def _pair_reasons_messages(pairs):
+    listing = "\n".join(f"- {sanitize_input(p['pair'], 120)} (Score: {p['score']})" for p in pairs)
+    return [{"role": "system", "content": PAIR_REASONS_SYSTEM_PROMPT}, {"role": "user", "content": f"Pairs:\n{listing}"}]
+
+def _finish_pair_reasons(content):
+    data = clean_json(content)
+    if not isinstance(data, dict) or "error" in data:
+        return data if isinstance(data, dict) else {"error": "Failed to parse AI response."}
+    return {r["pair"]: r.get("reason", "") for r in data.get("reasons", []) if isinstance(r, dict) and r.get("pair")}
+
+def fetch_pair_reasons(pairs, key, base_url, model):
+    """One batched call filling a context sentence for each locally ranked pair; returns {"A vs B": reason}."""
+    if not key: return {"error": "API Key is missing."}
+    if not pairs: return {}
+    try:
+        return _finish_pair_reasons(_chat(key, base_url, model, _pair_reasons_messages(pairs)))
+    except Exception as e: return {"error": describe_error(e)}
+
+async def afetch_pair_reasons(pairs, key, base_url, model):
+    if not key: return {"error": "API Key is missing."}
+    if not pairs: return {}
+    try:
+        return _finish_pair_reasons(await _achat(key, base_url, model, _pair_reasons_messages(pairs)))
+    except Exception as e: return {"error": describe_error(e)}
+
+# --- Market risk ---
+
+@functools.lru_cache(maxsize=64)
+def _market_system_prompt(record):
+    # Records are immutable and replaced on reload, so each one formats its prompt once
+    if record is None:
+        return MARKET_RISK_SYSTEM_PROMPT.format(producers=NO_DATA, refiners=NO_DATA, choke_points=NO_DATA)
+    return MARKET_RISK_SYSTEM_PROMPT.format(producers=record.producers_prompt, refiners=record.refiners_prompt,
+                                            choke_points=record.choke_points_prompt)
+
+def _market_risk_request(commodity):
+    """Build the prompt for ``commodity``; returns (messages, sources, record)."""
+    record = get_commodity_index().get(commodity)
+    messages = [
+        {"role": "system", "content": _market_system_prompt(record)},
+        {"role": "user", "content": f"Analyze Supply Chain Risk for: {sanitize_input(commodity, 100)}"}
+    ]
+    sources = record.sources if record else {"producer_source": UNKNOWN_SOURCE, "refiner_source": UNKNOWN_SOURCE,
+                                             "choke_point_source": UNKNOWN_SOURCE}
+    return messages, sources, record
+
+def _finish_market_risk(content, sources, record):
+    result = clean_json(content)
+    if isinstance(result, dict):
+        result.update(sources)
+        if record is not None and "error" not in result:
+            from src.risk import market_inputs, risk_model  # Deferred: numpy is only needed once a score comes back
+            # The model only supplies per-entity tension and threat; the score is computed from the verified shares
+            scored = risk_model(record).score(*market_inputs(result))
+            if scored["global_risk_score"] is not None:
+                result["model_risk_score"] = result.get("global_risk_score")
+                result.update(scored)
+    return result
+
+def fetch_market_risk(commodity, key, base_url, model):
+    if not key: return {"error": "API Key Missing"}
+    messages, sources, record = _market_risk_request(commodity)
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Here is the existing graph. Expand it by adding new cascading reactions:\n{json.dumps(existing_graph_json)}"}
-            ]
-        )
-        return clean_json(response.choices[0].message.content)
+        return _finish_market_risk(_chat(key, base_url, model, messages), sources, record)
     except Exception as e:
-        return {"error": str(e)}
-
-def run_oasis_panic_simulation(scenario, api_key, model_choice, base_url=None):
-    if not CAMEL_AVAILABLE:
-        return [{"role": "System", "content": "CAMEL-AI library is not installed."}]
-    if not api_key:
-        return [{"role": "System", "content": "API Key is missing."}]
-        
+        return {"error": describe_error(e)}
+
+async def afetch_market_risk(commodity, key, base_url, model):
+    if not key: return {"error": "API Key Missing"}
+    messages, sources, record = _market_risk_request(commodity)
     try:
-        if "gemini" in model_choice.lower():
-            camel_model_type = ModelType.GEMINI_2_5_FLASH
-            if "pro" in model_choice.lower() and "2.5" in model_choice.lower():
-                camel_model_type = ModelType.GEMINI_2_5_PRO
-            model = ModelFactory.create(
-                model_platform=ModelPlatformType.GEMINI,
-                model_type=camel_model_type,
-                api_key=api_key,
-                model_config_dict={"temperature": 0.7}
-            )
+        return _finish_market_risk(await _achat(key, base_url, model, messages), sources, record)
+    except Exception as e:
+        return {"error": describe_error(e)}
+
+def _tension_cache_key(entity, base_url, model):
+    return (base_url or "", model, entity.id)
+
+def _country_tension_messages(entities):
+    listing = "\n".join(f"- {e.name}" for e in entities)
+    return [{"role": "system", "content": COUNTRY_TENSION_SYSTEM_PROMPT}, {"role": "user", "content": f"Countries:\n{listing}"}]
+
+def _finish_country_tensions(content, entities, base_url, model):
+    data = clean_json(content)
+    if not isinstance(data, dict) or "error" in data:
+        return data if isinstance(data, dict) else {"error": "Failed to parse AI response."}
+    by_id = {e.id: e for e in entities}
+    scored = {}
+    for row in data.get("countries", []):
+        if not isinstance(row, dict):
+            continue
+        entity = by_id.get(resolve_entity(row.get("country", "")).id)
+        try:
+            score = min(max(float(row.get("tension_index")), 0.0), 100.0)
+        except (TypeError, ValueError):
+            continue
+        if entity is None:
+            continue
+        scored[entity.id] = {"tension_index": score, "risk_note": str(row.get("risk_note", ""))}
+        tension_cache.set(_tension_cache_key(entity, base_url, model), scored[entity.id])
+    return scored
+
+def fetch_country_tensions(countries, key, base_url, model, use_cache=True):
+    """Current tension per country: ``{entity_id: {"tension_index", "risk_note"}}``.
+
+    Countries still in ``tension_cache`` are not asked again; all the others are
+    scored together in one batched call. Countries the model skipped are left out.
+    """
+    if not key: return {"error": "API Key is missing."}
+    entities = {}
+    for name in countries:
+        entity = resolve_entity(name)
+        entities.setdefault(entity.id, entity)
+    result, pending = {}, []
+    for entity in entities.values():
+        cached = tension_cache.get(_tension_cache_key(entity, base_url, model)) if use_cache else None
+        if cached is not None:
+            result[entity.id] = cached
         else:
-            # Route all other providers (Perplexity, DeepSeek, OpenAI) through the OpenAI-compatible default platform
-            kwargs = {
-                "model_platform": ModelPlatformType.DEFAULT,
-                "model_type": model_choice, # CAMEL accepts raw model strings for custom endpoints
-                "api_key": api_key,
-                "model_config_dict": {"temperature": 0.7}
-            }
-            if base_url:
-                kwargs["url"] = base_url
-            model = ModelFactory.create(**kwargs)
-            
+            pending.append(entity)
+    if pending:
+        # Sorted so that identical scans build identical prompts and share one in-flight call
+        pending.sort(key=lambda e: e.name)
+        try:
+            scored = _finish_country_tensions(_chat(key, base_url, model, _country_tension_messages(pending)),
+                                              pending, base_url, model)
+        except Exception as e:
+            scored = {"error": describe_error(e)}
+        if "error" in scored:
+            return scored
+        result.update(scored)
+    return result
+
+# --- Black Swan graph ---
+
+def _graph_messages(event_description, system_prompt=GRAPH_SYSTEM_PROMPT):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Map the cascading supply chain reactions for this event: {sanitize_input(event_description, 200)}"}
+    ]
+
+def generate_dynamic_graph_data(event_description, key, base_url, model):
+    if not key: return {"error": "API Key is missing."}
+    try:
+        return clean_json(_chat(key, base_url, model, _graph_messages(event_description)))
     except Exception as e:
-        return [{"role": "System", "content": f"Failed to init model: {str(e)}"}]
+        return {"error": describe_error(e)}
 
-    task_prompt = (
-        f"A major global crisis has occurred: {scenario}. "
-        "Discuss the immediate impact on local supply chains, what items will run out first, and how consumers are reacting."
-    )
-    
+async def agenerate_dynamic_graph_data(event_description, key, base_url, model):
+    if not key: return {"error": "API Key is missing."}
     try:
-        role_play_session = RolePlaying(
-            assistant_role_name="Local Retail Store Manager",
-            user_role_name="Anxious Consumer",
-            assistant_agent_kwargs=dict(model=model),
-            user_agent_kwargs=dict(model=model),
-            task_prompt=task_prompt,
-            with_task_specify=False
-        )
-        
-        chat_history = []
-        input_msg = role_play_session.init_chat()
-        
-        chat_turn_limit = 3
-        for _ in range(chat_turn_limit):
-            assistant_response, user_response = role_play_session.step(input_msg)
-            
-            # Record user (Consumer)
-            chat_history.append({
-                "role": "Consumer", 
-                "content": user_response.msg.content.replace("Instruction:", "").strip()
-            })
-            
-            # Record assistant (Manager)
-            chat_history.append({
-                "role": "Manager", 
-                "content": assistant_response.msg.content
-            })
-            
-            input_msg = assistant_response.msg
-            
-            if "TERMINATE" in assistant_response.msg.content:
-                break
-                
-        return chat_history
+        return clean_json(await _achat(key, base_url, model, _graph_messages(event_description)))
     except Exception as e:
-        return [{"role": "System", "content": f"Simulation Error: {str(e)}"}]
+        return {"error": describe_error(e)}
+
+def _graph_records(records):
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        if "nodes" in record or "edges" in record:
+            yield from (item for item in list(record.get("nodes") or []) + list(record.get("edges") or [])
+                        if isinstance(item, dict))
+        else:
+            yield record
+
+def _graph_events(records):
+    """``("node", node)`` and ``("edge", edge)`` events for streamed graph records.
+
+    Repeated nodes are skipped and each edge is held back until both of its endpoints
+    have been yielded, so every event can be merged into an ``ImpactGraph`` on arrival.
+    Edges whose endpoints never appear are dropped. A record holding a whole
+    ``{"nodes", "edges"}`` document (a model ignoring the line format) is unpacked.
+    """
+    ids, pending = set(), []
+    for record in _graph_records(records):
+        item = {k: v for k, v in record.items() if k != "type"}
+        if item.get("source") and item.get("target"):
+            pending.append(item)
+        elif item.get("id") and item["id"] not in ids:
+            ids.add(item["id"])
+            yield "node", item
+        else:
+            continue
+        ready = [edge for edge in pending if edge["source"] in ids and edge["target"] in ids]
+        for edge in ready:
+            pending.remove(edge)
+            yield "edge", edge
+
+def _finish_graph_stream(content, graph):
+    """Events still owed for a finished completion, then ``("done", graph)`` or ``("error", message)``.
+
+    ``graph`` holds what was already yielded. When nothing was (a follower of a shared
+    request, or a model that answered with one ``{"nodes", "edges"}`` document instead
+    of JSON lines), the whole text is replayed.
+    """
+    if not graph["nodes"]:
+        parser = JSONLinesParser()
+        records = parser.feed(content) + parser.close()
+        if not any(kind == "node" for kind, _ in _graph_events(records)):
+            # No usable line records (e.g. a pretty-printed document): parse the text as a whole
+            data = clean_json(content)
+            if not isinstance(data, dict) or "error" in data:
+                yield "error", data["error"] if isinstance(data, dict) else "Failed to parse AI response."
+                return
+            records = [data]
+        for kind, item in _graph_events(records):
+            graph[kind + "s"].append(item)
+            yield kind, item
+    if not graph["nodes"]:
+        yield "error", "Failed to parse AI response."
+        return
+    yield "done", graph
+
+def stream_dynamic_graph_data(event_description, key, base_url, model):
+    """Streaming ``generate_dynamic_graph_data``: the model writes one node or edge per line,
+    and ``("node", node)`` / ``("edge", edge)`` are yielded as each line completes, then
+    ``("done", {"nodes", "edges"})`` or ``("error", message)``.
+
+    Callers that join an identical in-flight request replay the finished result.
+    """
+    if not key:
+        yield "error", "API Key is missing."
+        return
+    messages = _graph_messages(event_description, GRAPH_STREAM_SYSTEM_PROMPT)
+    flight_key = _flight_key(key, base_url, model, messages)
+    leader, call = flights.begin(flight_key)
+    if leader:
+        yield from _stream_graph_leader(flight_key, call, messages, key, model)
+        return
+    try:
+        content = flights.wait(call)
+    except Exception as e:
+        yield "error", describe_error(e)
+        return
+    yield from _finish_graph_stream(content, {"nodes": [], "edges": []})
+
+def _stream_graph_leader(flight_key, call, messages, key, model):
+    base_url = flight_key[0] or None
+    graph = {"nodes": [], "edges": []}
+    content, error = None, RuntimeError("Stream interrupted.")
+
+    def records():
+        nonlocal content, error
+        for event, payload in _stream_lines(key, base_url, model, messages):
+            if event == "record":
+                yield payload
+            elif event == "error":
+                error = RuntimeError(payload)
+                return
+            else:
+                content, error = payload, None
+
+    try:
+        for kind, item in _graph_events(records()):
+            graph[kind + "s"].append(item)
+            yield kind, item
+        if content is None:
+            yield "error", str(error)
+            return
+        yield from _finish_graph_stream(content, graph)
+    except Exception as e:
+        error = e
+        yield "error", describe_error(e)
+    finally:
+        # Followers waiting on the same request get the raw completion text
+        flights.finish(flight_key, call, result=content, error=error)
+
+def _as_graph(graph_data):
+    return graph_data if isinstance(graph_data, ImpactGraph) else ImpactGraph.from_data(graph_data)
+
+def _expand_messages(existing_graph_json, frontier=None):
+    # Only the frontier and a bounded summary are sent, so prompt size stays flat as the graph grows
+    context = _as_graph(existing_graph_json).expansion_context(frontier=frontier)
+    return [
+        {"role": "system", "content": EXPAND_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Here is the existing graph's frontier. Expand it by adding new cascading reactions:\n{json.dumps(context)}"}
+    ]
+
+def expand_dynamic_graph_data(existing_graph_json, key, base_url, model):
+    if not key: return {"error": "API Key is missing."}
+    try:
+        return clean_json(_chat(key, base_url, model, _expand_messages(existing_graph_json)))
+    except Exception as e:
+        return {"error": describe_error(e)}
+
+async def aexpand_dynamic_graph_data(existing_graph_json, key, base_url, model):
+    if not key: return {"error": "API Key is missing."}
+    try:
+        return clean_json(await _achat(key, base_url, model, _expand_messages(existing_graph_json)))
+    except Exception as e:
+        return {"error": describe_error(e)}
+
+def expand_graph_branches(existing_graph_json, key, base_url, model, branches=EXPAND_BRANCHES):
+    """Expand each frontier branch with its own concurrent call.
+
+    Returns one result per branch, in branch order: new ``nodes``/``edges`` or
+    ``{"error": ...}``. Merge the successful ones together with
+    ``ImpactGraph.merge_round`` so IDs that collide across branches are resolved.
+    """
+    if not key: return [{"error": "API Key is missing."}]
+    graph = _as_graph(existing_graph_json)
+    # Prompts are built here, before the branches start running on the loop thread
+    prompts = [_expand_messages(graph, frontier) for frontier in graph.branches(branches)]
+
+    async def expand(messages):
+        try:
+            return clean_json(await _achat(key, base_url, model, messages))
+        except Exception as e:
+            return {"error": describe_error(e)}
+
+    return run_all([expand(messages) for messages in prompts])
@@ -0,0 +1,90 @@
+import copy
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _approx_size(value):
+    """Rough in-memory footprint of a JSON-like value, in bytes."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and a total size cap.
+
+    Shared across Streamlit sessions, so values are deep-copied on the way in and
+    out; callers can freely mutate what they get back.
+    """
+
+    def __init__(self, ttl=900, max_entries=512, max_bytes=8 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            value = entry[2]
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ttl=None):
+        size = _approx_size(value)
+        if size > self.max_bytes:
+            return  # A single oversized value would evict everything else
+        value = copy.deepcopy(value)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def items(self):
+        """Snapshot of live (key, value) pairs, oldest first."""
+        now = time.monotonic()
+        with self._lock:
+            live = [(k, e[2]) for k, e in self._data.items() if e[0] > now]
+        return [(k, copy.deepcopy(v)) for k, v in live]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+    def _drop(self, key):
+        # Caller must hold the lock
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+import time
+
+from src import aio
+from src.utils import _make_async_client, _make_client
+
+# Pool limits are process-wide; override via environment before the first call.
+POOL_MAX_CONNECTIONS = int(os.environ.get("GEOPULSE_POOL_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE = int(os.environ.get("GEOPULSE_POOL_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.environ.get("GEOPULSE_POOL_KEEPALIVE_EXPIRY", "30"))
+CLIENT_IDLE_TTL = float(os.environ.get("GEOPULSE_CLIENT_IDLE_TTL", "900"))
+
+
+def key_fingerprint(key: str) -> str:
+    """Short, non-reversible identifier for an API key (never store the raw key as a dict key)."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class ClientRegistry:
+    """Process-wide pool of OpenAI-compatible clients keyed by (base_url, key fingerprint).
+
+    Each entry owns one keep-alive httpx connection pool, so repeated scans reuse
+    warm TLS connections instead of re-handshaking. Clients are thread-safe and are
+    shared across Streamlit sessions; entries idle for longer than ``idle_ttl`` are
+    closed on the next lookup.
+    """
+
+    def __init__(self, max_connections=POOL_MAX_CONNECTIONS, max_keepalive=POOL_MAX_KEEPALIVE,
+                 keepalive_expiry=POOL_KEEPALIVE_EXPIRY, idle_ttl=CLIENT_IDLE_TTL):
+        self._lock = threading.Lock()
+        self._entries = {}  # (kind, base_url, fingerprint) -> [client, http_client, last_used]
+        self.configure(max_connections, max_keepalive, keepalive_expiry, idle_ttl)
+
+    def configure(self, max_connections=None, max_keepalive=None, keepalive_expiry=None, idle_ttl=None):
+        """Update pool limits. Only affects clients created after the call."""
+        with self._lock:
+            # Kept as plain values: httpx is only imported once the first client is built
+            current = getattr(self, "limits", None)
+            self.limits = {
+                "max_connections": max_connections if max_connections is not None else current["max_connections"],
+                "max_keepalive_connections": max_keepalive if max_keepalive is not None else current["max_keepalive_connections"],
+                "keepalive_expiry": keepalive_expiry if keepalive_expiry is not None else current["keepalive_expiry"],
+            }
+            if idle_ttl is not None:
+                self.idle_ttl = idle_ttl
+
+    def get(self, key: str, base_url=None, is_async=False):
+        """Return the shared client for this provider/key, creating it on first use.
+
+        Async clients are bound to the ``src.aio`` bridge loop and must only be awaited there.
+        """
+        entry_key = ("async" if is_async else "sync", base_url or "", key_fingerprint(key))
+        now = time.monotonic()
+        with self._lock:
+            stale = self._pop_idle(now)
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                import httpx  # Deferred: pages that never call a provider don't pay for it
+                limits = httpx.Limits(**self.limits)
+                if is_async:
+                    http_client = httpx.AsyncClient(limits=limits)
+                    client = _make_async_client(key, base_url, http_client=http_client)
+                else:
+                    http_client = httpx.Client(limits=limits)
+                    client = _make_client(key, base_url, http_client=http_client)
+                entry = [client, http_client, now]
+                self._entries[entry_key] = entry
+            entry[2] = now
+            client = entry[0]
+        self._close(stale)
+        return client
+
+    def evict_idle(self):
+        """Close and drop every client that has been idle longer than ``idle_ttl``."""
+        with self._lock:
+            stale = self._pop_idle(time.monotonic())
+        self._close(stale)
+        return len(stale)
+
+    def close_all(self):
+        with self._lock:
+            stale = list(self._entries.values())
+            self._entries.clear()
+        self._close(stale)
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._entries), "max_connections": self.limits["max_connections"],
+                    "max_keepalive": self.limits["max_keepalive_connections"], "idle_ttl": self.idle_ttl}
+
+    def _pop_idle(self, now):
+        # Caller must hold the lock
+        expired = [k for k, e in self._entries.items() if now - e[2] > self.idle_ttl]
+        return [self._entries.pop(k) for k in expired]
+
+    @staticmethod
+    def _close(entries):
+        for entry in entries:
+            try:
+                if hasattr(entry[1], "aclose"):
+                    aio.submit(entry[1].aclose())
+                else:
+                    entry[1].close()
+            except Exception:
+                pass  # Non-critical if an idle pool fails to close cleanly
+
+
+_registry = ClientRegistry()
+
+
+def get_client(key: str, base_url=None):
+    """Shared, pooled client for (base_url, key). Drop-in replacement for ``_make_client``."""
+    return _registry.get(key, base_url)
+
+
+def get_async_client(key: str, base_url=None):
+    """Shared, pooled ``AsyncOpenAI`` client for (base_url, key), bound to the ``src.aio`` loop."""
+    return _registry.get(key, base_url, is_async=True)
+
+
+def configure_pool(**limits):
+    _registry.configure(**limits)
+
+
+def pool_stats():
+    return _registry.stats()
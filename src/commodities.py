@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+import time
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'verified_production.json')
+
+# How often (seconds) a lookup may stat the data file to check for edits
+RELOAD_CHECK_INTERVAL = float(os.environ.get("GEOPULSE_COMMODITY_RELOAD_INTERVAL", "2"))
+
+NO_DATA = "No verified data found. Use your own knowledge."
+UNKNOWN_SOURCE = "Unknown Source"
+
+_PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+
+
+class CommodityDataError(ValueError):
+    """verified_production.json does not match the expected schema."""
+
+
+def parse_percent(text):
+    """First percentage in ``text`` as a float ("~60% of unrefined gold" -> 60.0), or None."""
+    match = _PERCENT.search(str(text))
+    return float(match.group(1)) if match else None
+
+
+class ShareRecord:
+    __slots__ = ("country", "share", "share_pct")
+
+    def __init__(self, country, share):
+        self.country = country
+        self.share = share
+        self.share_pct = parse_percent(share)
+
+
+class ChokePointRecord:
+    __slots__ = ("name", "volume_flow", "reliance_level", "volume_pct")
+
+    def __init__(self, name, volume_flow, reliance_level):
+        self.name = name
+        self.volume_flow = volume_flow
+        self.reliance_level = reliance_level
+        self.volume_pct = parse_percent(volume_flow)
+
+
+class CommodityRecord:
+    """One verified commodity entry with its prompt fragments prebuilt."""
+    __slots__ = ("name", "producer_source", "refiner_source", "choke_point_source",
+                 "producers", "refiners", "choke_points",
+                 "producers_prompt", "refiners_prompt", "choke_points_prompt")
+
+    def __init__(self, name, item):
+        self.name = name
+        self.producer_source = item.get("producer_source", item.get("source", UNKNOWN_SOURCE))
+        self.refiner_source = item.get("refiner_source", UNKNOWN_SOURCE)
+        self.choke_point_source = item.get("choke_point_source", UNKNOWN_SOURCE)
+        self.producers = tuple(ShareRecord(p["country"], p["share"]) for p in item.get("producers", []))
+        self.refiners = tuple(ShareRecord(r["country"], r["share"]) for r in item.get("refiners", []))
+        self.choke_points = tuple(ChokePointRecord(c["name"], c["volume_flow"], c["reliance_level"])
+                                  for c in item.get("choke_points", []))
+
+        self.producers_prompt = f"VERIFIED PRODUCERS FOR {name} (Source: {self.producer_source}):\n" + "".join(
+            f"- {p.country} (Share: {p.share})\n" for p in self.producers)
+        self.refiners_prompt = f"VERIFIED REFINERS/PROCESSORS FOR {name} (Source: {self.refiner_source}):\n" + "".join(
+            f"- {r.country} (Share: {r.share})\n" for r in self.refiners)
+        self.choke_points_prompt = f"VERIFIED CHOKE POINTS FOR {name} (Source: {self.choke_point_source}):\n" + "".join(
+            f"- {c.name} (Volume: {c.volume_flow}, Reliance: {c.reliance_level})\n" for c in self.choke_points)
+
+    @property
+    def sources(self):
+        return {"producer_source": self.producer_source, "refiner_source": self.refiner_source,
+                "choke_point_source": self.choke_point_source}
+
+
+def _require(cond, message):
+    if not cond:
+        raise CommodityDataError(message)
+
+
+def validate(data):
+    """Check the raw JSON against the verified_production schema; raises CommodityDataError."""
+    _require(isinstance(data, dict), "Top level must be an object keyed by commodity name.")
+    for name, item in data.items():
+        _require(isinstance(item, dict), f"{name}: entry must be an object.")
+        for key in ("producer_source", "refiner_source", "choke_point_source", "source"):
+            _require(isinstance(item.get(key, ""), str), f"{name}.{key} must be a string.")
+        for key, fields in (("producers", ("country", "share")), ("refiners", ("country", "share")),
+                            ("choke_points", ("name", "volume_flow", "reliance_level"))):
+            rows = item.get(key, [])
+            _require(isinstance(rows, list), f"{name}.{key} must be a list.")
+            for i, row in enumerate(rows):
+                _require(isinstance(row, dict) and all(isinstance(row.get(f), str) for f in fields),
+                         f"{name}.{key}[{i}] needs string fields {', '.join(fields)}.")
+
+
+class CommodityIndex:
+    """Verified commodity data, parsed and validated once and reloaded when the file changes.
+
+    Lookups only stat the file at most every ``RELOAD_CHECK_INTERVAL`` seconds; an
+    edit that fails validation keeps the last good data and is reported in ``error``.
+    """
+
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self.records = {}
+        self.error = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._reload()
+
+    def get(self, name):
+        self._maybe_reload()
+        return self.records.get(name)
+
+    def names(self):
+        self._maybe_reload()
+        return list(self.records)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < RELOAD_CHECK_INTERVAL:
+            return
+        with self._lock:
+            if now - self._checked < RELOAD_CHECK_INTERVAL:
+                return
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self._reload()
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            self.error = str(e)
+            self._mtime = None
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            validate(data)
+            records = {name: CommodityRecord(name, item) for name, item in data.items()}
+        except (OSError, ValueError, KeyError) as e:
+            # Invalid edit: keep serving the last good data until the file changes again
+            self.error = str(e)
+        else:
+            self.records = records
+            self.error = None
+        self._mtime = mtime
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_commodity_index():
+    """Process-wide commodity index, loaded on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CommodityIndex()
+    return _index
@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from src.utils import sanitize_input
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'countries.json')
+
+# Minimum trigram Jaccard similarity for a fuzzy match to be accepted
+FUZZY_THRESHOLD = 0.45
+# Short names have too few trigrams for one typo to stay above the threshold, so
+# inputs of at least this length also accept one edit (two from 8 characters on)
+EDIT_MIN_LENGTH = 5
+
+
+def normalize_name(text):
+    """Fold case, accents and punctuation so "U.S.", "u s" and "US" compare equal."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = text.replace("&", " and ")
+    text = re.sub(r"[.'’]", "", text)
+    text = re.sub(r"[^a-z0-9+]+", " ", text).strip()
+    if text.startswith("the "):
+        text = text[4:]
+    return text
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (an adjacent swap counts as one edit), or ``limit + 1`` once over ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1]
+
+
+_FILLER_WORDS = frozenset({"of", "the", "and"})
+
+
+def _token_close(a, b):
+    if a == b:
+        return True
+    if len(a) == len(b) and sorted(a) == sorted(b) and edit_distance(a, b, 1) <= 1:
+        return True  # Swapped letters, even in short words ("fo", "teh")
+    short, long = sorted((a, b), key=len)
+    if len(short) < 3:
+        return False
+    # Abbreviations ("rep" for "republic"), then typos
+    if long.startswith(short):
+        return True
+    limit = 2 if len(a) >= 8 else 1
+    return len(short) >= 4 and edit_distance(a, b, limit) <= limit
+
+
+def tokens_agree(text, alias):
+    """Whether every word of ``text`` matches a word of ``alias`` (allowing a typo) and vice versa.
+
+    Guards fuzzy matches against inputs that share a single word with an alias,
+    such as "Gulf States" or "Africa". Filler words ("of", "the", "and") are ignored,
+    and a typo that moved a space ("ofN icaragua") still agrees.
+    """
+    words, alias_words = text.split(), alias.split()
+    compact, alias_compact = "".join(words), "".join(alias_words)
+    if len(compact) == len(alias_compact) and edit_distance(compact, alias_compact, 1) <= 1:
+        return True
+    words = [w for w in words if w not in _FILLER_WORDS]
+    alias_words = [w for w in alias_words if w not in _FILLER_WORDS]
+    return (all(any(_token_close(w, a) for a in alias_words) for w in words)
+            and all(any(_token_close(w, a) for w in words) for a in alias_words))
+
+
+class Entity:
+    __slots__ = ("id", "name", "flag", "known")
+
+    def __init__(self, id, name, flag="", known=True):
+        self.id = id
+        self.name = name
+        self.flag = flag
+        self.known = known
+
+    def __repr__(self):
+        return f"Entity({self.id!r}, {self.name!r})"
+
+
+class CountryIndex:
+    """Alias index over ISO-3166 names, codes, common aliases and blocs.
+
+    Exact lookups are a single dict hit on the normalized alias; misses fall back
+    to trigram Jaccard similarity over the alias vocabulary to absorb typos, then
+    to edit distance against aliases of similar length.
+
+    >>> index = get_index()
+    >>> [index.lookup(t).name for t in ("Isreal", "Inida", "Indai", "Germnay", "Ukriane", "Japna", "Swedn", "Norwya")]
+    ['Israel', 'India', 'India', 'Germany', 'Ukraine', 'Japan', 'Sweden', 'Norway']
+    >>> index.lookup("Untied States").name
+    'United States'
+    >>> index.lookup("Atlantis") is None
+    True
+    >>> [index.lookup(t) for t in ("Gulf States", "Arab States", "Latin America", "North America",
+    ...                            "South America", "Africa", "Eastern Europe")]
+    [None, None, None, None, None, None, None]
+    """
+
+    def __init__(self, entities):
+        self.entities = {}
+        self._exact = {}
+        self._alias_grams = {}
+        self._trigram_index = defaultdict(set)
+        self._by_length = defaultdict(list)
+        for record in entities:
+            entity = Entity(record["id"], record["name"], record.get("flag", ""))
+            self.entities[entity.id] = entity
+            for alias in [entity.name, *record.get("aliases", [])]:
+                norm = normalize_name(alias)
+                # First entity to claim an alias keeps it (ISO entries load before blocs)
+                if not norm or norm in self._exact:
+                    continue
+                self._exact[norm] = entity
+                if len(norm) > 3:
+                    grams = _trigrams(norm)
+                    self._alias_grams[norm] = grams
+                    self._by_length[len(norm)].append(norm)
+                    for g in grams:
+                        self._trigram_index[g].add(norm)
+
+    @classmethod
+    def from_file(cls, path=DATA_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)["entities"])
+
+    def lookup(self, text, fuzzy=True):
+        """Return the matching Entity, or None if nothing is close enough."""
+        norm = normalize_name(text)
+        if not norm:
+            return None
+        entity = self._exact.get(norm)
+        if entity is not None or not fuzzy or len(norm) < 4:
+            return entity
+        grams = _trigrams(norm)
+        overlap = defaultdict(int)
+        for g in grams:
+            for alias in self._trigram_index.get(g, ()):
+                overlap[alias] += 1
+        best, best_score = None, FUZZY_THRESHOLD
+        for alias, shared in overlap.items():
+            score = shared / (len(grams) + len(self._alias_grams[alias]) - shared)
+            # Similar spelling is not enough: the words themselves have to correspond
+            if score >= best_score and tokens_agree(norm, alias):
+                best, best_score = alias, score
+        if best is not None:
+            return self._exact[best]
+        return self._edit_match(norm) if len(norm) >= EDIT_MIN_LENGTH else None
+
+    def _edit_match(self, norm):
+        """Entity of the closest alias within the edit limit, or None if there is none or it is ambiguous."""
+        limit = 2 if len(norm) >= 8 else 1
+        best, best_distance = set(), limit + 1
+        for length in range(len(norm) - limit, len(norm) + limit + 1):
+            for alias in self._by_length.get(length, ()):
+                if not tokens_agree(norm, alias):
+                    continue
+                distance = edit_distance(norm, alias, limit)
+                if distance < best_distance:
+                    best, best_distance = {self._exact[alias].id}, distance
+                elif distance == best_distance <= limit:
+                    best.add(self._exact[alias].id)
+        return self.entities[best.pop()] if len(best) == 1 else None
+
+    def resolve(self, text):
+        """Like ``lookup`` but never None: unknown inputs become an ad-hoc entity keyed by their normalized text."""
+        entity = self.lookup(text)
+        if entity is not None:
+            return entity
+        clean = sanitize_input(text)
+        return Entity(normalize_name(clean), clean, known=False)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index, built once on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CountryIndex.from_file()
+    return _index
+
+
+def resolve_entity(text):
+    return get_index().resolve(text)
@@ -1,102 +1,174 @@
+import hashlib
+import json
+import math
 import os
-import tempfile
-from pyvis.network import Network
 
-def generate_impact_network(scenario_name, graph_data):
-    if not graph_data or not isinstance(graph_data, dict):
+from src.cache import TTLCache
+from src.impact_graph import ImpactGraph
+from src.layout import compute_layout
+from src.lod import LOD_HOPS, build_view, view_positions
+
+# Rendered HTML keyed by graph content (ImpactGraph version or a hash of raw graph data),
+# so reruns that leave the graph untouched skip pyvis entirely
+render_cache = TTLCache(
+    ttl=int(os.environ.get("GEOPULSE_RENDER_CACHE_TTL", "3600")),
+    max_entries=int(os.environ.get("GEOPULSE_RENDER_CACHE_SIZE", "64")),
+    max_bytes=int(os.environ.get("GEOPULSE_RENDER_CACHE_BYTES", str(32 * 1024 * 1024))),
+)
+
+# Node positions per graph version, so the layout is computed once per graph
+layout_cache = TTLCache(ttl=int(os.environ.get("GEOPULSE_RENDER_CACHE_TTL", "3600")), max_entries=64)
+
+
+def graph_hash(graph_data):
+    """Stable content hash of a graph payload (key order does not matter)."""
+    payload = json.dumps(graph_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _content_key(graph):
+    # An ImpactGraph's version changes on every merge, so there is no need to hash its lists
+    return ("graph",) + graph.key if isinstance(graph, ImpactGraph) else graph_hash(graph)
+
+
+def get_layout(graph, previous=None):
+    """Cached server-side layout ``{id: (x, y)}``; nodes found in ``previous`` keep their position."""
+    key = _content_key(graph)
+    positions = layout_cache.get(key)
+    if positions is None:
+        positions = compute_layout(graph, previous)
+        layout_cache.set(key, positions)
+    return positions
+
+
+def generate_impact_network(scenario_name, graph, positions=None, expanded=(), max_hops=LOD_HOPS):
+    """Pyvis HTML for an ``ImpactGraph`` (or raw graph dict), using precomputed ``positions``.
+
+    Large graphs are drawn at a level of detail from ``src.lod``: distant nodes
+    collapse into group clusters unless their group is in ``expanded``.
+    """
+    if not isinstance(graph, ImpactGraph) and (not graph or not isinstance(graph, dict)):
         raise ValueError("generate_impact_network received invalid graph_data (None or non-dict).")
+    if positions is None:
+        positions = get_layout(graph)
+    # Keyed before a raw dict is indexed, so equal dicts share one cache entry
+    key = (_content_key(graph), tuple(sorted(expanded)), max_hops, graph_hash(positions))
+    html_content = render_cache.get(key)
+    if html_content is None:
+        if not isinstance(graph, ImpactGraph):
+            graph = ImpactGraph.from_data(graph)
+        view = build_view(graph, expanded, max_hops)
+        html_content = _render_network(view, view_positions(view, graph, positions))
+        render_cache.set(key, html_content)
+    return html_content
+
+
+# Professional color palette (bg, border)
+GROUP_COLORS = {
+    "Event":      ("#c0392b", "#922b21"),
+    "Logistics":  ("#2471a3", "#1a5276"),
+    "Industry":   ("#ca6f1e", "#a04000"),
+    "Retail":     ("#b7950b", "#9a7d0a"),
+    "Consumer":   ("#7d3c98", "#6c3483"),
+    "Commodity":  ("#1e8449", "#196f3d"),
+    "Government": ("#566573", "#4d5656"),
+}
+
+
+def node_spec(node, x, y):
+    """vis.js options for one view node (shared by the pyvis page and the live component)."""
+    n_id  = node["id"]
+    label = node["label"]
+    group = node["group"]
+    bg, border = GROUP_COLORS.get(group, ("#95a5a6", "#7f8c8d"))
+    impact, bottleneck, hops = node["impact"], node["bottleneck"], node["hops"]
+
+    if group == "Event":
+        # Prominent labeled box for the root event
+        return dict(
+            id=n_id,
+            label=f"⚡  {label}",
+            title=f"ROOT EVENT: {label}",
+            shape="box",
+            color={"background": bg, "border": border,
+                   "highlight": {"background": "#e74c3c", "border": border},
+                   "hover":     {"background": "#e74c3c", "border": border}},
+            font={"size": 15, "face": "Segoe UI, sans-serif", "color": "#ffffff", "bold": True},
+            margin={"top": 12, "bottom": 12, "left": 16, "right": 16},
+            borderWidth=3,
+            shadow={"enabled": True, "color": "rgba(192,57,43,0.4)", "size": 12, "x": 3, "y": 3},
+            x=x, y=y
+        )
+    if node["cluster"]:
+        # Collapsed cluster: dashed ring sized by how many entities it stands for
+        size = round(min(60, 24 + 6 * math.log2(node["members"])))
+        return dict(
+            id=n_id,
+            label=label,
+            title=f"{group} cluster  |  {node['members']} entities  |  peak impact {impact:.0%}  |  expand it from the graph controls",
+            shape="dot",
+            size=size,
+            color={"background": "#ffffff", "border": bg,
+                   "highlight": {"background": "#ffffff", "border": border},
+                   "hover":     {"background": "#fdfefe", "border": border}},
+            font={"size": 13, "face": "Segoe UI, sans-serif", "color": border,
+                  "bold": True, "vadjust": size + 10},
+            borderWidth=4,
+            shapeProperties={"borderDashes": [6, 4]},
+            x=x, y=y
+        )
+    # Dots sized by propagated impact, boosted for bottlenecks; label floats neatly beneath
+    size = round(18 + 22 * impact + 8 * bottleneck)
+    reach = f"{int(hops)} hop{'s' if hops != 1 else ''} from event" if hops != float("inf") else "not reached from event"
+    return dict(
+        id=n_id,
+        label=label,
+        title=f"{group}  |  impact {impact:.0%}  |  bottleneck {bottleneck:.0%}  |  {reach}",
+        shape="dot",
+        size=size,
+        color={"background": bg, "border": border,
+               "highlight": {"background": bg,     "border": "#2c3e50"},
+               "hover":     {"background": border, "border": "#2c3e50"}},
+        font={"size": 12, "face": "Segoe UI, sans-serif", "color": "#1a1a2e",
+              "bold": True, "vadjust": size + 10},
+        borderWidth=2,
+        shadow={"enabled": True, "color": "rgba(0,0,0,0.10)", "size": 5, "x": 2, "y": 2},
+        x=x, y=y
+    )
+
+
+def edge_spec(edge):
+    """vis.js options for one view edge; labels live in the tooltip to keep the canvas clean."""
+    return dict(
+        id=f"{edge['source']}->{edge['target']}",
+        to=edge["target"],
+        title=edge["label"],
+        color={"color": "#c5cdd2", "highlight": "#566573", "hover": "#566573"},
+        arrows={"to": {"enabled": True, "scaleFactor": 0.55, "type": "arrow"}},
+        smooth={"type": "continuous"},  # "dynamic" needs the physics engine
+        width=1.5 + math.log2(edge["weight"]),  # Bundled links draw thicker
+        hoverWidth=3,
+        **{"from": edge["source"]}
+    )
+
+
+def _render_network(view, positions):
+    from pyvis.network import Network  # Deferred: only the Black Swan page needs pyvis
     # Clean off-white professional background
     net = Network(height="850px", width="100%", bgcolor="#f4f6f8", font_color="#2c3e50", select_menu=False, cdn_resources='remote')
     
-    # Well-spaced, stable physics layout
-    net.force_atlas_2based(gravity=-55, central_gravity=0.012, spring_length=200, spring_strength=0.055, damping=0.5, overlap=0.8)
-    
-    # Professional color palette (bg, border)
-    group_colors = {
-        "Event":      ("#c0392b", "#922b21"),
-        "Logistics":  ("#2471a3", "#1a5276"),
-        "Industry":   ("#ca6f1e", "#a04000"),
-        "Retail":     ("#b7950b", "#9a7d0a"),
-        "Consumer":   ("#7d3c98", "#6c3483"),
-        "Commodity":  ("#1e8449", "#196f3d"),
-        "Government": ("#566573", "#4d5656"),
-    }
+    # Positions come precomputed from src.layout, so the browser does no physics work
+    net.toggle_physics(False)
     
-    if "nodes" in graph_data and "edges" in graph_data:
-        # Pre-compute degree for proportional node sizing
-        degree = {}
-        for edge in graph_data["edges"]:
-            for key in ("source", "target"):
-                nid = edge.get(key)
-                if nid:
-                    degree[nid] = degree.get(nid, 0) + 1
-
-        for node in graph_data["nodes"]:
-            n_id  = node.get("id", "")
-            label = node.get("label", n_id)
-            group = node.get("group", "Industry")
-            bg, border = group_colors.get(group, ("#95a5a6", "#7f8c8d"))
-            node_degree = degree.get(n_id, 1)
-            
-            if group == "Event":
-                # Prominent labeled box for the root event
-                net.add_node(
-                    n_id,
-                    label=f"⚡  {label}",
-                    title=f"ROOT EVENT: {label}",
-                    shape="box",
-                    color={"background": bg, "border": border,
-                           "highlight": {"background": "#e74c3c", "border": border},
-                           "hover":     {"background": "#e74c3c", "border": border}},
-                    font={"size": 15, "face": "Segoe UI, sans-serif", "color": "#ffffff", "bold": True},
-                    margin={"top": 12, "bottom": 12, "left": 16, "right": 16},
-                    borderWidth=3,
-                    shadow={"enabled": True, "color": "rgba(192,57,43,0.4)", "size": 12, "x": 3, "y": 3}
-                )
-            else:
-                # Degree-proportional dots; label floats neatly beneath
-                size = max(18, min(48, 16 + node_degree * 5))
-                net.add_node(
-                    n_id,
-                    label=label,
-                    title=f"{group}  |  {node_degree} connection{'s' if node_degree != 1 else ''}",
-                    shape="dot",
-                    size=size,
-                    color={"background": bg, "border": border,
-                           "highlight": {"background": bg,     "border": "#2c3e50"},
-                           "hover":     {"background": border, "border": "#2c3e50"}},
-                    font={"size": 12, "face": "Segoe UI, sans-serif", "color": "#1a1a2e",
-                          "bold": True, "vadjust": size + 10},
-                    borderWidth=2,
-                    shadow={"enabled": True, "color": "rgba(0,0,0,0.10)", "size": 5, "x": 2, "y": 2}
-                )
-            
-        for edge in graph_data["edges"]:
-            src = edge.get("source")
-            tgt = edge.get("target")
-            lbl = edge.get("label", "")
-            if src and tgt:
-                # Labels in tooltip — keeps the canvas completely clean
-                net.add_edge(
-                    src, tgt,
-                    label="",
-                    title=lbl,
-                    color={"color": "#c5cdd2", "highlight": "#566573", "hover": "#566573"},
-                    arrows={"to": {"enabled": True, "scaleFactor": 0.55, "type": "arrow"}},
-                    smooth={"type": "dynamic"},
-                    width=1.5,
-                    hoverWidth=3
-                )
-                
-    # Write to a temporary file, read into memory, then delete immediately.
-    # This avoids persistent HTML artifacts accumulating in the temp directory.
-    with tempfile.NamedTemporaryFile(suffix=".html", delete=False, mode="w", encoding="utf-8") as tmp:
-        tmp_path = tmp.name
-    net.save_graph(tmp_path)
-    with open(tmp_path, "r", encoding="utf-8") as f:
-        html_content = f.read()
-    try:
-        os.remove(tmp_path)
-    except OSError:
-        pass  # Non-critical if cleanup fails
-    return html_content
+    for node in view["nodes"]:
+        spec = node_spec(node, *positions.get(node["id"], (0.0, 0.0)))
+        net.add_node(spec.pop("id"), **spec)
+
+    for edge in view["edges"]:
+        spec = edge_spec(edge)
+        del spec["id"]
+        net.add_edge(spec.pop("from"), spec.pop("to"), label="", **spec)
+
+    # Render the template straight to a string; remote CDN resources mean there is
+    # nothing to copy next to an output file
+    return net.generate_html()
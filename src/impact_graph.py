@@ -0,0 +1,233 @@
+import itertools
+import json
+import os
+from collections import Counter, deque
+
+# Approximate prompt-token budget for the graph context sent with an expansion request
+EXPAND_TOKEN_BUDGET = int(os.environ.get("GEOPULSE_EXPAND_TOKEN_BUDGET", "1200"))
+# Expansion stops offering more rounds once a graph reaches this many nodes
+MAX_GRAPH_NODES = int(os.environ.get("GEOPULSE_MAX_GRAPH_NODES", "1500"))
+
+_uids = itertools.count(1)
+
+
+def approx_tokens(value):
+    """Rough token count of a JSON-serialised value (~4 characters per token)."""
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False)) // 4 + 1
+
+
+def _label_key(node):
+    return str(node.get("label", node.get("id", ""))).strip().casefold()
+
+
+class ImpactGraph:
+    """Black Swan supply-chain graph with indexes kept up to date on every merge.
+
+    Nodes are stored in insertion order with an id -> index map; edges keep
+    ``(source, target)`` keys for O(1) dedup plus per-node adjacency lists and
+    degree counts, so merging an expansion only touches the new items. ``version``
+    increases whenever a merge adds something, and ``(uid, version)`` identifies
+    the graph's content for caching.
+    """
+
+    def __init__(self):
+        self.uid = next(_uids)
+        self.version = 0
+        self.nodes = []
+        self.edges = []
+        self.index = {}
+        self.edge_keys = set()
+        self.src = []          # per edge: index of the source node
+        self.dst = []          # per edge: index of the target node
+        self.out_adj = []      # per node: indices of successor nodes
+        self.in_adj = []       # per node: indices of predecessor nodes
+        self.degree = []
+        self.group_counts = Counter()  # non-Event nodes per group
+
+    @classmethod
+    def from_data(cls, graph_data):
+        graph = cls()
+        graph.merge(graph_data)
+        return graph
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def key(self):
+        return (self.uid, self.version)
+
+    @property
+    def ids(self):
+        return [node["id"] for node in self.nodes]
+
+    @property
+    def root(self):
+        """Index of the root Event node (the first one), or None."""
+        for i, node in enumerate(self.nodes):
+            if node.get("group") == "Event":
+                return i
+        return None
+
+    def merge(self, graph_data, created=None):
+        """Add the nodes and edges of ``graph_data`` that are not already present.
+
+        Nodes are merged before edges so a batch may reference its own new nodes;
+        edges whose endpoints are unknown are dropped. A node whose id already exists
+        refers to the existing node, even if its label is worded differently, unless
+        the id is in ``created``: the ids that earlier parallel batches of the same
+        round added (see ``merge_round``). Reusing one of those with a different label
+        is an ID collision (e.g. two branches both inventing "fuel_prices"), so the
+        node is renamed ``<id>_2``, ``<id>_3``... and the batch's edges follow the rename.
+        Returns ``(nodes_added, edges_added)``.
+        """
+        nodes_added = edges_added = 0
+        renames = {}
+        batch_ids = set()
+        for node in graph_data.get("nodes", []) or []:
+            nid = node.get("id") if isinstance(node, dict) else None
+            if not nid or nid in batch_ids:
+                continue
+            batch_ids.add(nid)
+            if nid in self.index:
+                if not created or nid not in created or _label_key(self.nodes[self.index[nid]]) == _label_key(node):
+                    continue
+                renames[nid] = self._free_id(nid)
+                node = dict(node, id=renames[nid])
+                nid = node["id"]
+            if created is not None:
+                created.add(nid)
+            self.index[nid] = len(self.nodes)
+            self.nodes.append(node)
+            self.out_adj.append([])
+            self.in_adj.append([])
+            self.degree.append(0)
+            if node.get("group") != "Event":
+                self.group_counts[node.get("group", "Unknown")] += 1
+            nodes_added += 1
+        for edge in graph_data.get("edges", []) or []:
+            if not isinstance(edge, dict):
+                continue
+            key = (renames.get(edge.get("source"), edge.get("source")),
+                   renames.get(edge.get("target"), edge.get("target")))
+            a, b = self.index.get(key[0]), self.index.get(key[1])
+            if a is None or b is None or key in self.edge_keys:
+                continue
+            if key != (edge.get("source"), edge.get("target")):
+                edge = dict(edge, source=key[0], target=key[1])
+            self.edge_keys.add(key)
+            self.edges.append(edge)
+            self.src.append(a)
+            self.dst.append(b)
+            self.out_adj[a].append(b)
+            self.in_adj[b].append(a)
+            self.degree[a] += 1
+            self.degree[b] += 1
+            edges_added += 1
+        if nodes_added or edges_added:
+            self.version += 1
+        return nodes_added, edges_added
+
+    def merge_round(self, batches):
+        """Merge the results of one round of parallel expansions, in order.
+
+        Ids that exist before the round are references to existing nodes; only ids
+        that two batches both created as new nodes are treated as collisions.
+        Returns the summed ``(nodes_added, edges_added)``.
+        """
+        created = set()
+        nodes_added = edges_added = 0
+        for batch in batches:
+            nodes, edges = self.merge(batch, created)
+            nodes_added += nodes
+            edges_added += edges
+        return nodes_added, edges_added
+
+    def _free_id(self, nid):
+        n = 2
+        while f"{nid}_{n}" in self.index:
+            n += 1
+        return f"{nid}_{n}"
+
+    def most_impacted(self):
+        """Group with the most non-Event nodes, or "N/A"."""
+        top = self.group_counts.most_common(1)
+        return top[0][0] if top else "N/A"
+
+    def frontier(self):
+        """Node indices ordered for expansion: lowest out-degree first, newest first among ties.
+
+        The root event is only included while it has no consequences yet.
+        """
+        order = sorted(range(len(self.nodes)), key=lambda i: (len(self.out_adj[i]), -i))
+        root = self.root
+        return [i for i in order if i != root or not self.out_adj[i]]
+
+    def branches(self, k):
+        """Partition the frontier into up to ``k`` non-empty branches for parallel expansion.
+
+        Leaves are grouped by the root consequence they descend from, so each branch
+        covers a coherent part of the cascade; groups are packed largest-first into
+        the lightest branch, and the largest is split when there are fewer than ``k``.
+        Each branch keeps frontier order.
+        """
+        order = self.frontier()
+        if not order:
+            return []
+        owner = list(range(len(self.nodes)))
+        root = self.root
+        if root is not None:
+            # Breadth-first from the root: each node inherits the first-level consequence above it
+            queue = deque((child, child) for child in self.out_adj[root])
+            seen = {root}
+            while queue:
+                node, top = queue.popleft()
+                if node in seen:
+                    continue
+                seen.add(node)
+                owner[node] = top
+                queue.extend((child, top) for child in self.out_adj[node])
+        groups = {}
+        for i in order:
+            groups.setdefault(owner[i], []).append(i)
+        groups = sorted(groups.values(), key=len, reverse=True)
+        while len(groups) < k and len(groups[0]) > 1:
+            largest = groups.pop(0)
+            groups += [largest[::2], largest[1::2]]
+            groups.sort(key=len, reverse=True)
+        buckets = [[] for _ in range(min(k, len(groups)))]
+        for group in groups:
+            min(buckets, key=len).extend(group)
+        rank = {i: r for r, i in enumerate(order)}
+        return [sorted(bucket, key=rank.__getitem__) for bucket in buckets]
+
+    def expansion_context(self, token_budget=EXPAND_TOKEN_BUDGET, frontier=None):
+        """Compact expansion prompt context: the frontier plus a bounded neighbourhood summary.
+
+        Frontier nodes (each with the labels of its direct causes) are added until
+        ``token_budget`` is spent, so the context stays roughly constant in size
+        however large the graph grows; at least one frontier node is always sent.
+        ``frontier`` restricts the context to one branch (node indices, in priority order).
+        """
+        root = self.root
+        context = {
+            "event": self.nodes[root].get("label", self.nodes[root]["id"]) if root is not None else "",
+            "graph_size": {"nodes": len(self.nodes), "edges": len(self.edges)},
+            "groups": dict(self.group_counts),
+            "frontier": [],
+        }
+        spent = approx_tokens(context)
+        for i in self.frontier() if frontier is None else frontier:
+            node = self.nodes[i]
+            item = {"id": node["id"], "label": node.get("label", node["id"]), "group": node.get("group", "Unknown"),
+                    "caused_by": [self.nodes[p].get("label", self.nodes[p]["id"]) for p in self.in_adj[i][:3]]}
+            cost = approx_tokens(item)
+            if context["frontier"] and spent + cost > token_budget:
+                break
+            context["frontier"].append(item)
+            spent += cost
+        return context
+
+    def to_dict(self):
+        """Plain ``{"nodes": [...], "edges": [...]}`` view (the lists are shared, not copied)."""
+        return {"nodes": self.nodes, "edges": self.edges}
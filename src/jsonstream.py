@@ -0,0 +1,148 @@
+import json
+
+# Phrases that mark a safety-filter refusal instead of a JSON answer
+REFUSAL_MARKERS = ("i'm sorry", "cannot fulfill", "as an ai")
+
+
+class IncrementalJSONParser:
+    """Resumable parser for one streamed top-level JSON object.
+
+    ``feed`` takes text chunks as they arrive and returns the ``(key, value)``
+    members that became complete in that chunk, so callers can act on
+    ``score_current`` long before ``news`` has finished streaming. Each character
+    is scanned once; only completed members are handed to ``json.loads``.
+    Leading prose or a Markdown code fence before the object is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.data = {}
+        self.complete = False
+        self.refused = False
+        self._pos = 0          # next character to scan
+        self._start = -1       # index of the opening brace, -1 until seen
+        self._member = 0       # start of the member currently being read
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        if self.complete or self.refused or not chunk:
+            return []
+        self.buffer += chunk
+        emitted = []
+        text = self.buffer
+        if self._start < 0:
+            brace = text.find("{", self._pos)
+            if brace < 0:
+                self._pos = len(text)
+                self._check_refusal(text)
+                return emitted
+            self._check_refusal(text[:brace])
+            if self.refused:
+                return emitted
+            self._start = self._member = brace + 1
+            self._depth = 1
+            self._pos = brace + 1
+
+        i = self._pos
+        n = len(text)
+        while i < n:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(text[self._member:i], emitted)
+                    self.complete = True
+                    i += 1
+                    break
+            elif ch == "," and self._depth == 1:
+                self._emit(text[self._member:i], emitted)
+                self._member = i + 1
+            i += 1
+        self._pos = i
+        return emitted
+
+    def result(self):
+        return dict(self.data)
+
+    def _emit(self, fragment, emitted):
+        if not fragment.strip():
+            return
+        try:
+            member = json.loads("{" + fragment + "}")
+        except json.JSONDecodeError:
+            return  # Malformed member; the final clean_json pass decides what to do
+        for key, value in member.items():
+            self.data[key] = value
+            emitted.append((key, value))
+
+    def _check_refusal(self, prefix):
+        lower = prefix.lower()
+        if any(m in lower for m in REFUSAL_MARKERS):
+            self.refused = True
+
+
+
+class JSONLinesParser:
+    """Resumable parser for line-delimited JSON records (one object per line).
+
+    ``feed`` takes text chunks as they arrive and returns the records completed by
+    them; ``close`` flushes a final line that has no trailing newline. Lines that
+    are not JSON objects (Markdown fences, stray prose, a truncated record) are
+    skipped. Refusal prose before the first record sets ``refused``.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.refused = False
+        self._partial = ""
+
+    def feed(self, chunk):
+        if self.refused or not chunk:
+            return []
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        return self._parse(lines)
+
+    def close(self):
+        lines, self._partial = [self._partial], ""
+        return [] if self.refused else self._parse(lines)
+
+    def _parse(self, lines):
+        emitted = []
+        for line in lines:
+            line = line.strip().rstrip(",")
+            if not line.startswith("{"):
+                if not self.records and any(m in line.lower() for m in REFUSAL_MARKERS):
+                    self.refused = True
+                    break
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                self.records += 1
+                emitted.append(record)
+        return emitted
+
+
+def first_json_object(text):
+    """First balanced top-level JSON object in ``text``, or None. Raises on a malformed object."""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    if not parser.complete:
+        return None
+    return json.loads(text[parser._start - 1:parser._pos])
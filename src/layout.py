@@ -0,0 +1,150 @@
+import itertools
+import os
+from collections import deque
+
+import numpy as np
+
+from src.impact_graph import ImpactGraph
+
+# Ideal edge length in canvas pixels (matches the old physics spring_length)
+SPRING_LENGTH = float(os.environ.get("GEOPULSE_LAYOUT_SPRING_LENGTH", "200"))
+LAYOUT_ITERATIONS = int(os.environ.get("GEOPULSE_LAYOUT_ITERATIONS", "300"))
+# Pull towards the centre of the drawing so sparse trees don't sprawl across the canvas
+GRAVITY = float(os.environ.get("GEOPULSE_LAYOUT_GRAVITY", "0.2"))
+# Upper bound on node-pair force evaluations per layout (iterations x moving nodes x all nodes)
+LAYOUT_WORK = float(os.environ.get("GEOPULSE_LAYOUT_WORK", "1.5e7"))
+MIN_ITERATIONS = 30
+LAYOUT_SEED = 7
+
+
+def compute_layout(graph, previous=None, iterations=LAYOUT_ITERATIONS, k=SPRING_LENGTH):
+    """Force-directed node positions ``{id: (x, y)}`` in canvas pixels.
+
+    A vectorized Fruchterman-Reingold pass in NumPy, so the browser can draw the
+    graph with physics disabled. Nodes already present in ``previous`` keep their
+    coordinates and stay pinned; only new nodes are placed, starting next to an
+    already-placed neighbour. Deterministic for a given input.
+    ``graph`` is an ``ImpactGraph`` or a raw ``{"nodes", "edges"}`` dict.
+    """
+    if not isinstance(graph, ImpactGraph):
+        graph = ImpactGraph.from_data(graph)
+    ids = graph.ids
+    src = np.array(graph.src, dtype=np.intp)
+    dst = np.array(graph.dst, dtype=np.intp)
+    n = len(ids)
+    if n == 0:
+        return {}
+    previous = previous or {}
+    rng = np.random.default_rng(LAYOUT_SEED)
+    xy = np.zeros((n, 2))
+    pinned = np.zeros(n, dtype=bool)
+    for i, nid in enumerate(ids):
+        if nid in previous:
+            xy[i] = previous[nid]
+            pinned[i] = True
+    if pinned.all():
+        return {nid: tuple(previous[nid]) for nid in ids}
+
+    # Seed new nodes next to placed neighbours, breadth-first so chains unfold outwards
+    placed = pinned.copy()
+    if not placed.any():
+        # Fresh graph: grow it out from the root event
+        root = graph.root
+        placed[0 if root is None else root] = True
+    queue = deque(np.flatnonzero(placed).tolist())
+    while queue:
+        u = queue.popleft()
+        for v in itertools.chain(graph.out_adj[u], graph.in_adj[u]):
+            if not placed[v]:
+                angle = rng.uniform(0, 2 * np.pi)
+                xy[v] = xy[u] + k * np.array([np.cos(angle), np.sin(angle)])
+                placed[v] = True
+                queue.append(v)
+    loose = ~placed
+    if loose.any():
+        # Disconnected nodes start on a ring around the existing drawing
+        radius = k * (1 + np.sqrt(n))
+        angles = rng.uniform(0, 2 * np.pi, loose.sum())
+        xy[loose] = np.column_stack([np.cos(angles), np.sin(angles)]) * radius
+
+    # Only free nodes move, so forces are only evaluated on them: O(free * n) per iteration.
+    # Big layouts get fewer iterations so one call stays within a fixed amount of work;
+    # below MIN_ITERATIONS a relaxation isn't worth running at all.
+    free = np.flatnonzero(~pinned)
+    iterations = min(iterations, int(LAYOUT_WORK / (free.size * n)))
+    if iterations < MIN_ITERATIONS:
+        if not pinned.any():
+            xy = _radial_layout(graph, k)
+        return _as_positions(ids, xy)
+    moving = ~pinned
+    touching = moving[src] | moving[dst]
+    src, dst = src[touching], dst[touching]
+    self_pairs = (np.arange(free.size), free)
+    temperature = k * 2.0
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        delta = xy[free, None, :] - xy[None, :, :]
+        dist2 = (delta ** 2).sum(axis=-1)
+        dist2[self_pairs] = np.inf
+        # Repulsion k^2/d from every node, attraction d^2/k along edges
+        disp = np.zeros_like(xy)
+        disp[free] = (delta * (k * k / np.maximum(dist2, 1e-6))[:, :, None]).sum(axis=1)
+        if src.size:
+            d = xy[src] - xy[dst]
+            length = np.maximum(np.sqrt((d ** 2).sum(axis=1)), 1e-3)
+            pull = d * (length / k)[:, None]
+            np.add.at(disp, src, -pull)
+            np.add.at(disp, dst, pull)
+        disp[free] -= GRAVITY * (xy[free] - xy.mean(axis=0)) * np.sqrt(n)
+        step = disp[free]
+        norm = np.maximum(np.sqrt((step ** 2).sum(axis=1)), 1e-9)
+        xy[free] += step / norm[:, None] * np.minimum(norm, temperature)[:, None]
+        temperature = max(temperature - cooling, 1.0)
+
+    return _as_positions(ids, xy)
+
+
+def _as_positions(ids, xy):
+    xy = np.round(xy, 1)
+    return {nid: (float(xy[i, 0]), float(xy[i, 1])) for i, nid in enumerate(ids)}
+
+
+def _radial_layout(graph, k):
+    """Hierarchical fallback for very large fresh graphs: O(n), no force iterations.
+
+    Nodes sit on rings by hop distance from the root event, each subtree owning an
+    angular sector proportional to its number of leaves.
+    """
+    n = len(graph.nodes)
+    root = graph.root if graph.root is not None else 0
+    depth = np.full(n, -1)
+    depth[root] = 0
+    children = [[] for _ in range(n)]
+    order = [root]
+    for u in order:  # Breadth-first; the list grows while it is walked
+        for v in itertools.chain(graph.out_adj[u], graph.in_adj[u]):
+            if depth[v] < 0:
+                depth[v] = depth[u] + 1
+                children[u].append(v)
+                order.append(v)
+    weight = np.ones(n)
+    for u in reversed(order):
+        if children[u]:
+            weight[u] = sum(weight[c] for c in children[u])
+    start = np.zeros(n)
+    width = np.zeros(n)
+    width[root] = 2 * np.pi
+    for u in order:
+        offset = start[u]
+        for c in children[u]:
+            width[c] = width[u] * weight[c] / weight[u]
+            start[c] = offset
+            offset += width[c]
+    angle = start + width / 2
+    radius = depth * k
+    reached = depth >= 0
+    # Anything not connected to the root goes on an outer ring
+    outer = np.flatnonzero(~reached)
+    radius[outer] = (depth.max() + 2) * k
+    angle[outer] = np.linspace(0, 2 * np.pi, outer.size, endpoint=False)
+    return np.column_stack([np.cos(angle), np.sin(angle)]) * radius[:, None]
@@ -0,0 +1,145 @@
+import os
+import threading
+import weakref
+
+import numpy as np
+
+from src.analytics import graph_metrics
+
+# Graphs up to this size are drawn in full
+LOD_MIN_NODES = int(os.environ.get("GEOPULSE_LOD_MIN_NODES", "150"))
+# Beyond it, nodes further than this many hops from the event collapse into group clusters
+LOD_HOPS = int(os.environ.get("GEOPULSE_LOD_HOPS", "2"))
+# Hard caps on what reaches the browser, whatever the size of the underlying graph
+LOD_MAX_NODES = int(os.environ.get("GEOPULSE_LOD_MAX_NODES", "250"))
+LOD_MAX_EDGES = int(os.environ.get("GEOPULSE_LOD_MAX_EDGES", "600"))
+
+CLUSTER_PREFIX = "cluster::"
+
+_views = weakref.WeakKeyDictionary()  # ImpactGraph -> {(version, params): view}
+_views_lock = threading.Lock()
+
+
+def cluster_id(group):
+    return f"{CLUSTER_PREFIX}{group}"
+
+
+def build_view(graph, expanded=(), max_hops=LOD_HOPS, max_nodes=LOD_MAX_NODES, max_edges=LOD_MAX_EDGES):
+    """Level-of-detail view of an ``ImpactGraph`` for rendering.
+
+    Small graphs pass through unchanged. In larger ones, nodes more than
+    ``max_hops`` from the event collapse into one super-node per ``group``
+    unless that group is in ``expanded``; whatever is still wanted is ranked by
+    hop distance then impact, and only the first ``max_nodes`` stay individual.
+    Edges are re-pointed at the visible nodes, merged, and capped at ``max_edges``.
+
+    Returns ``{"nodes", "edges", "clusters", "total_nodes", "total_edges"}``, where
+    each node carries ``impact``, ``bottleneck``, ``hops``, ``members`` (1 for real
+    nodes) and ``cluster``, and ``clusters`` maps each collapsed group to its member count.
+    """
+    params = (graph.version, frozenset(expanded), max_hops, max_nodes, max_edges)
+    with _views_lock:
+        cached = _views.get(graph, {}).get(params)
+    if cached is not None:
+        return cached
+    view = _build_view(graph, frozenset(expanded), max_hops, max_nodes, max_edges)
+    with _views_lock:
+        # Views of older versions are never asked for again
+        _views[graph] = {k: v for k, v in _views.get(graph, {}).items() if k[0] == graph.version}
+        _views[graph][params] = view
+    return view
+
+
+def _build_view(graph, expanded, max_hops, max_nodes, max_edges):
+    metrics = graph_metrics(graph)
+    impact, bottleneck, hops = metrics["impact"], metrics["bottleneck"], metrics["hops"]
+    n = len(graph.nodes)
+    groups = np.array([node.get("group", "Unknown") for node in graph.nodes], dtype=object)
+
+    visible = np.ones(n, dtype=bool)
+    if n > LOD_MIN_NODES or n > max_nodes:
+        in_expanded = np.array([g in expanded for g in groups], dtype=bool)
+        wanted = (hops <= max_hops) | in_expanded | (groups == "Event")
+        # Rank wanted nodes by hop distance, then impact; the root event (hop 0) always leads
+        order = np.lexsort((-impact, np.where(np.isfinite(hops), hops, np.inf)))
+        order = order[wanted[order]][:max_nodes]
+        visible = np.zeros(n, dtype=bool)
+        visible[order] = True
+
+    nodes, clusters = [], {}
+    target = {}
+    for i in np.flatnonzero(visible).tolist():
+        node = graph.nodes[i]
+        target[i] = node["id"]
+        nodes.append({"id": node["id"], "label": node.get("label", node["id"]), "group": node.get("group", "Industry"),
+                      "impact": float(impact[i]), "bottleneck": float(bottleneck[i]), "hops": float(hops[i]),
+                      "members": 1, "cluster": False})
+    hidden = np.flatnonzero(~visible)
+    if hidden.size:
+        names, inverse = np.unique(groups[hidden].astype(str), return_inverse=True)
+        counts = np.bincount(inverse)
+        peak_impact = np.zeros(names.size)
+        np.maximum.at(peak_impact, inverse, impact[hidden])
+        peak_bottleneck = np.zeros(names.size)
+        np.maximum.at(peak_bottleneck, inverse, bottleneck[hidden])
+        nearest = np.full(names.size, np.inf)
+        np.minimum.at(nearest, inverse, hops[hidden])
+        for g, name in enumerate(names.tolist()):
+            clusters[name] = int(counts[g])
+            nodes.append({"id": cluster_id(name), "label": f"{name} ×{counts[g]}", "group": name,
+                          "impact": float(peak_impact[g]), "bottleneck": float(peak_bottleneck[g]),
+                          "hops": float(nearest[g]), "members": int(counts[g]), "cluster": True})
+        for i, g in zip(hidden.tolist(), inverse.tolist()):
+            target[i] = cluster_id(names[g])
+
+    merged = {}
+    for edge, a, b in zip(graph.edges, graph.src, graph.dst):
+        key = (target[a], target[b])
+        if key[0] == key[1]:
+            continue  # Links inside one cluster
+        if key in merged:
+            merged[key]["weight"] += 1
+        else:
+            merged[key] = {"source": key[0], "target": key[1], "label": edge.get("label", ""), "weight": 1}
+    edges = list(merged.values())
+    if len(edges) > max_edges:
+        # Keep the heaviest bundles, then the links nearest the event
+        hop_of = {node["id"]: node["hops"] for node in nodes}
+        edges.sort(key=lambda e: (-e["weight"], hop_of[e["source"]]))
+        edges = edges[:max_edges]
+    for edge in edges:
+        if edge["weight"] > 1:
+            edge["label"] = f"{edge['weight']} links"
+    return {"nodes": nodes, "edges": edges, "clusters": clusters,
+            "total_nodes": n, "total_edges": len(graph.edges)}
+
+
+def view_positions(view, graph, positions):
+    """Positions for a view's nodes: real nodes keep theirs, clusters go on a ring just outside them.
+
+    Clusters hold the nodes beyond the detail radius, so they are spread evenly on
+    that ring, ordered by the direction of their members' centroid.
+    """
+    if not view["clusters"]:
+        return positions
+    visible = [node["id"] for node in view["nodes"] if not node["cluster"]]
+    placed = {nid: positions[nid] for nid in visible if nid in positions}
+    shown = set(placed)
+    members = {}
+    for node in graph.nodes:
+        nid = node["id"]
+        if nid not in shown and nid in positions:
+            members.setdefault(cluster_id(node.get("group", "Unknown")), []).append(positions[nid])
+    pts = np.array(list(placed.values())) if placed else np.zeros((1, 2))
+    centre = pts.mean(axis=0)
+    radius = np.sqrt(((pts - centre) ** 2).sum(axis=1)).max() + 300.0
+    ids = [node["id"] for node in view["nodes"] if node["cluster"]]
+    direction = []
+    for cid in ids:
+        xy = np.array(members.get(cid) or [centre]).mean(axis=0) - centre
+        direction.append(np.arctan2(xy[1], xy[0]))
+    for slot, j in enumerate(np.argsort(direction, kind="stable")):
+        theta = direction[j] if len(ids) == 1 else np.pi * 2 * slot / len(ids) + min(direction)
+        placed[ids[j]] = (round(float(centre[0] + radius * np.cos(theta)), 1),
+                          round(float(centre[1] + radius * np.sin(theta)), 1))
+    return placed
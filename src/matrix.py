@@ -0,0 +1,178 @@
+import asyncio
+import os
+
+import numpy as np
+
+from src import aio
+from src.api import afetch_analysis, analysis_cache, cached_analysis
+from src.countries import Entity, get_index, resolve_entity
+
+# Upper bound on concurrent pair scans per matrix run (the provider semaphore still applies)
+MATRIX_WORKERS = int(os.environ.get("GEOPULSE_MATRIX_WORKERS", "8"))
+
+# Per-pair fields kept alongside the score arrays
+META_FIELDS = ("status_label", "main_driver", "change_reason", "summary")
+
+
+class TensionMatrix:
+    """Pairwise tension scores for a watchlist of N countries.
+
+    Scores live in symmetric NumPy arrays (``current`` and ``past``, NaN where a pair
+    has not been scored yet) with per-pair metadata keyed by ``(i, j)``, ``i < j``.
+    A run only scans pairs that are still pending, so calling ``run`` again after a
+    partial failure resumes where the previous run stopped.
+    """
+
+    def __init__(self, countries):
+        self.entities = []
+        seen = set()
+        for name in countries:
+            if isinstance(name, Entity):
+                entity = name
+            elif not str(name).strip():
+                continue
+            else:
+                entity = resolve_entity(name)
+            if entity.id not in seen:
+                seen.add(entity.id)
+                self.entities.append(entity)
+        n = len(self.entities)
+        self.current = np.full((n, n), np.nan)
+        self.past = np.full((n, n), np.nan)
+        self.meta = {}
+        self.errors = {}
+
+    @property
+    def names(self):
+        return [e.name for e in self.entities]
+
+    @property
+    def ids(self):
+        return [e.id for e in self.entities]
+
+    def pairs(self):
+        i, j = np.triu_indices(len(self.entities), k=1)
+        return list(zip(i.tolist(), j.tolist()))
+
+    def pending(self):
+        return [(i, j) for i, j in self.pairs() if np.isnan(self.current[i, j])]
+
+    @property
+    def total(self):
+        n = len(self.entities)
+        return n * (n - 1) // 2
+
+    @property
+    def done(self):
+        return self.total - len(self.pending())
+
+    def record(self, i, j, data):
+        """Store one pair result; error dicts are kept in ``errors`` so the pair stays pending."""
+        if not isinstance(data, dict) or "error" in data:
+            self.errors[(i, j)] = data.get("error", "Unknown error") if isinstance(data, dict) else str(data)
+            return False
+        try:
+            cur, past = float(data.get("score_current")), float(data.get("score_past"))
+        except (TypeError, ValueError):
+            self.errors[(i, j)] = "Response did not include numeric scores."
+            return False
+        self.current[i, j] = self.current[j, i] = cur
+        self.past[i, j] = self.past[j, i] = past
+        self.meta[(i, j)] = {k: data.get(k, "") for k in META_FIELDS}
+        self.errors.pop((i, j), None)
+        return True
+
+    def run(self, key, base_url, model, max_workers=MATRIX_WORKERS):
+        """Scan every pending pair; yields ``(done, total, (i, j), ok)`` as each pair lands.
+
+        Cached pairs are filled synchronously first and never reach the worker pool.
+        """
+        todo = []
+        for i, j in self.pending():
+            cached = cached_analysis(self.entities[i].name, self.entities[j].name, base_url, model)
+            if cached is not None and self.record(i, j, cached):
+                yield self.done, self.total, (i, j), True
+            else:
+                todo.append((i, j))
+        if not todo:
+            return
+
+        async def scan(i, j, sem):
+            async with sem:
+                return await afetch_analysis(self.entities[i].name, self.entities[j].name, key, base_url, model)
+
+        # asyncio primitives must be created on the loop that awaits them
+        sem = aio.run(_make_semaphore(max_workers))
+        for idx, result in aio.iter_completed([scan(i, j, sem) for i, j in todo]):
+            i, j = todo[idx]
+            if isinstance(result, Exception):
+                result = {"error": str(result)}
+            ok = self.record(i, j, result)
+            yield self.done, self.total, (i, j), ok
+
+    @classmethod
+    def from_cache(cls, base_url, model):
+        """Matrix of every pair currently held in the shared analysis cache for this provider/model."""
+        index = get_index()
+        scored = [(k[2], k[3], v) for k, v in analysis_cache.items() if k[:2] == (base_url or "", model)]
+        ids = sorted({i for a, b, _ in scored for i in (a, b)})
+        entities = [index.entities.get(i) or Entity(i, i.title(), known=False) for i in ids]
+        matrix = cls(entities)
+        pos = {e.id: n for n, e in enumerate(matrix.entities)}
+        for a, b, data in scored:
+            matrix.record(pos[a], pos[b], data)
+        return matrix
+
+    def top_pairs(self, k=10):
+        """Indices of the ``k`` highest and ``k`` lowest scored pairs, each sorted most-extreme first.
+
+        Uses ``argpartition`` over the upper triangle, so selection is O(P) in the number of pairs.
+        With fewer than ``2k`` scored pairs they are split between the two lists, never listed in both.
+        """
+        iu, ju = np.triu_indices(len(self.entities), k=1)
+        scores = self.current[iu, ju]
+        valid = np.flatnonzero(~np.isnan(scores))
+        if valid.size == 0:
+            return [], []
+        vals = scores[valid]
+        k_high = min(k, (vals.size + 1) // 2)
+        high = np.argpartition(-vals, k_high - 1)[:k_high]
+        high = high[np.argsort(-vals[high], kind="stable")]
+        rest = np.setdiff1d(np.arange(vals.size), high, assume_unique=True)
+        k_low = min(k, rest.size)
+        low = rest[np.argpartition(vals[rest], k_low - 1)[:k_low]] if k_low else rest
+        low = low[np.argsort(vals[low], kind="stable")]
+        to_pairs = lambda sel: list(zip(iu[valid[sel]].tolist(), ju[valid[sel]].tolist()))
+        return to_pairs(high), to_pairs(low)
+
+    def rankings(self, k=10, reasons=None):
+        """Global Heatmap payload (``highest_pressure``/``lowest_pressure``) built from stored scores.
+
+        ``reasons`` maps "A vs B" to a context string; pairs without one fall back to their stored main driver.
+        """
+        reasons = reasons or {}
+        high, low = self.top_pairs(k)
+
+        def row(i, j):
+            pair = f"{self.entities[i].name} vs {self.entities[j].name}"
+            reason = reasons.get(pair) or self.meta.get((i, j), {}).get("main_driver", "")
+            return {"pair": pair, "score": int(self.current[i, j]), "reason": reason}
+
+        return {"highest_pressure": [row(i, j) for i, j in high],
+                "lowest_pressure": [row(i, j) for i, j in low]}
+
+    def pair_rows(self):
+        """Flat per-pair records (for tables and downstream ranking)."""
+        rows = []
+        for (i, j), meta in self.meta.items():
+            rows.append({
+                "pair": f"{self.entities[i].name} vs {self.entities[j].name}",
+                "score": int(self.current[i, j]),
+                "score_past": int(self.past[i, j]),
+                **meta,
+            })
+        return rows
+
+
+async def _make_semaphore(n):
+    return asyncio.Semaphore(max(1, n))
@@ -0,0 +1,92 @@
+import os
+
+from src.graph import edge_spec, node_spec
+from src.lod import view_positions
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(__file__), "network_frontend")
+
+# Mirrors the pyvis page: fixed server-side positions, no browser physics
+NETWORK_OPTIONS = {
+    "physics": {"enabled": False},
+    "interaction": {"hover": True, "dragNodes": True, "tooltipDelay": 120},
+    "edges": {"smooth": {"type": "continuous"}},
+}
+
+_component = None
+
+
+def _get_component():
+    global _component
+    if _component is None:
+        import streamlit.components.v1 as components  # Deferred like the other page-only dependencies
+        _component = components.declare_component("impact_network", path=_FRONTEND_DIR)
+    return _component
+
+
+def network_specs(view, graph, positions):
+    """vis.js node and edge options for a view, keyed by id."""
+    placed = view_positions(view, graph, positions)
+    nodes = {node["id"]: node_spec(node, *placed.get(node["id"], (0.0, 0.0))) for node in view["nodes"]}
+    edges = {}
+    for edge in view["edges"]:
+        spec = edge_spec(edge)
+        edges[spec["id"]] = spec
+    return nodes, edges
+
+
+def diff_specs(old, new):
+    """``(added, updated, removed_ids)`` between two id -> spec maps."""
+    added = [spec for key, spec in new.items() if key not in old]
+    updated = [spec for key, spec in new.items() if key in old and old[key] != spec]
+    removed = [key for key in old if key not in new]
+    return added, updated, removed
+
+
+class NetworkSync:
+    """What one browser-side network instance has been sent, so later runs only send diffs.
+
+    Payloads are versioned: a diff names the version it applies on top of, and the
+    browser asks for a full snapshot (via the component value) when it doesn't have
+    that version, e.g. after its iframe was recreated.
+    """
+
+    def __init__(self):
+        self.graph_uid = None
+        self.version = 0
+        self.nodes = {}
+        self.edges = {}
+        self.payload = None
+        self.resync_seen = None
+
+    def payload_for(self, graph_uid, nodes, edges, resync=None):
+        full = self.payload is None or graph_uid != self.graph_uid or (resync is not None and resync != self.resync_seen)
+        self.resync_seen = resync
+        if full:
+            self.version += 1
+            self.payload = {"mode": "full", "version": self.version, "options": NETWORK_OPTIONS,
+                            "nodes": list(nodes.values()), "edges": list(edges.values())}
+        else:
+            add_nodes, update_nodes, remove_nodes = diff_specs(self.nodes, nodes)
+            add_edges, update_edges, remove_edges = diff_specs(self.edges, edges)
+            if add_nodes or update_nodes or remove_nodes or add_edges or update_edges or remove_edges:
+                self.version += 1
+                self.payload = {"mode": "diff", "base": self.version - 1, "version": self.version,
+                                "add_nodes": add_nodes, "update_nodes": update_nodes, "remove_nodes": remove_nodes,
+                                "add_edges": add_edges, "update_edges": update_edges, "remove_edges": remove_edges}
+            # Nothing changed: resend the last payload, which the browser has already applied
+        self.graph_uid = graph_uid
+        self.nodes = nodes
+        self.edges = edges
+        return self.payload
+
+
+def impact_network(graph, view, positions, key="impact_network"):
+    """Draw ``view`` in a persistent browser-side vis network, sending only what changed since the last run."""
+    import streamlit as st
+    sync = st.session_state.setdefault(f"{key}_sync", NetworkSync())
+    # The browser posts a value only when it fell out of sync and needs a full snapshot
+    requested = st.session_state.get(key)
+    resync = requested.get("resync") if isinstance(requested, dict) else None
+    nodes, edges = network_specs(view, graph, positions)
+    payload = sync.payload_for(graph.uid, nodes, edges, resync)
+    return _get_component()(payload=payload, key=key, default=None)
@@ -0,0 +1,49 @@
+from src.api import fetch_country_tensions
+from src.commodities import get_commodity_index
+from src.countries import resolve_entity
+from src.risk import risk_model
+
+
+def portfolio_countries(records):
+    """Distinct producer and refiner countries across ``records``, in first-seen order."""
+    entities = {}
+    for record in records:
+        for row in record.producers + record.refiners:
+            entity = resolve_entity(row.country)
+            entities.setdefault(entity.id, entity)
+    return list(entities.values())
+
+
+def commodity_risk(record, tensions):
+    """Portfolio row for one commodity, scored locally by the risk engine from per-country tension."""
+    row = {"commodity": record.name}
+    row.update(risk_model(record).score({eid: t["tension_index"] for eid, t in tensions.items()}))
+    del row["risk_components"]
+    return row
+
+
+def scan_portfolio(key, base_url, model, names=None):
+    """Risk for every verified commodity (or ``names``) from one shared tension scan.
+
+    Each distinct supplier country is scored once (``fetch_country_tensions``: one
+    batched call, cached per country); per-commodity risk is then scored locally
+    by ``RiskModel`` from the verified shares. Choke points have no threat input in
+    this mode, so the scores blend producers and refiners only.
+    Returns ``{"commodities", "countries", "unscored"}`` or ``{"error": ...}``.
+    """
+    index = get_commodity_index()
+    records = [r for r in (index.get(n) for n in (names or index.names())) if r is not None]
+    if not records:
+        return {"error": index.error or "No verified commodity data found."}
+    countries = portfolio_countries(records)
+    tensions = fetch_country_tensions([e.name for e in countries], key, base_url, model)
+    if "error" in tensions:
+        return tensions
+    rows = sorted((commodity_risk(r, tensions) for r in records),
+                  key=lambda row: -1 if row["global_risk_score"] is None else row["global_risk_score"], reverse=True)
+    return {
+        "commodities": rows,
+        "countries": sorted(({"country": e.name, **tensions[e.id]} for e in countries if e.id in tensions),
+                            key=lambda row: row["tension_index"], reverse=True),
+        "unscored": [e.name for e in countries if e.id not in tensions],
+    }
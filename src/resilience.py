@@ -0,0 +1,276 @@
+import asyncio
+import collections
+import concurrent.futures
+import os
+import random
+import threading
+import time
+
+# Deadline for one provider attempt in seconds (for streams, the wait for each chunk)
+CALL_TIMEOUT = float(os.environ.get("GEOPULSE_CALL_TIMEOUT", "60"))
+# Budget for a whole call in seconds: every attempt, backoff and failover must fit in it
+CALL_DEADLINE = float(os.environ.get("GEOPULSE_CALL_DEADLINE", "90"))
+# Retries after the first attempt, only for rate limits, timeouts, dropped connections and 5xx errors
+MAX_RETRIES = int(os.environ.get("GEOPULSE_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.environ.get("GEOPULSE_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("GEOPULSE_BACKOFF_MAX", "8"))
+# Hedging: once an attempt outlives the provider's p95 latency, race a duplicate (or the fallback) against it
+HEDGE_ENABLED = os.environ.get("GEOPULSE_HEDGE", "0") == "1"
+HEDGE_MIN_DELAY = float(os.environ.get("GEOPULSE_HEDGE_MIN_DELAY", "1"))
+HEDGE_MIN_SAMPLES = 20
+# Optional second provider and/or model, used for hedges and as a last resort once retries run out
+FALLBACK_MODEL = os.environ.get("GEOPULSE_FALLBACK_MODEL", "")
+FALLBACK_BASE_URL = os.environ.get("GEOPULSE_FALLBACK_BASE_URL", "")
+FALLBACK_API_KEY = os.environ.get("GEOPULSE_FALLBACK_API_KEY", "")
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+# Matched by name so the openai and httpx exception types needn't be imported here
+_RETRYABLE_ERRORS = frozenset({"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+                               "ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError", "RemoteProtocolError"})
+_TIMEOUT_ERRORS = frozenset({"APITimeoutError", "ConnectTimeout", "ReadTimeout"})
+
+_stats = collections.Counter()
+_stats_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def resilience_stats():
+    """Retries, hedges launched, hedges that won the race, and failovers to the fallback target."""
+    with _stats_lock:
+        return {name: _stats[name] for name in ("retries", "hedges", "hedge_wins", "failovers")}
+
+
+class LatencyTracker:
+    """Rolling window of successful attempt latencies per (base_url, model)."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, target, seconds):
+        with self._lock:
+            samples = self._samples.setdefault((target[1] or "", target[2]), collections.deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def p95(self, target):
+        """95th-percentile latency, or None until ``HEDGE_MIN_SAMPLES`` attempts have succeeded."""
+        with self._lock:
+            samples = sorted(self._samples.get((target[1] or "", target[2]), ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+latency = LatencyTracker()
+
+
+def is_retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in _RETRYABLE_ERRORS
+
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, honouring a provider's Retry-After (capped at ``BACKOFF_MAX``)."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), BACKOFF_MAX)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def describe_error(error):
+    """User-facing message for a failed provider call."""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "The provider is rate limiting requests (HTTP 429), even after retrying. Please try again shortly."
+    if type(error).__name__ in _TIMEOUT_ERRORS:
+        if getattr(error, "deadline_exceeded", False):
+            return f"The provider did not respond within the {CALL_DEADLINE:.0f}s limit for a request, retries included."
+        return f"The provider did not respond within {CALL_TIMEOUT:.0f}s, even after retrying."
+    return str(error)
+
+
+def _expired(error):
+    """Mark ``error`` as ending the call because ``CALL_DEADLINE`` ran out (see ``describe_error``)."""
+    try:
+        error.deadline_exceeded = True
+    except AttributeError:
+        pass
+    return error
+
+
+def fallback_target(key, base_url, model):
+    """``(key, base_url, model)`` of the configured fallback, or None when none differs from the primary."""
+    if not (FALLBACK_MODEL or FALLBACK_BASE_URL):
+        return None
+    target = (FALLBACK_API_KEY or key, FALLBACK_BASE_URL or base_url, FALLBACK_MODEL or model)
+    return None if target == (key, base_url, model) else target
+
+
+def hedge_delay(target):
+    if not HEDGE_ENABLED:
+        return None
+    p95 = latency.p95(target)
+    return None if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="geopulse-hedge")
+    return _pool
+
+
+def _remaining(deadline):
+    return deadline - time.monotonic()
+
+
+def _timed(attempt, target, deadline, record):
+    # Only hedgeable calls feed the latency window: a stream open returns at the
+    # response headers, and its short samples would make hedges fire too early
+    timeout = min(CALL_TIMEOUT, _remaining(deadline))
+    start = time.monotonic()
+    try:
+        result = attempt(target, timeout)
+    except Exception as e:
+        if timeout < CALL_TIMEOUT:
+            _expired(e)
+        raise
+    if record:
+        latency.record(target, time.monotonic() - start)
+    return result
+
+
+def _hedged(attempt, primary, fallback, hedge, deadline):
+    delay = hedge_delay(primary) if hedge else None
+    if delay is None or delay >= _remaining(deadline):
+        return _timed(attempt, primary, deadline, hedge)
+    first = _get_pool().submit(_timed, attempt, primary, deadline, hedge)
+    try:
+        return first.result(timeout=delay)
+    except concurrent.futures.TimeoutError:
+        pass
+    _count("hedges")
+    # The loser can't be cancelled mid-request; its result is simply dropped
+    second = _get_pool().submit(_timed, attempt, fallback or primary, deadline, hedge)
+    pending, error = {first, second}, None
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    _count("hedge_wins")
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+def call(attempt, key, base_url, model, hedge=True):
+    """Run ``attempt(target, timeout)`` against ``(key, base_url, model)`` with the resilience policy.
+
+    The whole call must finish within ``CALL_DEADLINE``; each attempt gets
+    ``CALL_TIMEOUT`` or whatever remains of it, if less. Retryable errors are
+    retried up to ``MAX_RETRIES`` times with jittered exponential backoff, then
+    tried once on the fallback target if one is configured; retries and the
+    failover are skipped once the deadline has passed. With ``hedge`` (and
+    ``GEOPULSE_HEDGE=1``) an attempt still running after the provider's p95
+    latency is raced against a duplicate sent to the fallback (or the primary).
+    Only hedgeable calls are recorded in that latency window.
+    """
+    primary = (key, base_url, model)
+    fallback = fallback_target(key, base_url, model)
+    deadline = time.monotonic() + CALL_DEADLINE
+    for n in range(MAX_RETRIES + 1):
+        try:
+            return _hedged(attempt, primary, fallback, hedge, deadline)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if n == MAX_RETRIES:
+                if fallback is None:
+                    raise
+                if _remaining(deadline) <= 0:
+                    raise _expired(e)
+                _count("failovers")
+                return _timed(attempt, fallback, deadline, hedge)
+            delay = backoff_delay(n, e)
+            if delay >= _remaining(deadline):
+                raise _expired(e)
+            _count("retries")
+            time.sleep(delay)
+
+
+async def _atimed(attempt, target, deadline, record):
+    timeout = min(CALL_TIMEOUT, _remaining(deadline))
+    start = time.monotonic()
+    try:
+        result = await attempt(target, timeout)
+    except Exception as e:
+        if timeout < CALL_TIMEOUT:
+            _expired(e)
+        raise
+    if record:
+        latency.record(target, time.monotonic() - start)
+    return result
+
+
+async def _ahedged(attempt, primary, fallback, hedge, deadline):
+    delay = hedge_delay(primary) if hedge else None
+    if delay is None or delay >= _remaining(deadline):
+        return await _atimed(attempt, primary, deadline, hedge)
+    first = asyncio.ensure_future(_atimed(attempt, primary, deadline, hedge))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+    _count("hedges")
+    second = asyncio.ensure_future(_atimed(attempt, fallback or primary, deadline, hedge))
+    pending, error = {first, second}, None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        _count("hedge_wins")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def acall(attempt, key, base_url, model, hedge=True):
+    """Async ``call``: ``attempt(target, timeout)`` is a coroutine function; losing hedges are cancelled."""
+    primary = (key, base_url, model)
+    fallback = fallback_target(key, base_url, model)
+    deadline = time.monotonic() + CALL_DEADLINE
+    for n in range(MAX_RETRIES + 1):
+        try:
+            return await _ahedged(attempt, primary, fallback, hedge, deadline)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if n == MAX_RETRIES:
+                if fallback is None:
+                    raise
+                if _remaining(deadline) <= 0:
+                    raise _expired(e)
+                _count("failovers")
+                return await _atimed(attempt, fallback, deadline, hedge)
+            delay = backoff_delay(n, e)
+            if delay >= _remaining(deadline):
+                raise _expired(e)
+            _count("retries")
+            await asyncio.sleep(delay)
@@ -0,0 +1,144 @@
+import functools
+import os
+
+import numpy as np
+
+from src.countries import resolve_entity
+
+# Weights of the overall score, renormalised over the components that have inputs
+RISK_WEIGHTS = {"producers": 0.4, "refiners": 0.3, "choke_points": 0.3}
+# HHI (shares in %) from which a stage counts as highly concentrated
+HHI_HIGH = 2500.0
+# Part of a stage's score that scales with its concentration; the rest is tension alone
+CONCENTRATION_WEIGHT = float(os.environ.get("GEOPULSE_CONCENTRATION_WEIGHT", "0.4"))
+# Suppliers at or above this tension count towards a stage's share at risk
+AT_RISK_TENSION = float(os.environ.get("GEOPULSE_AT_RISK_TENSION", "70"))
+RELIANCE_WEIGHTS = {"high": 1.0, "medium": 0.6, "low": 0.3}
+
+
+def _fill(values):
+    """Unparsable shares count as the mean of the parsed ones."""
+    values = np.array(values, dtype=float)
+    known = values[~np.isnan(values)]
+    return np.where(np.isnan(values), known.mean() if known.size else 1.0, values)
+
+
+def _inputs(keys, values, shocks):
+    """Input vector aligned with ``keys`` (NaN where missing), shifted by ``shocks`` and clipped to 0-100."""
+    vector = np.array([values.get(k, np.nan) for k in keys], dtype=float)
+    if shocks:
+        vector = vector + np.array([shocks.get(k, 0.0) for k in keys], dtype=float)
+    return np.clip(vector, 0.0, 100.0)
+
+
+class Stage:
+    """Producer or refiner shares of one commodity as arrays (shares in %)."""
+    __slots__ = ("names", "ids", "share", "hhi", "concentration")
+
+    def __init__(self, rows):
+        self.names = [row.country for row in rows]
+        self.ids = [resolve_entity(row.country).id for row in rows]
+        self.share = _fill([np.nan if row.share_pct is None else row.share_pct for row in rows])
+        # Over the listed suppliers only, so a lower bound on the market's true HHI
+        self.hhi = float(np.square(self.share).sum())
+        self.concentration = min(self.hhi / HHI_HIGH, 1.0)
+
+    def score(self, tension):
+        """``(score, weighted_tension, share_at_risk)``, or Nones when no supplier has a tension input."""
+        scored = ~np.isnan(tension)
+        if not scored.any():
+            return None, None, None
+        weights = self.share[scored]
+        weighted = float(weights @ tension[scored] / weights.sum())
+        at_risk = float(self.share[scored & (np.nan_to_num(tension) >= AT_RISK_TENSION)].sum())
+        score = weighted * (1.0 - CONCENTRATION_WEIGHT + CONCENTRATION_WEIGHT * self.concentration)
+        return score, weighted, at_risk
+
+
+class RiskModel:
+    """Deterministic supply-chain risk for one ``CommodityRecord``.
+
+    Shares are parsed into arrays once per record; ``score`` then only needs the
+    per-entity inputs (country tension, choke-point threat, 0-100), so what-if
+    shocks can be re-scored without another AI call.
+
+    - producers / refiners: share-weighted tension, scaled up with the stage's
+      HHI (fully at ``HHI_HIGH``; ``CONCENTRATION_WEIGHT`` of the score depends on it).
+    - choke points: threat weighted by volume share × reliance.
+    - ``global_risk_score``: ``RISK_WEIGHTS`` blend of the components with inputs.
+    """
+
+    def __init__(self, record):
+        self.name = record.name
+        self.producers = Stage(record.producers)
+        self.refiners = Stage(record.refiners)
+        self.choke_names = [c.name for c in record.choke_points]
+        volume = _fill([np.nan if c.volume_pct is None else c.volume_pct for c in record.choke_points])
+        reliance = np.array([RELIANCE_WEIGHTS.get(c.reliance_level.strip().lower(), 0.6) for c in record.choke_points])
+        self.choke_weight = volume * reliance
+        self.choke_volume = float(volume.sum())
+
+    @property
+    def countries(self):
+        """``{entity_id: name}`` of every producer and refiner country."""
+        return dict(zip(self.producers.ids + self.refiners.ids, self.producers.names + self.refiners.names))
+
+    def score(self, tension, threat=None, shocks=None):
+        """Score from ``tension`` (entity id -> 0-100) and ``threat`` (choke point name -> 0-100).
+
+        ``shocks`` maps entity ids and choke point names to what-if deltas added to
+        those inputs. Returns the overall ``global_risk_score`` with its components.
+        """
+        p_tension = _inputs(self.producers.ids, tension, shocks)
+        r_tension = _inputs(self.refiners.ids, tension, shocks)
+        producers, producer_tension, production_at_risk = self.producers.score(p_tension)
+        refiners, refiner_tension, refining_at_risk = self.refiners.score(r_tension)
+
+        choke_points = None
+        threats = _inputs(self.choke_names, threat or {}, shocks)
+        scored = ~np.isnan(threats)
+        if scored.any() and self.choke_weight[scored].sum() > 0:
+            choke_points = float(self.choke_weight[scored] @ threats[scored] / self.choke_weight[scored].sum())
+
+        components = {"producers": producers, "refiners": refiners, "choke_points": choke_points}
+        weights = {k: RISK_WEIGHTS[k] for k, v in components.items() if v is not None}
+        total = sum(weights.values())
+        overall = sum(components[k] * w for k, w in weights.items()) / total if total else None
+
+        exposure = np.concatenate([self.producers.share * np.nan_to_num(p_tension),
+                                   self.refiners.share * np.nan_to_num(r_tension)])
+        names = self.producers.names + self.refiners.names
+        top = int(np.argmax(exposure)) if exposure.size and exposure.max() > 0 else None
+        return {
+            "global_risk_score": None if overall is None else int(round(overall)),
+            "risk_components": {k: None if v is None else round(v, 1) for k, v in components.items()},
+            "producer_hhi": round(self.producers.hhi),
+            "refiner_hhi": round(self.refiners.hhi),
+            "producer_tension": None if producer_tension is None else round(producer_tension, 1),
+            "refiner_tension": None if refiner_tension is None else round(refiner_tension, 1),
+            "production_at_risk": production_at_risk,
+            "refining_at_risk": refining_at_risk,
+            "top_exposure": None if top is None else names[top],
+        }
+
+
+@functools.lru_cache(maxsize=64)
+def risk_model(record):
+    # Records are immutable and replaced on reload, so each one is parsed once
+    return RiskModel(record)
+
+
+def market_inputs(market_data):
+    """``(tension, threat)`` inputs from a ``fetch_market_risk`` answer's per-entity scores."""
+    tension, threat = {}, {}
+    for row in (market_data.get("top_producers") or []) + (market_data.get("top_refiners") or []):
+        try:
+            tension[resolve_entity(row.get("country", "")).id] = float(row.get("tension_index"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+    for row in market_data.get("choke_points") or []:
+        try:
+            threat[row.get("name", "")] = float(row.get("threat_score"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return tension, threat
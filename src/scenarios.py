@@ -0,0 +1,104 @@
+import copy
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+from src.impact_graph import ImpactGraph
+
+SCENARIO_DIR = os.environ.get("GEOPULSE_SCENARIO_DIR",
+                              os.path.join(os.path.dirname(__file__), '..', 'data', 'scenarios'))
+
+# Choke-point shocks offered on the Black Swan page; scripts/build_scenarios.py pre-generates these
+BUILTIN_SCENARIOS = [
+    "Suez Canal Total Blockage",
+    "Strait of Hormuz Closure",
+    "Malacca Strait Conflict",
+    "Panama Canal Drought/Shutdown",
+]
+
+_parsed = {}  # path -> (mtime, data)
+_parsed_lock = threading.Lock()
+
+
+def scenario_slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def scenario_path(name, directory=None):
+    return os.path.join(directory or SCENARIO_DIR, f"{scenario_slug(name)}.json")
+
+
+def _read(name):
+    """Parsed library entry for ``name`` (re-read when the file changes), or None."""
+    path = scenario_path(name)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    with _parsed_lock:
+        cached = _parsed.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("rounds"), list) or not data["rounds"]:
+        return None
+    with _parsed_lock:
+        _parsed[path] = (mtime, data)
+    return data
+
+
+def library_info(name):
+    """``{"max_depth", "model", "generated_at"}`` for a stored scenario, or None."""
+    data = _read(name)
+    if data is None:
+        return None
+    return {"max_depth": len(data["rounds"]) - 1, "model": data.get("model", ""),
+            "generated_at": data.get("generated_at", "")}
+
+
+def load_scenario(name, depth=None):
+    """Stored graph for ``name`` up to expansion ``depth`` (default: deepest), or None.
+
+    Returns ``(graph, positions, info)``. Round 0 is the initial graph and each later
+    round one expansion, stored as its per-branch batches; they are replayed through
+    ``ImpactGraph.merge_round`` in order, exactly as the live session merged them, and every
+    call gets its own graph to expand further.
+    """
+    data = _read(name)
+    if data is None:
+        return None
+    # Parsed files are shared across sessions; each graph gets its own node/edge dicts
+    rounds = copy.deepcopy(data["rounds"] if depth is None else data["rounds"][:depth + 1])
+    graph = ImpactGraph()
+    for batches in rounds:
+        graph.merge_round(batches)
+    stored = data.get("positions", {})
+    positions = {nid: tuple(stored[nid]) for nid in graph.ids if nid in stored}
+    info = library_info(name)
+    info["depth"] = len(rounds) - 1
+    return graph, positions, info
+
+
+def save_scenario(name, rounds, positions, model, directory=None):
+    """Write one library entry; ``rounds`` lists, per round, the raw batches merged in that round."""
+    directory = directory or SCENARIO_DIR
+    os.makedirs(directory, exist_ok=True)
+    payload = {
+        "scenario": name,
+        "model": model,
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "rounds": rounds,
+        "positions": {nid: list(xy) for nid, xy in positions.items()},
+    }
+    path = scenario_path(name, directory)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)  # Readers never see a half-written file
+    return path
@@ -0,0 +1,286 @@
+import concurrent.futures
+import os
+import queue
+import re
+import threading
+import time
+
+from src.api import CAMEL_AVAILABLE, flights
+from src.clients import key_fingerprint
+from src.utils import sanitize_input
+
+# Persona pairs per simulation run, each in its own worker thread
+SIM_PAIRS = int(os.environ.get("GEOPULSE_SIM_PAIRS", "3"))
+# Process-wide cap on concurrently running conversations, shared by every session
+SIM_WORKERS = int(os.environ.get("GEOPULSE_SIM_WORKERS", "8"))
+# Default budget per run (see SimulationConfig)
+SIM_TURN_LIMIT = int(os.environ.get("GEOPULSE_SIM_TURN_LIMIT", "3"))
+SIM_MAX_TOKENS = int(os.environ.get("GEOPULSE_SIM_MAX_TOKENS", "400"))
+SIM_DEADLINE = float(os.environ.get("GEOPULSE_SIM_DEADLINE", "90"))
+SIM_MIN_NOVELTY = float(os.environ.get("GEOPULSE_SIM_MIN_NOVELTY", "0.2"))
+
+# Substrings with which an agent declares the conversation finished
+STOP_MARKERS = ("TERMINATE", "CAMEL_TASK_DONE")
+
+_WORD = re.compile(r"[a-z][a-z'-]{3,}")
+_STOPWORDS = frozenset("""
+    about above after again also always because been before being below between both cannot could does doing down
+    during each even ever from further have having here into just like more most much must need only other over
+    really same should some such than that their them then there these they this those through under until very
+    what when where which while will with would your yours you're we're they're it's i'll we'll going right well
+    sure know think thank thanks please tell said make help understand yes okay instruction input solution next
+""".split())
+_PANIC_WORDS = frozenset("""
+    panic panicking shortage shortages empty hoard hoarding scared afraid fear fears worried worry worrying urgent
+    desperate rationing ration outrage angry gouging chaos scarce scarcity frantic stockpile stockpiling sold-out
+    anxious anxiety crisis spike spiking surge unaffordable
+""".split())
+_CALM_WORDS = frozenset("""
+    calm stable restock restocked restocking reassure reassured reassuring plenty enough normal manageable
+    sufficient relief steady steadily available orderly patience patient confident recovering resolved
+""".split())
+
+# (assistant role, user role): the first answers, the second drives the conversation
+PANIC_PERSONAS = [
+    ("Local Retail Store Manager", "Anxious Consumer"),
+    ("Independent Pharmacist", "Parent of a Young Child"),
+    ("Fuel Station Operator", "Gig-Economy Delivery Driver"),
+    ("Regional Food Wholesaler", "Small Restaurant Owner"),
+]
+
+_models = {}  # (base_url, model, key fingerprint, max_tokens) -> CAMEL model backend
+_models_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class SimulationConfig:
+    """Budget and stopping rules for one panic simulation run.
+
+    - ``turn_limit``: maximum turns (one user and one assistant message) per pair.
+    - ``max_tokens``: completion cap for every agent message.
+    - ``deadline``: wall-clock seconds for the whole run; pairs still talking are
+      cut off and their transcripts returned as they stand.
+    - ``min_novelty``: a turn converges when less than this share of its content
+      words is new to the conversation and its sentiment moved by less than
+      ``sentiment_delta``; a pair stops after ``patience`` such turns in a row.
+      0 disables convergence detection.
+    """
+    __slots__ = ("pairs", "turn_limit", "max_tokens", "deadline", "min_novelty", "sentiment_delta", "patience")
+
+    def __init__(self, pairs=SIM_PAIRS, turn_limit=SIM_TURN_LIMIT, max_tokens=SIM_MAX_TOKENS, deadline=SIM_DEADLINE,
+                 min_novelty=SIM_MIN_NOVELTY, sentiment_delta=0.15, patience=1):
+        if turn_limit < 1 or deadline <= 0 or (max_tokens is not None and max_tokens < 1) or patience < 1:
+            raise ValueError("turn_limit, deadline, max_tokens and patience must be positive.")
+        self.pairs = max(1, min(pairs, len(PANIC_PERSONAS)))
+        self.turn_limit = turn_limit
+        self.max_tokens = max_tokens
+        self.deadline = deadline
+        self.min_novelty = min_novelty
+        self.sentiment_delta = sentiment_delta
+        self.patience = patience
+
+    def key(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+def turn_signature(text):
+    """``(content_words, sentiment)`` of a turn; sentiment runs from -1 (calm) to 1 (panicked)."""
+    words = set(_WORD.findall(text.lower())) - _STOPWORDS
+    panic = len(words & _PANIC_WORDS)
+    calm = len(words & _CALM_WORDS)
+    return words, (panic - calm) / max(1, panic + calm)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = concurrent.futures.ThreadPoolExecutor(max_workers=SIM_WORKERS, thread_name_prefix="geopulse-sim")
+    return _pool
+
+
+def _create_model(model_choice, api_key, base_url, max_tokens):
+    from camel.models import ModelFactory
+    from camel.types import ModelPlatformType, ModelType
+
+    model_config = {"temperature": 0.7}
+    if max_tokens:
+        model_config["max_tokens"] = max_tokens
+
+    if "gemini" in model_choice.lower():
+        camel_model_type = ModelType.GEMINI_2_5_FLASH
+        if "pro" in model_choice.lower() and "2.5" in model_choice.lower():
+            camel_model_type = ModelType.GEMINI_2_5_PRO
+        return ModelFactory.create(
+            model_platform=ModelPlatformType.GEMINI,
+            model_type=camel_model_type,
+            api_key=api_key,
+            model_config_dict=model_config
+        )
+    # Route all other providers (Perplexity, DeepSeek, OpenAI) through the OpenAI-compatible default platform
+    kwargs = {
+        "model_platform": ModelPlatformType.DEFAULT,
+        "model_type": model_choice,  # CAMEL accepts raw model strings for custom endpoints
+        "api_key": api_key,
+        "model_config_dict": model_config
+    }
+    if base_url:
+        kwargs["url"] = base_url
+    return ModelFactory.create(**kwargs)
+
+
+def get_camel_model(model_choice, api_key, base_url=None, max_tokens=SIM_MAX_TOKENS):
+    """Shared CAMEL model backend for this provider/model/key/token cap, built on first use.
+
+    Backends are stateless between calls (conversation state lives in the agents),
+    so one instance serves every persona pair and session.
+    """
+    cache_key = (base_url or "", model_choice, key_fingerprint(api_key), max_tokens)
+    with _models_lock:
+        model = _models.get(cache_key)
+    if model is None:
+        model = _create_model(model_choice, api_key, base_url, max_tokens)
+        with _models_lock:
+            model = _models.setdefault(cache_key, model)
+    return model
+
+
+def _run_pair(index, roles, scenario, model, emit, config, deadline, stop):
+    """Run one persona conversation, emitting each message; returns why it stopped."""
+    from camel.societies import RolePlaying
+
+    assistant_role, user_role = roles
+    task_prompt = (
+        f"A major global crisis has occurred: {scenario}. "
+        "Discuss the immediate impact on local supply chains, what items will run out first, and how consumers are reacting."
+    )
+    session = RolePlaying(
+        assistant_role_name=assistant_role,
+        user_role_name=user_role,
+        assistant_agent_kwargs=dict(model=model),
+        user_agent_kwargs=dict(model=model),
+        task_prompt=task_prompt,
+        with_task_specify=False
+    )
+    input_msg = session.init_chat()
+    seen, sentiment, stale = set(), None, 0
+    for _ in range(config.turn_limit):
+        if stop.is_set() or time.monotonic() >= deadline:
+            return "deadline"
+        assistant_response, user_response = session.step(input_msg)
+        if stop.is_set():
+            return "deadline"  # Finished after the run was cut off; nobody is listening any more
+        user_text = user_response.msg.content.replace("Instruction:", "").strip()
+        assistant_text = assistant_response.msg.content
+        emit({"pair": index, "side": "user", "speaker": user_role, "content": user_text})
+        emit({"pair": index, "side": "assistant", "speaker": assistant_role, "content": assistant_text})
+        if (any(marker in assistant_text or marker in user_text for marker in STOP_MARKERS)
+                or getattr(assistant_response, "terminated", False) or getattr(user_response, "terminated", False)):
+            return "terminated"
+        words, mood = turn_signature(f"{user_text} {assistant_text}")
+        if config.min_novelty > 0 and sentiment is not None:
+            novelty = len(words - seen) / max(1, len(words))
+            stale = stale + 1 if novelty < config.min_novelty and abs(mood - sentiment) < config.sentiment_delta else 0
+            if stale >= config.patience:
+                return "converged"
+        seen |= words
+        sentiment = mood
+        input_msg = assistant_response.msg
+    return "turn_limit"
+
+
+def _turns(transcript):
+    return sum(message["side"] == "assistant" for message in transcript)
+
+
+def stream_panic_simulation(scenario, api_key, model_choice, base_url=None, config=None):
+    """Run ``config.pairs`` persona conversations about ``scenario`` concurrently.
+
+    Yields ``("turn", message)`` as each message completes, in completion order
+    across pairs; ``message`` has ``pair``, ``side`` ("user", "assistant" or
+    "system" for a pair that failed), ``speaker`` and ``content``. Each pair then
+    reports ``("pair_done", {"pair", "reason", "turns"})``, where ``reason`` is
+    "turn_limit", "converged", "terminated", "deadline" or "error". Ends with
+    ``("done", {"transcripts", "reasons", "partial"})``, ``partial`` meaning the
+    deadline cut a pair short, or ``("error", message)``.
+    Identical concurrent runs share one simulation and replay its result.
+    """
+    config = config or SimulationConfig()
+    if not CAMEL_AVAILABLE:
+        yield "error", "CAMEL-AI library is not installed."
+        return
+    if not api_key:
+        yield "error", "API Key is missing."
+        return
+    personas = PANIC_PERSONAS[:config.pairs]
+    flight_key = ("panic", base_url or "", model_choice, key_fingerprint(api_key),
+                  sanitize_input(scenario, 200)) + config.key()
+    leader, call = flights.begin(flight_key)
+    if not leader:
+        try:
+            result = flights.wait(call)
+        except Exception as e:
+            yield "error", str(e)
+            return
+        for index, transcript in enumerate(result["transcripts"]):
+            for message in transcript:
+                yield "turn", message
+            yield "pair_done", {"pair": index, "reason": result["reasons"][index], "turns": _turns(transcript)}
+        yield "done", result
+        return
+
+    result, error = None, RuntimeError("Simulation interrupted.")
+    stop = threading.Event()
+    try:
+        deadline = time.monotonic() + config.deadline
+        try:
+            model = get_camel_model(model_choice, api_key, base_url, config.max_tokens)
+        except ImportError as e:
+            error = RuntimeError(f"CAMEL-AI library is not installed correctly: {e}")
+            yield "error", str(error)
+            return
+        except Exception as e:
+            error = RuntimeError(f"Failed to init model: {e}")
+            yield "error", str(error)
+            return
+
+        events = queue.Queue()
+
+        def run(index, roles):
+            reason = "error"
+            try:
+                reason = _run_pair(index, roles, scenario, model, events.put, config, deadline, stop)
+            except Exception as e:
+                events.put({"pair": index, "side": "system", "speaker": "System", "content": f"Simulation Error: {e}"})
+            finally:
+                events.put((index, reason))  # Pair finished
+
+        for index, roles in enumerate(personas):
+            _get_pool().submit(run, index, roles)
+        transcripts = [[] for _ in personas]
+        reasons = [None] * len(personas)
+        while None in reasons:
+            try:
+                event = events.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break  # Deadline: keep what has arrived, workers stop before their next step
+            if isinstance(event, tuple):
+                index, reason = event
+                reasons[index] = reason
+                yield "pair_done", {"pair": index, "reason": reason, "turns": _turns(transcripts[index])}
+                continue
+            transcripts[event["pair"]].append(event)
+            yield "turn", event
+        stop.set()
+        for index, reason in enumerate(reasons):
+            if reason is None:
+                reasons[index] = "deadline"
+                yield "pair_done", {"pair": index, "reason": "deadline", "turns": _turns(transcripts[index])}
+        result = {"transcripts": transcripts, "reasons": reasons, "partial": "deadline" in reasons}
+        error = None
+    finally:
+        stop.set()
+        flights.finish(flight_key, call, result=result, error=error)
+    yield "done", result
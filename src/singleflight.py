@@ -0,0 +1,110 @@
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "copies", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.copies = []
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent identical requests into one in-flight call.
+
+    The first caller for a key (the leader) runs the request; callers arriving
+    with the same key while it is in flight wait and receive a deep copy of the
+    leader's result instead of sending their own request. Nothing is cached once
+    the call completes; that is the job of ``src.cache``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}  # key -> [future, followers]; only touched from the src.aio loop
+        self.executed = 0
+        self.coalesced = 0
+
+    def begin(self, key):
+        """Register interest in ``key``; returns ``(is_leader, call)``.
+
+        A leader must later call ``finish``; followers call ``wait``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                return False, call
+            call = self._calls[key] = _Call()
+            self.executed += 1
+            return True, call
+
+    def finish(self, key, call, result=None, error=None):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            waiters = call.waiters
+        # No follower can join once the key is gone, so each one gets its own copy up
+        # front and the leader is free to mutate its result as soon as this returns
+        call.error = error
+        if error is None:
+            call.copies = [copy.deepcopy(result) for _ in range(waiters)]
+        call.event.set()
+
+    @staticmethod
+    def wait(call, timeout=None):
+        if not call.event.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical in-flight request.")
+        if call.error is not None:
+            raise call.error
+        return call.copies.pop()
+
+    def do(self, key, fn):
+        """Run ``fn()`` once for all concurrent callers sharing ``key``."""
+        leader, call = self.begin(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    async def ado(self, key, factory):
+        """Async ``do``: ``factory()`` returns the coroutine to run once per key."""
+        entry = self._async_calls.get(key)
+        if entry is not None:
+            entry[1] += 1
+            with self._lock:
+                self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(entry[0]))
+        future = asyncio.get_running_loop().create_future()
+        entry = self._async_calls[key] = [future, 0]
+        with self._lock:
+            self.executed += 1
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so lone leaders don't log "never retrieved"
+            raise
+        finally:
+            del self._async_calls[key]
+        future.set_result(result)
+        # Followers copy the future's value when they resume; hand the leader its own copy
+        return copy.deepcopy(result) if entry[1] else result
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced,
+                    "in_flight": len(self._calls) + len(self._async_calls)}
@@ -1,7 +1,6 @@
 import json
 import re
-import plotly.graph_objects as go
-from openai import OpenAI
+from src.jsonstream import REFUSAL_MARKERS, first_json_object
 
 def get_color(score):
     # 0 (Peace) -> 100 (War)
@@ -12,6 +11,7 @@ def get_color(score):
     return "#c0392b" # Red
 
 def create_gauge(current, past):
+    import plotly.graph_objects as go  # Deferred: only pages that draw a gauge pay for plotly
     # Visualizes Current Score with a 'Reference' bar for the Past Score
     fig = go.Figure(go.Indicator(
         mode = "gauge+number+delta",
@@ -33,19 +33,22 @@ def create_gauge(current, past):
     fig.update_layout(height=280, margin=dict(l=20, r=20, t=50, b=20), paper_bgcolor='rgba(0,0,0,0)', font={'family': "Arial"})
     return fig
 
+REFUSAL_ERROR = "Simulation Blocked: The AI model's safety filters prevented it from analyzing this geopolitical scenario."
+
 def clean_json(text):
     # Check for safety filter refusals
     lower_text = text.lower()
-    if "i'm sorry" in lower_text or "cannot fulfill" in lower_text or "as an ai" in lower_text:
-        return {"error": "Simulation Blocked: The AI model's safety filters prevented it from analyzing this geopolitical scenario."}
+    if any(marker in lower_text for marker in REFUSAL_MARKERS):
+        return {"error": REFUSAL_ERROR}
         
     try:
         return json.loads(text)
     except json.JSONDecodeError:
         match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
         if match: return json.loads(match.group(1))
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match: return json.loads(match.group(0))
+        # Single linear scan for the first balanced object (no greedy backtracking regex)
+        obj = first_json_object(text)
+        if obj is not None: return obj
         # Return a structured error dict — consistent with all other API functions
         return {"error": "Failed to parse AI response as JSON."}
 
@@ -57,9 +60,24 @@ def sanitize_input(text, max_len=50):
     sanitized = re.sub(r"[^a-zA-Z0-9\s\.\-',&]", '', str(text))
     return sanitized[:max_len].strip()
 
-def _make_client(key: str, base_url):
+def _make_client(key: str, base_url, http_client=None):
     """Construct and return a configured OpenAI-compatible client."""
-    kwargs = {"api_key": key}
+    from openai import OpenAI
+    # Retries are handled by src.resilience, not by the client
+    kwargs = {"api_key": key, "max_retries": 0}
     if base_url:
         kwargs["base_url"] = base_url
+    if http_client is not None:
+        kwargs["http_client"] = http_client
     return OpenAI(**kwargs)
+
+def _make_async_client(key: str, base_url, http_client=None):
+    """Async counterpart of ``_make_client``; must be used from the ``src.aio`` loop."""
+    from openai import AsyncOpenAI
+    # Retries are handled by src.resilience, not by the client
+    kwargs = {"api_key": key, "max_retries": 0}
+    if base_url:
+        kwargs["base_url"] = base_url
+    if http_client is not None:
+        kwargs["http_client"] = http_client
+    return AsyncOpenAI(**kwargs)
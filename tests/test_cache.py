@@ -0,0 +1,65 @@
+import json
+
+import src.api as api
+from src.cache import TTLCache
+
+
+def test_pair_key_is_order_and_alias_independent():
+    _, _, swapped, key = api._analysis_pair("USA", "China", None, "m")
+    _, _, reverse_swapped, reverse_key = api._analysis_pair("China", "U.S.", None, "m")
+    assert key == reverse_key
+    assert swapped != reverse_swapped
+
+
+def test_pair_key_separates_provider_and_model():
+    _, _, _, key = api._analysis_pair("USA", "China", None, "m")
+    assert api._analysis_pair("USA", "China", None, "other")[3] != key
+    assert api._analysis_pair("USA", "China", "https://example.com", "m")[3] != key
+
+
+def test_values_are_deep_copied_in_and_out():
+    cache = TTLCache()
+    value = {"rows": [{"score": 1}]}
+    cache.set("k", value)
+    value["rows"][0]["score"] = 2
+    first = cache.get("k")
+    first["rows"].append({"score": 3})
+    assert cache.get("k") == {"rows": [{"score": 1}]}
+
+
+def test_expired_entries_miss():
+    cache = TTLCache(ttl=0)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert [k for k, _ in cache.items()] == ["a", "c"]
+
+
+def test_oversized_value_is_not_stored():
+    cache = TTLCache(max_bytes=10)
+    cache.set("k", "x" * 100)
+    assert len(cache) == 0
+
+
+def test_reversed_pair_shares_one_call_and_swaps_flags(monkeypatch):
+    calls = []
+
+    def fake_chat(key, base_url, model, messages):
+        calls.append(messages)
+        return json.dumps({"c1_flag": "A", "c2_flag": "B", "current_score": 50})
+
+    monkeypatch.setattr(api, "_chat", fake_chat)
+    monkeypatch.setattr(api, "analysis_cache", TTLCache())
+    forward = api.fetch_analysis("Atlantis", "Lemuria", "k", None, "m")
+    reverse = api.fetch_analysis("Lemuria", "Atlantis", "k", None, "m")
+    assert len(calls) == 1
+    assert (forward["c1_flag"], forward["c2_flag"]) == (reverse["c2_flag"], reverse["c1_flag"])
+    assert api.cached_analysis("Lemuria", "Atlantis", None, "m") == reverse
@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+import src.commodities as commodities
+from src.commodities import CommodityDataError, CommodityIndex, parse_percent, validate
+
+GOLD = {
+    "producer_source": "USGS",
+    "producers": [{"country": "China", "share": "~10% of mine output"}, {"country": "Russia", "share": "n/a"}],
+    "refiners": [{"country": "Switzerland", "share": "60%"}],
+    "choke_points": [{"name": "Strait of Hormuz", "volume_flow": "5.5% of flows", "reliance_level": "High"}],
+}
+
+
+def _write(path, data, mtime):
+    path.write_text(json.dumps(data))
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def data_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(commodities, "RELOAD_CHECK_INTERVAL", 0)
+    path = tmp_path / "verified.json"
+    _write(path, {"Gold": GOLD}, 1_000_000)
+    return path
+
+
+def test_records_parse_shares_and_prompts(data_file):
+    record = CommodityIndex(str(data_file)).get("Gold")
+    assert [p.share_pct for p in record.producers] == [10.0, None]
+    assert record.choke_points[0].volume_pct == 5.5
+    assert record.refiner_source == commodities.UNKNOWN_SOURCE
+    assert "- Switzerland (Share: 60%)" in record.refiners_prompt
+
+
+def test_changed_file_is_reloaded(data_file):
+    index = CommodityIndex(str(data_file))
+    _write(data_file, {"Gold": GOLD, "Lithium": {"producers": [{"country": "Chile", "share": "25%"}]}}, 1_000_100)
+    assert index.names() == ["Gold", "Lithium"]
+    assert index.error is None
+
+
+def test_invalid_edit_keeps_last_good_data(data_file):
+    index = CommodityIndex(str(data_file))
+    _write(data_file, {"Gold": {"producers": [{"country": "China"}]}}, 1_000_100)
+    assert index.get("Gold").producers[0].share == "~10% of mine output"
+    assert "producers[0]" in index.error
+
+
+def test_missing_file_is_reported(tmp_path):
+    index = CommodityIndex(str(tmp_path / "missing.json"))
+    assert index.records == {}
+    assert index.error
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"Gold": []},
+    {"Gold": {"producers": {}}},
+    {"Gold": {"choke_points": [{"name": "Suez", "volume_flow": 12, "reliance_level": "High"}]}},
+    {"Gold": {"source": 1}},
+])
+def test_validate_rejects_schema_violations(data):
+    with pytest.raises(CommodityDataError):
+        validate(data)
+
+
+def test_parse_percent():
+    assert parse_percent("approx. 12.5 % of supply") == 12.5
+    assert parse_percent("majority") is None
@@ -0,0 +1,37 @@
+import doctest
+
+import pytest
+
+import src.countries as countries
+from src.countries import edit_distance, get_index, normalize_name, resolve_entity
+
+
+def test_doctests():
+    assert doctest.testmod(countries).failed == 0
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("U.S.", "USA"), ("the United States", "USA"), ("Türkiye", "TUR"),
+    ("Isreal", "ISR"), ("Inida", "IND"), ("Germnay", "DEU"), ("Ukriane", "UKR"),
+    ("Untied States", "USA"), ("Republic ofN icaragua", "NIC"), ("Czech Rep", "CZE"),
+])
+def test_aliases_and_typos_resolve(text, expected):
+    assert get_index().lookup(text).id == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Gulf States", "Arab States", "Latin America", "North America", "South America", "Africa", "Eastern Europe",
+])
+def test_inputs_sharing_one_word_with_a_country_do_not_match(text):
+    assert get_index().lookup(text) is None
+
+
+def test_unknown_input_becomes_ad_hoc_entity():
+    entity = resolve_entity("Atlantis")
+    assert not entity.known
+    assert entity.id == normalize_name("Atlantis")
+
+
+def test_edit_distance_counts_adjacent_swap_once():
+    assert edit_distance("japna", "japan", 2) == 1
+    assert edit_distance("abcdef", "ghijkl", 1) == 2
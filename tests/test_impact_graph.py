@@ -0,0 +1,79 @@
+from src.impact_graph import ImpactGraph
+
+
+def _graph():
+    return ImpactGraph.from_data({
+        "nodes": [{"id": "E", "label": "Canal blocked", "group": "Event"},
+                  {"id": "fuel", "label": "Fuel Prices Surge", "group": "Energy"},
+                  {"id": "ships", "label": "Ships reroute", "group": "Logistics"}],
+        "edges": [{"source": "E", "target": "fuel"}, {"source": "E", "target": "ships"}],
+    })
+
+
+def _edges(graph):
+    return [(edge["source"], edge["target"]) for edge in graph.edges]
+
+
+def test_merge_dedups_and_keeps_indexes_in_step():
+    graph = _graph()
+    version = graph.version
+    assert graph.merge({"nodes": [{"id": "fuel", "label": "Fuel Prices Surge"}],
+                        "edges": [{"source": "E", "target": "fuel"}]}) == (0, 0)
+    assert graph.version == version
+    assert graph.merge({"nodes": [{"id": "air", "label": "Airfares rise", "group": "Consumer"}],
+                        "edges": [{"source": "fuel", "target": "air"}, {"source": "air", "target": "ghost"}]}) == (1, 1)
+    assert graph.version == version + 1
+    fuel, air = graph.index["fuel"], graph.index["air"]
+    assert graph.out_adj[fuel] == [air] and graph.in_adj[air] == [fuel]
+    assert graph.degree[fuel] == 2
+    assert graph.group_counts == {"Energy": 1, "Logistics": 1, "Consumer": 1}
+
+
+def test_frontier_prefers_leaves_and_skips_a_root_with_consequences():
+    graph = _graph()
+    assert [graph.ids[i] for i in graph.frontier()] == ["ships", "fuel"]
+    assert graph.root == 0
+
+
+def test_expansion_context_stays_within_budget():
+    graph = _graph()
+    for n in range(200):
+        graph.merge({"nodes": [{"id": f"n{n}", "label": f"Consequence {n}", "group": "Retail"}],
+                     "edges": [{"source": "fuel", "target": f"n{n}"}]})
+    context = graph.expansion_context(token_budget=300)
+    assert 0 < len(context["frontier"]) < 200
+    assert context["graph_size"] == {"nodes": 203, "edges": 202}
+
+
+def test_echoed_existing_id_with_reworded_label_is_a_reference():
+    graph = _graph()
+    graph.merge_round([{"nodes": [{"id": "fuel", "label": "Fuel prices surge (global)"},
+                                  {"id": "airline", "label": "Airlines cut routes"}],
+                        "edges": [{"source": "fuel", "target": "airline"}]}])
+    assert graph.ids == ["E", "fuel", "ships", "airline"]
+    assert ("fuel", "airline") in _edges(graph)
+
+
+def test_ids_created_by_two_branches_in_one_round_are_renamed():
+    graph = _graph()
+    graph.merge_round([
+        {"nodes": [{"id": "prices", "label": "Food prices"}], "edges": [{"source": "ships", "target": "prices"}]},
+        {"nodes": [{"id": "prices", "label": "Steel prices"}, {"id": "fuel", "label": "Fuel!"}],
+         "edges": [{"source": "fuel", "target": "prices"}]},
+        {"nodes": [{"id": "prices", "label": "food prices"}], "edges": [{"source": "E", "target": "prices"}]},
+    ])
+    assert graph.ids == ["E", "fuel", "ships", "prices", "prices_2"]
+    assert graph.nodes[graph.index["prices_2"]]["label"] == "Steel prices"
+    assert ("fuel", "prices_2") in _edges(graph)
+    # Same label as the first branch's node: the same node, not a collision
+    assert ("E", "prices") in _edges(graph)
+
+
+def test_branches_partition_the_frontier():
+    graph = _graph()
+    for n in range(6):
+        parent = "fuel" if n % 2 else "ships"
+        graph.merge({"nodes": [{"id": f"n{n}", "label": f"N{n}"}], "edges": [{"source": parent, "target": f"n{n}"}]})
+    branches = graph.branches(3)
+    assert len(branches) == 3
+    assert sorted(i for branch in branches for i in branch) == sorted(graph.frontier())
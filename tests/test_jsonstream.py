@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+import src.api as api
+from src.jsonstream import IncrementalJSONParser, JSONLinesParser, first_json_object
+
+DOCUMENT = {"score_current": 72, "summary": "Tension, with \"quotes\" and {braces}", "news": [{"title": "a"}, {"title": "b"}]}
+
+
+def _feed_in_chunks(parser, text, size):
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted += parser.feed(text[i:i + size])
+    return emitted
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_members_are_emitted_as_they_complete_across_chunk_splits(size):
+    parser = IncrementalJSONParser()
+    emitted = _feed_in_chunks(parser, "```json\n" + json.dumps(DOCUMENT) + "\n```", size)
+    assert [key for key, _ in emitted] == ["score_current", "summary", "news"]
+    assert parser.complete
+    assert parser.result() == DOCUMENT
+
+
+def test_first_member_is_available_before_the_object_closes():
+    parser = IncrementalJSONParser()
+    text = json.dumps(DOCUMENT)
+    assert parser.feed(text[:text.index('"news"')]) == [("score_current", 72), ("summary", DOCUMENT["summary"])]
+    assert not parser.complete
+
+
+def test_refusal_before_the_object_is_detected():
+    parser = IncrementalJSONParser()
+    assert parser.feed("I'm sorry, but I can") == []
+    assert parser.refused
+    assert parser.feed('{"score_current": 1}') == []
+
+
+def test_first_json_object_skips_prose():
+    assert first_json_object('Here you go: {"a": [1, 2]} trailing') == {"a": [1, 2]}
+    assert first_json_object('{"a": ') is None
+
+
+def test_json_lines_are_emitted_across_chunk_splits():
+    lines = ['{"type": "node", "id": "E"}', '```', '{"type": "edge", "source": "E", "target": "a"},', '{"type": "node", "id": "a"}']
+    text = "\n".join(lines)
+    for size in (1, 5, 1000):
+        parser = JSONLinesParser()
+        records = []
+        for i in range(0, len(text), size):
+            records += parser.feed(text[i:i + size])
+        records += parser.close()
+        assert [r.get("id") or r["source"] for r in records] == ["E", "E", "a"]
+
+
+def test_json_lines_refusal_before_the_first_record():
+    parser = JSONLinesParser()
+    assert parser.feed("As an AI, I cannot help with that.\n") == []
+    assert parser.refused
+
+
+def test_graph_stream_accepts_a_single_line_document():
+    document = '{"nodes": [{"id": "E", "group": "Event"}, {"id": "a"}], "edges": [{"source": "E", "target": "a"}]}'
+    for content in (document, "```json\n" + document + "\n```"):
+        events = list(api._finish_graph_stream(content, {"nodes": [], "edges": []}))
+        assert [kind for kind, _ in events] == ["node", "node", "edge", "done"]
+
+
+def test_graph_events_hold_edges_until_both_endpoints_exist():
+    records = [{"source": "E", "target": "a"}, {"id": "E"}, {"id": "E"}, {"id": "a"}, {"source": "a", "target": "ghost"}]
+    assert [(kind, item.get("id") or item["target"]) for kind, item in api._graph_events(records)] == \
+        [("node", "E"), ("node", "a"), ("edge", "a")]
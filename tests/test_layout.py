@@ -0,0 +1,24 @@
+from src.impact_graph import ImpactGraph
+from src.layout import compute_layout
+
+
+def _chain(n):
+    return ImpactGraph.from_data({
+        "nodes": [{"id": "E", "group": "Event"}] + [{"id": f"n{i}"} for i in range(n)],
+        "edges": [{"source": "E" if i == 0 else f"n{i - 1}", "target": f"n{i}"} for i in range(n)],
+    })
+
+
+def test_layout_is_deterministic_and_covers_every_node():
+    first = compute_layout(_chain(20))
+    assert set(first) == {"E"} | {f"n{i}" for i in range(20)}
+    assert first == compute_layout(_chain(20))
+
+
+def test_existing_nodes_stay_pinned_when_the_graph_grows():
+    graph = _chain(10)
+    before = compute_layout(graph)
+    graph.merge({"nodes": [{"id": "extra"}], "edges": [{"source": "n9", "target": "extra"}]})
+    after = compute_layout(graph, previous=before)
+    assert all(after[nid] == tuple(xy) for nid, xy in before.items())
+    assert "extra" in after
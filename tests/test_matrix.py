@@ -0,0 +1,45 @@
+import numpy as np
+
+from src.matrix import TensionMatrix
+
+
+def _matrix(scores, n=5):
+    matrix = TensionMatrix(["USA", "China", "India", "Japan", "Germany", "France"][:n])
+    for (i, j), score in scores.items():
+        matrix.record(i, j, {"score_current": score, "score_past": score})
+    return matrix
+
+
+def test_top_pairs_are_sorted_most_extreme_first():
+    iu, ju = np.triu_indices(5, k=1)
+    matrix = _matrix({(i, j): s for i, j, s in zip(iu.tolist(), ju.tolist(), range(0, 100, 10))})
+    high, low = matrix.top_pairs(3)
+    assert [matrix.current[p] for p in high] == [90, 80, 70]
+    assert [matrix.current[p] for p in low] == [0, 10, 20]
+
+
+def test_fewer_than_2k_pairs_are_split_without_overlap():
+    matrix = _matrix({(0, 1): 80, (0, 2): 20, (1, 2): 50})
+    high, low = matrix.top_pairs(10)
+    assert high == [(0, 1), (1, 2)]
+    assert low == [(0, 2)]
+    assert not set(high) & set(low)
+
+
+def test_single_pair_is_only_listed_as_highest():
+    assert _matrix({(0, 1): 40}).top_pairs(5) == ([(0, 1)], [])
+
+
+def test_unscored_matrix_has_no_pairs():
+    assert _matrix({}).top_pairs(5) == ([], [])
+
+
+def test_error_results_keep_the_pair_pending():
+    matrix = _matrix({}, n=3)
+    assert not matrix.record(0, 1, {"error": "rate limited"})
+    assert not matrix.record(0, 2, {"score_current": "n/a"})
+    assert matrix.done == 0
+    assert set(matrix.errors) == {(0, 1), (0, 2)}
+    assert matrix.record(0, 1, {"score_current": 30, "score_past": 10})
+    assert matrix.current[1, 0] == 30
+    assert (0, 1) not in matrix.errors
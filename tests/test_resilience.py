@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import pytest
+
+from src import resilience
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, message="rate limited", response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class Attempts:
+    """Fake provider attempt: raises the queued errors in order, then returns the target it was sent to."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def __call__(self, target, timeout):
+        self.calls.append((target, timeout))
+        if self.errors:
+            raise self.errors.pop(0)
+        return target
+
+
+@pytest.fixture(autouse=True)
+def fast_policy(monkeypatch):
+    monkeypatch.setattr(resilience, "BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(resilience, "FALLBACK_MODEL", "")
+    monkeypatch.setattr(resilience, "FALLBACK_BASE_URL", "")
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", False)
+    monkeypatch.setattr(resilience, "latency", resilience.LatencyTracker())
+
+
+def test_retries_then_succeeds():
+    attempt = Attempts(RateLimitError(), APITimeoutError())
+    assert resilience.call(attempt, "k", None, "m") == ("k", None, "m")
+    assert len(attempt.calls) == 3
+    assert all(timeout == resilience.CALL_TIMEOUT for _, timeout in attempt.calls)
+
+
+def test_non_retryable_error_raises_immediately():
+    attempt = Attempts(BadRequestError("bad"))
+    with pytest.raises(BadRequestError):
+        resilience.call(attempt, "k", None, "m")
+    assert len(attempt.calls) == 1
+
+
+def test_retries_exhausted_without_fallback():
+    attempt = Attempts(*[RateLimitError() for _ in range(resilience.MAX_RETRIES + 1)])
+    with pytest.raises(RateLimitError):
+        resilience.call(attempt, "k", None, "m")
+    assert len(attempt.calls) == resilience.MAX_RETRIES + 1
+
+
+def test_fails_over_after_retries(monkeypatch):
+    monkeypatch.setattr(resilience, "FALLBACK_MODEL", "backup")
+    before = resilience.resilience_stats()["failovers"]
+    attempt = Attempts(*[APITimeoutError() for _ in range(resilience.MAX_RETRIES + 1)])
+    assert resilience.call(attempt, "k", "url", "m") == ("k", "url", "backup")
+    assert resilience.resilience_stats()["failovers"] == before + 1
+
+
+def test_fallback_target_identical_to_primary_is_ignored(monkeypatch):
+    monkeypatch.setattr(resilience, "FALLBACK_MODEL", "m")
+    assert resilience.fallback_target("k", None, "m") is None
+
+
+def test_deadline_stops_retries(monkeypatch):
+    monkeypatch.setattr(resilience, "CALL_DEADLINE", 0.05)
+    monkeypatch.setattr(resilience, "BACKOFF_BASE", 10)
+    attempt = Attempts(*[APITimeoutError() for _ in range(5)])
+    with pytest.raises(APITimeoutError) as info:
+        resilience.call(attempt, "k", None, "m")
+    assert len(attempt.calls) == 1
+    assert info.value.deadline_exceeded
+    assert f"{resilience.CALL_DEADLINE:.0f}s limit" in resilience.describe_error(info.value)
+
+
+def test_describe_error_reports_the_limit_that_fired():
+    assert f"within {resilience.CALL_TIMEOUT:.0f}s" in resilience.describe_error(APITimeoutError())
+    assert "HTTP 429" in resilience.describe_error(RateLimitError())
+    assert resilience.describe_error(BadRequestError("bad input")) == "bad input"
+
+
+def test_backoff_honours_retry_after():
+    assert resilience.backoff_delay(0, RateLimitError(response=Response({"retry-after": "3"}))) == 3
+    assert resilience.backoff_delay(0, RateLimitError(response=Response({"retry-after": "600"}))) == resilience.BACKOFF_MAX
+    assert 0 <= resilience.backoff_delay(2, RateLimitError()) <= resilience.BACKOFF_BASE * 4
+
+
+def test_only_hedgeable_calls_record_latency():
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        resilience.call(Attempts(), "k", None, "m", hedge=False)
+    assert resilience.latency.p95(("k", None, "m")) is None
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        resilience.call(Attempts(), "k", None, "m")
+    assert resilience.latency.p95(("k", None, "m")) is not None
+
+
+def test_slow_attempt_is_hedged(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(resilience, "HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(resilience, "FALLBACK_MODEL", "backup")
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        resilience.latency.record(("k", None, "m"), 0.01)
+
+    def attempt(target, timeout):
+        if target[2] == "m":
+            time.sleep(0.5)
+        return target
+
+    before = resilience.resilience_stats()
+    assert resilience.call(attempt, "k", None, "m") == ("k", None, "backup")
+    after = resilience.resilience_stats()
+    assert after["hedges"] == before["hedges"] + 1
+    assert after["hedge_wins"] == before["hedge_wins"] + 1
+
+
+def test_acall_retries_then_succeeds():
+    attempt = Attempts(RateLimitError())
+
+    async def aattempt(target, timeout):
+        return attempt(target, timeout)
+
+    assert asyncio.run(resilience.acall(aattempt, "k", None, "m")) == ("k", None, "m")
+    assert len(attempt.calls) == 2
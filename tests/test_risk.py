@@ -0,0 +1,72 @@
+import pytest
+
+from src.commodities import CommodityRecord
+from src.countries import resolve_entity
+from src.risk import AT_RISK_TENSION, CONCENTRATION_WEIGHT, HHI_HIGH, RISK_WEIGHTS, RiskModel, market_inputs
+
+RECORD = CommodityRecord("Test Metal", {
+    "producers": [{"country": "China", "share": "50%"}, {"country": "USA", "share": "30%"},
+                  {"country": "Russia", "share": "20%"}],
+    "refiners": [{"country": "China", "share": "100%"}],
+    "choke_points": [{"name": "Strait of Malacca", "volume_flow": "60%", "reliance_level": "High"},
+                     {"name": "Suez Canal", "volume_flow": "40%", "reliance_level": "Low"}],
+})
+CHN, USA, RUS = (resolve_entity(n).id for n in ("China", "USA", "Russia"))
+TENSION = {CHN: 80.0, USA: 20.0, RUS: 50.0}
+THREAT = {"Strait of Malacca": 90.0, "Suez Canal": 10.0}
+
+
+def test_stage_hhi_and_concentration():
+    model = RiskModel(RECORD)
+    assert model.producers.hhi == pytest.approx(50 ** 2 + 30 ** 2 + 20 ** 2)
+    assert model.producers.concentration == 1.0
+    assert model.refiners.hhi == pytest.approx(10000)
+
+
+def test_score_blends_share_weighted_tension_and_choke_points():
+    result = RiskModel(RECORD).score(TENSION, THREAT)
+    producers = (50 * 80 + 30 * 20 + 20 * 50) / 100
+    refiners = 80.0
+    choke = (60 * 1.0 * 90 + 40 * 0.3 * 10) / (60 * 1.0 + 40 * 0.3)
+    expected = (producers * RISK_WEIGHTS["producers"] + refiners * RISK_WEIGHTS["refiners"]
+                + choke * RISK_WEIGHTS["choke_points"]) / sum(RISK_WEIGHTS.values())
+    assert result["producer_tension"] == pytest.approx(producers)
+    assert result["risk_components"]["choke_points"] == pytest.approx(round(choke, 1))
+    assert result["global_risk_score"] == round(expected)
+    assert result["production_at_risk"] == (50 if AT_RISK_TENSION <= 80 else 0)
+    assert result["top_exposure"] == "China"
+
+
+def test_diversified_stage_scores_below_its_tension():
+    record = CommodityRecord("Spread", {"producers": [{"country": c, "share": "10%"} for c in
+                                                      ("China", "USA", "Russia", "India", "Japan",
+                                                       "Germany", "France", "Brazil", "Chile", "Peru")]})
+    model = RiskModel(record)
+    assert model.producers.hhi == pytest.approx(1000)
+    tension = {resolve_entity(row.country).id: 60.0 for row in record.producers}
+    expected = 60 * (1 - CONCENTRATION_WEIGHT + CONCENTRATION_WEIGHT * 1000 / HHI_HIGH)
+    assert model.score(tension)["risk_components"]["producers"] == pytest.approx(round(expected, 1))
+
+
+def test_missing_inputs_renormalise_the_weights():
+    result = RiskModel(RECORD).score({CHN: 70.0})
+    assert result["risk_components"]["choke_points"] is None
+    assert result["global_risk_score"] == 70
+    assert RiskModel(RECORD).score({})["global_risk_score"] is None
+
+
+def test_shocks_shift_inputs_and_are_clipped():
+    model = RiskModel(RECORD)
+    base = model.score(TENSION, THREAT)["global_risk_score"]
+    assert model.score(TENSION, THREAT, shocks={CHN: 15})["global_risk_score"] > base
+    assert model.score(TENSION, THREAT, shocks={CHN: 500})["producer_tension"] <= 100
+
+
+def test_market_inputs_skip_unparsable_rows():
+    tension, threat = market_inputs({
+        "top_producers": [{"country": "China", "tension_index": "75"}, {"country": "USA", "tension_index": "high"}],
+        "top_refiners": [None],
+        "choke_points": [{"name": "Suez Canal", "threat_score": 40}],
+    })
+    assert tension == {CHN: 75.0}
+    assert threat == {"Suez Canal": 40.0}
@@ -0,0 +1,45 @@
+import pytest
+
+import src.scenarios as scenarios
+
+ROUNDS = [
+    [{"nodes": [{"id": "E", "label": "Event", "group": "Event"}, {"id": "a", "label": "A"}],
+      "edges": [{"source": "E", "target": "a"}]}],
+    [{"nodes": [{"id": "b", "label": "B"}], "edges": [{"source": "a", "target": "b"}]},
+     {"nodes": [{"id": "b", "label": "Other B"}], "edges": [{"source": "E", "target": "b"}]}],
+]
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(scenarios, "SCENARIO_DIR", str(tmp_path))
+    scenarios.save_scenario("Test Shock", ROUNDS, {"E": (0, 0), "a": (1, 2), "b": (3, 4), "b_2": (5, 6)}, "m")
+    return tmp_path
+
+
+def test_saved_scenario_replays_rounds_and_positions(library):
+    graph, positions, info = scenarios.load_scenario("Test Shock")
+    assert graph.ids == ["E", "a", "b", "b_2"]
+    assert positions["b_2"] == (5, 6)
+    assert info["depth"] == info["max_depth"] == 1
+    assert info["model"] == "m"
+
+
+def test_depth_limits_the_replayed_rounds(library):
+    graph, positions, info = scenarios.load_scenario("Test Shock", depth=0)
+    assert graph.ids == ["E", "a"]
+    assert set(positions) == {"E", "a"}
+    assert info["depth"] == 0
+
+
+def test_each_load_gets_its_own_graph(library):
+    first, _, _ = scenarios.load_scenario("Test Shock")
+    first.nodes[0]["label"] = "changed"
+    second, _, _ = scenarios.load_scenario("Test Shock")
+    assert second.nodes[0]["label"] == "Event"
+
+
+def test_missing_or_invalid_entries_load_as_none(library):
+    assert scenarios.load_scenario("Unknown Shock") is None
+    (library / "broken.json").write_text('{"rounds": []}')
+    assert scenarios.library_info("Broken") is None
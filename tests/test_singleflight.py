@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import src.api as api
+from src.singleflight import SingleFlight
+
+
+def _run_concurrently(flights, fn, callers=4):
+    """Call ``flights.do("k", fn)`` from ``callers`` threads; returns each caller's result or exception."""
+    results = [None] * callers
+
+    def run(i):
+        try:
+            results[i] = flights.do("k", fn)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def _gated(flights, followers, outcome):
+    """Leader function that returns (or raises) ``outcome`` once ``followers`` callers have joined."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        deadline = time.monotonic() + 5
+        while flights.stats()["coalesced"] < followers and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return fn, calls
+
+
+def test_concurrent_callers_share_one_call_and_get_independent_copies():
+    flights = SingleFlight()
+    fn, calls = _gated(flights, 3, {"rows": [1]})
+    results = _run_concurrently(flights, fn)
+    assert len(calls) == 1
+    assert all(r == {"rows": [1]} for r in results)
+    assert len({id(r) for r in results}) == 4
+    assert flights.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_leader_error_reaches_every_follower():
+    flights = SingleFlight()
+    fn, calls = _gated(flights, 3, RuntimeError("401 Incorrect API key"))
+    results = _run_concurrently(flights, fn)
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_completed_call_is_not_cached():
+    flights = SingleFlight()
+    assert flights.do("k", lambda: 1) == 1
+    assert flights.do("k", lambda: 2) == 2
+
+
+def test_async_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"v": 1}
+
+    async def main():
+        return await asyncio.gather(*(flights.ado("k", work) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [{"v": 1}] * 3
+    assert len({id(r) for r in results}) == 3
+
+
+def test_async_leader_error_reaches_followers():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flights.ado("k", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+
+
+def test_flight_keys_differ_per_api_key():
+    messages = [{"role": "user", "content": "x"}]
+    assert api._flight_key("a", None, "m", messages) != api._flight_key("b", None, "m", messages)
+    assert api._flight_key("a", None, "m", messages) == api._flight_key("a", None, "m", list(messages))
+
+
+def test_wait_times_out():
+    flights = SingleFlight()
+    flights.begin("k")
+    _, call = flights.begin("k")
+    with pytest.raises(TimeoutError):
+        flights.wait(call, timeout=0.01)